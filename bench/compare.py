@@ -0,0 +1,70 @@
+"""Compare two benchmark result files from bench/run.py.
+
+    python bench/compare.py OLD.json NEW.json [--threshold 10]
+
+Prints the relative change of every latency and throughput figure and
+exits with status 1 if anything regressed by more than --threshold percent.
+"""
+
+import argparse
+import json
+import sys
+
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="Regression threshold in percent (default: 10)"
+    )
+    args = parser.parse_args()
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['commit']} ({old['timestamp']}) -> {new['commit']} ({new['timestamp']})")
+    regressions = []
+
+    print("\n\033[94mSingle target latency (lower is better):\033[0m")
+    print(f"  {'module':<12} {'old mean':>10} {'new mean':>10} {'change':>8} {'old p95':>10} {'new p95':>10}")
+    for name in sorted(old["single"].keys() & new["single"].keys()):
+        a, b = old["single"][name], new["single"][name]
+        delta = change(a["mean"], b["mean"])
+        if delta > args.threshold:
+            regressions.append(f"{name} mean latency +{delta:.0f}%")
+        print(
+            f"  {name:<12} {a['mean'] * 1000:>8.1f}ms {b['mean'] * 1000:>8.1f}ms {delta:>+7.1f}%"
+            f" {a['p95'] * 1000:>8.1f}ms {b['p95'] * 1000:>8.1f}ms"
+        )
+
+    shared = sorted(old["batch"].keys() & new["batch"].keys())
+    if shared:
+        print("\n\033[94mBatch throughput (higher is better):\033[0m")
+        for target_type in shared:
+            a, b = old["batch"][target_type], new["batch"][target_type]
+            delta = change(a["targets_per_second"], b["targets_per_second"])
+            if -delta > args.threshold:
+                regressions.append(f"{target_type} batch throughput {delta:.0f}%")
+            print(
+                f"  {target_type:<12} {a['targets_per_second']:>8.1f}/s {b['targets_per_second']:>8.1f}/s"
+                f" {delta:>+7.1f}%"
+            )
+
+    settings = [{k: v for k, v in run.get("config", {}).items() if k != "out"} for run in (old, new)]
+    if settings[0] != settings[1]:
+        print("\n\033[93mNote:\033[0m the runs used different settings; compare with care.")
+    if regressions:
+        print(f"\n\033[91mRegressions over {args.threshold:g}%:\033[0m")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Benchmark the modules offline against local stand-in servers.
+
+    python bench/run.py                                  # default scenarios
+    python bench/run.py --latency 50 --targets 200 --workers 16
+    python bench/compare.py bench/results/old.json bench/results/new.json
+
+Module .conf files are generated in bench/.work/conf and point every module
+at the servers in bench/servers.py, so no API key, network access or quota
+is needed. ping, whois and nmap shell out to system tools and are not
+benchmarked. Results are written to bench/results/ as JSON.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+WORK_DIR = BENCH_DIR / ".work"
+RESULTS_DIR = BENCH_DIR / "results"
+RESULT_VERSION = 1
+
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+from servers import BenchServers  # noqa: E402
+
+# module -> target type it is benchmarked against
+SINGLE_MODULES = {
+    "ipinfo": "ip",
+    "shodan": "ip",
+    "vt": "ip",
+    "pdns": "ip",
+    "stinfo": "domain",
+    "dnslookup": "domain",
+    "cert": "https",
+    "webrequest": "http",
+}
+BATCH_MODULES = {
+    "ip": ["ipinfo", "shodan", "vt", "pdns"],
+    "domain": ["dnslookup", "stinfo", "vt", "pdns"],
+}
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def write_configs(conf_dir, configs):
+    conf_dir.mkdir(parents=True, exist_ok=True)
+    for name, settings in configs.items():
+        lines = ["[DEFAULT]"] + [f"{key} = {value}" for key, value in settings.items()]
+        (conf_dir / f"{name}.conf").write_text("\n".join(lines) + "\n")
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min": samples[0],
+        "max": samples[-1],
+    }
+
+
+def bench_single(cli, targets, modules, iterations):
+    """Latency of one module run against one target, repeated."""
+    results = {}
+    for name in modules:
+        module = cli.modules[name]
+        target = targets[SINGLE_MODULES[name]]
+        samples, errors = [], 0
+        for _ in range(iterations):
+            started = time.perf_counter()
+            _, error = cli.run_module(name, module, target, [])
+            samples.append(time.perf_counter() - started)
+            if error:
+                errors += 1
+        results[name] = {**summarize(samples), "errors": errors, "target": target}
+        print(
+            f"  {name:<12} mean {results[name]['mean'] * 1000:8.1f}ms"
+            f"  p95 {results[name]['p95'] * 1000:8.1f}ms  errors {errors}"
+        )
+    return results
+
+
+def bench_batch(cli, target_type, count, workers):
+    """Throughput of batch mode over count generated targets of one type."""
+    if target_type == "ip":
+        targets = [f"198.51.{100 + n // 254 % 100}.{n % 254 + 1}" for n in range(count)]
+    else:
+        targets = [f"bench-{n}.example.test" for n in range(count)]
+    commands = BATCH_MODULES[target_type]
+    started = time.perf_counter()
+    with sys.stdout.capture():
+        cli.run_batch(targets, commands, workers)
+    elapsed = time.perf_counter() - started
+    result = {
+        "targets": count,
+        "workers": workers,
+        "modules": commands,
+        "seconds": elapsed,
+        "targets_per_second": count / elapsed,
+    }
+    print(
+        f"  {target_type:<6} {count} targets x {len(commands)} modules, {workers} workers:"
+        f" {elapsed:.2f}s ({result['targets_per_second']:.1f} targets/s)"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per module (default: 20)")
+    parser.add_argument("--targets", type=int, default=100, help="Targets per batch run (default: 100)")
+    parser.add_argument("--workers", type=int, default=8, help="Batch worker count (default: 8)")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Added per-request server latency in ms (default: 0)"
+    )
+    parser.add_argument("--records", type=int, default=20, help="Passive DNS records per answer")
+    parser.add_argument("--modules", help="Comma-separated modules for the single-target runs")
+    parser.add_argument("--skip-batch", action="store_true", help="Only run the single-target benchmarks")
+    parser.add_argument("--out", help="Result file (default: bench/results/<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    WORK_DIR.mkdir(parents=True)
+    modules = args.modules.split(",") if args.modules else list(SINGLE_MODULES)
+
+    with BenchServers(WORK_DIR, latency=args.latency / 1000, records=args.records) as servers:
+        write_configs(WORK_DIR / "conf", servers.module_configs())
+        os.environ["IPINV_CONF_DIR"] = str(WORK_DIR / "conf")
+
+        import ip_investigator
+
+        # Keep logs, saves, quota state and the caches out of the real directories
+        ip_investigator.LOG_DIR = WORK_DIR / "log"
+        ip_investigator.SAVE_DIR = WORK_DIR / "saves"
+        ip_investigator.QUOTA_FILE = ip_investigator.SAVE_DIR / "quota.json"
+        ip_investigator.CACHE_FILE = ip_investigator.SAVE_DIR / "responses.sqlite"
+        ip_investigator.DNS_CACHE_FILE = ip_investigator.SAVE_DIR / "dns_cache.json"
+        ip_investigator.LOG_DIR.mkdir()
+        cli = ip_investigator.IPInvestigatorCLI(use_cache=False)
+
+        targets = {
+            "ip": "198.51.100.7",
+            "domain": "example.test",
+            "http": f"http://localhost:{servers.http.port}/",
+            "https": f"https://localhost:{servers.https.port}/" if servers.https else None,
+        }
+        if not servers.https and "cert" in modules:
+            modules.remove("cert")
+
+        print(f"\033[94mSingle target ({args.iterations} runs each):\033[0m")
+        single = bench_single(cli, targets, modules, args.iterations)
+        batch = {}
+        if not args.skip_batch:
+            print("\033[94mBatch:\033[0m")
+            for target_type in BATCH_MODULES:
+                batch[target_type] = bench_batch(cli, target_type, args.targets, args.workers)
+
+        http = {
+            provider: {"requests": count, "mean": total / count}
+            for provider, (_, total, count) in cli.metrics.histogram_totals(
+                "http_request_duration_seconds", "provider"
+            ).items()
+        }
+        cli.http.close()
+        cli.events.close()
+        cli.writer.close()
+
+    result = {
+        "version": RESULT_VERSION,
+        "commit": git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "single": single,
+        "batch": batch,
+        "http": http,
+    }
+    if args.out:
+        out = Path(args.out)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = RESULTS_DIR / f"{stamp}-{result['commit']}.json"
+    out.write_text(json.dumps(result, indent=2))
+    print(f"\nResults saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
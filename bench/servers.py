@@ -0,0 +1,370 @@
+"""Local stand-ins for the services the modules talk to.
+
+Everything listens on 127.0.0.1 on ephemeral ports, so benchmarks run
+offline and never spend API quota. Answers are synthetic but shaped like
+the real APIs, deterministic per target, and can be delayed by a fixed
+latency to mimic a remote service.
+"""
+
+import hashlib
+import json
+import socketserver
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+
+def digest(value):
+    return int(hashlib.sha1(value.encode()).hexdigest(), 16)
+
+
+def fake_ip(target, n=0):
+    """Deterministic TEST-NET-2 address for a target."""
+    return f"198.51.100.{digest(f'{target}/{n}') % 254 + 1}"
+
+
+def fake_asn(target):
+    return 64496 + digest(target) % 16  # documentation ASN range
+
+
+# ─── Fake provider APIs ─────────────────────────────────────
+
+
+def vt_report(target):
+    engines = {f"Engine{i:02d}": {"category": "harmless"} for i in range(70)}
+    if digest(target) % 3 == 0:
+        engines["Engine07"] = {"category": "malicious"}
+        engines["Engine42"] = {"category": "suspicious"}
+    return {
+        "data": {
+            "id": target,
+            "attributes": {
+                "reputation": digest(target) % 20 - 10,
+                "last_analysis_stats": {"harmless": 68, "malicious": 1, "undetected": 1},
+                "categories": {"Engine01": "business", "Engine02": "technology"},
+                "tags": ["bench"],
+                "asn": fake_asn(target),
+                "isp": "Bench Hosting",
+                "country": "FI",
+                "last_analysis_results": engines,
+            },
+        }
+    }
+
+
+def shodan_host(ip):
+    return {
+        "ip_str": ip,
+        "hostnames": [f"host-{digest(ip) % 1000}.example.test"],
+        "org": "Bench Hosting",
+        "os": None,
+        "city": "Helsinki",
+        "country_name": "Finland",
+        "isp": "Bench Hosting",
+        "asn": f"AS{fake_asn(ip)}",
+        "ports": [22, 80, 443],
+        "data": [
+            {"port": 22, "product": "OpenSSH"},
+            {"port": 80, "product": "nginx"},
+            {"port": 443, "http": {"title": "Bench"}},
+        ],
+    }
+
+
+def ipinfo_host(ip):
+    asn = fake_asn(ip)
+    return {
+        "ip": ip,
+        "hostname": f"host-{digest(ip) % 1000}.example.test",
+        "city": "Helsinki",
+        "region": "Uusimaa",
+        "country": "FI",
+        "loc": "60.1699,24.9384",
+        "org": f"AS{asn} Bench Hosting",
+        "asn": {"asn": f"AS{asn}", "name": "Bench Hosting", "type": "hosting"},
+    }
+
+
+def stinfo_domain(domain):
+    return {
+        "hostname": domain,
+        "current_dns": {
+            "a": {"values": [{"ip": fake_ip(domain, n)} for n in range(2)]},
+            "aaaa": {"values": [{"ipv6": f"2001:db8::{digest(domain) % 65535:x}"}]},
+            "mx": {"values": [{"hostname": f"mail.{domain}", "priority": 10}]},
+            "ns": {"values": [{"nameserver": f"ns{n}.{domain}"} for n in (1, 2)]},
+            "txt": {"values": [{"value": "v=spf1 -all"}]},
+            "soa": {"values": [{"email": f"hostmaster.{domain}", "ttl": 3600}]},
+        },
+    }
+
+
+def pdns_records(target, count):
+    now = int(time.time() * 1000)
+    records = []
+    for n in range(count):
+        if target.replace(".", "").isdigit():
+            query, answer = f"name-{n}.example.test", target
+        else:
+            query, answer = target, fake_ip(target, n)
+        records.append(
+            {
+                "rrtype": "a",
+                "query": query,
+                "answer": answer,
+                "firstSeenTimestamp": now - (n + 30) * 86400_000,
+                "lastSeenTimestamp": now - n * 86400_000,
+            }
+        )
+    return {"data": records, "count": count, "responseCode": 200}
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Routes /<provider>/... to the fake answers above."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.delay()
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        provider, rest = parts[0], parts[1:]
+        target = rest[-1] if rest else ""
+        if target.endswith(".invalid"):
+            return self.reply(404, {"error": "not found"})
+        if provider == "vt":
+            return self.reply(200, vt_report(target))
+        if provider == "shodan":
+            return self.reply(200, shodan_host(target))
+        if provider == "ipinfo":
+            return self.reply(200, ipinfo_host(target))
+        if provider == "stinfo":
+            return self.reply(200, stinfo_domain(target))
+        if provider == "pdns":
+            return self.reply(200, pdns_records(target, self.server.records))
+        self.reply(404, {"error": f"unknown provider {provider}"})
+
+    def do_POST(self):
+        self.server.delay()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        # VirusTotal URL submission: answer with an analysis id
+        self.reply(200, {"data": {"type": "analysis", "id": f"u-{digest(body):x}"}})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, records=20):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.latency = latency
+        self.records = records
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+# ─── DNS ─────────────────────────────────────────────────────
+
+
+class FakeDnsHandler(socketserver.BaseRequestHandler):
+    """Answers every record type dnslookup asks for; *.invalid is NXDOMAIN."""
+
+    def handle(self):
+        data, sock = self.request
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        self.server.delay()
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text()
+        domain = name.rstrip(".")
+        if domain.endswith(".invalid"):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        else:
+            for rdata in self.records(domain, question.rdtype):
+                response.answer.append(
+                    dns.rrset.from_text(name, 300, "IN", dns.rdatatype.to_text(question.rdtype), rdata)
+                )
+        sock.sendto(response.to_wire(), self.client_address)
+
+    @staticmethod
+    def records(domain, rdtype):
+        if rdtype == dns.rdatatype.A:
+            return [fake_ip(domain, n) for n in range(2)]
+        if rdtype == dns.rdatatype.AAAA:
+            return [f"2001:db8::{digest(domain) % 65535:x}"]
+        if rdtype == dns.rdatatype.MX:
+            return [f"10 mail.{domain}."]
+        if rdtype == dns.rdatatype.NS:
+            return [f"ns1.{domain}.", f"ns2.{domain}."]
+        if rdtype == dns.rdatatype.TXT:
+            return ['"v=spf1 -all"']
+        if rdtype == dns.rdatatype.CNAME:
+            # Not valid next to other records, but lets every query dnslookup makes succeed
+            return [f"edge.{domain}."]
+        if rdtype == dns.rdatatype.SOA:
+            return [f"ns1.{domain}. hostmaster.{domain}. 1 7200 3600 1209600 300"]
+        if rdtype == dns.rdatatype.PTR:
+            return [f"host-{digest(domain) % 1000}.example.test."]
+        return []
+
+
+class FakeDnsServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), FakeDnsHandler)
+        self.latency = latency
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+# ─── HTTP / TLS listeners ────────────────────────────────────
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """A small web site for webrequest: / redirects to /index.html."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/":
+            self.send_response(301)
+            self.send_header("Location", "/index.html")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"<html><head><title>Bench</title></head><body>" + b"x" * 4096 + b"</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Server", "bench")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, tls_context=None):
+        super().__init__(("127.0.0.1", 0), SiteHandler)
+        if tls_context:
+            self.socket = tls_context.wrap_socket(self.socket, server_side=True)
+
+    @property
+    def port(self):
+        return self.server_port
+
+
+def generate_certificate(directory):
+    """Self-signed certificate for localhost/127.0.0.1. Returns (cert, key) paths."""
+    directory = Path(directory)
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key), "-out", str(cert), "-days", "2",
+            "-subj", "/CN=localhost/O=IP Investigator Bench/C=FI",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+class BenchServers:
+    """Starts every stand-in server; use as a context manager."""
+
+    def __init__(self, workdir, latency=0.0, records=20):
+        self.workdir = Path(workdir)
+        self.latency = latency
+        self.records = records
+        self.servers = []
+        self.api = self.dns = self.http = self.https = None
+        self.cert = None
+
+    def __enter__(self):
+        self.api = self.start(FakeApiServer(self.latency, self.records))
+        self.dns = self.start(FakeDnsServer(self.latency))
+        self.http = self.start(SiteServer())
+        try:
+            self.cert, key = generate_certificate(self.workdir)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"openssl not usable ({e}); skipping the TLS endpoint.")
+        else:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cert, key)
+            self.https = self.start(SiteServer(context))
+        return self
+
+    def start(self, server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append(server)
+        return server
+
+    def __exit__(self, *exc):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def module_configs(self):
+        """<module>.conf contents pointing every module at the stand-ins."""
+        api = self.api.base_url
+        unlimited = {"rate_per_second": 0, "rate_per_minute": 0, "rate_per_day": 0}
+        configs = {
+            "vt": {"api_key": "bench", "base_url": f"{api}/vt", **unlimited},
+            "shodan": {"api_key": "bench", "base_url": f"{api}/shodan", **unlimited},
+            "ipinfo": {"api_key": "bench", "base_url": f"{api}/ipinfo", **unlimited},
+            "stinfo": {"api_key": "bench", "base_url": f"{api}/stinfo", **unlimited},
+            "pdns": {"base_url": f"{api}/pdns", **unlimited},
+            "dnslookup": {
+                "nameservers": "127.0.0.1",
+                "fallback_nameservers": "127.0.0.1",
+                "port": self.dns.port,
+            },
+            "webrequest": {"ports": ",".join(str(s.port) for s in (self.http, self.https) if s)},
+        }
+        if self.cert:
+            configs["webrequest"]["ca_file"] = self.cert
+            configs["cert"] = {"ca_file": self.cert}
+        return configs
@@ -1,18 +1,37 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import cmd
 import os
 import sys
+import ast
+import json
+import importlib
 import importlib.util
 import argparse
+import bisect
 import datetime
 import re
+import shlex
+import socket
 import configparser
+import ipaddress
+import queue
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from functools import partial
 from pathlib import Path
 from urllib.parse import urlparse
 from io import StringIO
-from contextlib import redirect_stdout
+from contextlib import contextmanager, nullcontext
 import readline
 import atexit
-import networkx as nx
+
+# (label, seconds) pairs reported by --profile-startup. Heavier imports
+# (networkx, sqlite3, http.server, ...) happen on first use and are timed
+# when they do.
+STARTUP_TIMINGS = [("import stdlib", time.perf_counter() - _IMPORT_STARTED)]
 
 HISTORY_FILE = Path(__file__).parent / ".cli_history"
 
@@ -20,163 +39,2621 @@ HISTORY_FILE = Path(__file__).parent / ".cli_history"
 if HISTORY_FILE.exists():
     readline.read_history_file(HISTORY_FILE)
 
-# Save session history on exit
-atexit.register(readline.write_history_file, HISTORY_FILE)
+# Save session history on exit
+atexit.register(readline.write_history_file, HISTORY_FILE)
+
+LOG_DIR = Path(__file__).parent / "log"
+SAVE_DIR = Path(__file__).parent / "saves"
+MODULES_DIR = Path(__file__).parent / "modules"
+MANIFEST_FILE = MODULES_DIR / ".manifest.json"
+MANIFEST_VERSION = 3
+
+# Class attributes read from module source so that help and dispatch work
+# without importing the module.
+MANIFEST_ATTRS = ("help", "targets", "interactive", "sweep_exempt_args", "targetless_args")
+
+GRAPH_MAGIC = b"IPIGRAPH"
+GRAPH_FORMAT_VERSION = 1
+GRAPH_CHUNK_SIZE = 10_000
+
+# node type -> (DOT shape, fill color)
+NODE_STYLES = {
+    "ip": ("box", "lightblue"),
+    "domain": ("ellipse", "lightgreen"),
+    "hostname": ("oval", "gold"),
+    "cert_subject": ("hexagon", "cyan"),
+    "org": ("diamond", "lightcoral"),
+    "issuer_org": ("diamond", "lightcoral"),
+    "port": ("circle", "orange"),
+    "san": ("note", "lightgray"),
+    "network": ("box3d", "lightblue"),
+}
+DEFAULT_NODE_STYLE = ("ellipse", "white")
+
+METRICS_PREFIX = "ipinv_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CACHE_FILE = SAVE_DIR / "responses.sqlite"
+CACHE_MAX_ENTRIES = 100_000
+DNS_CACHE_FILE = SAVE_DIR / "dns_cache.json"
+DNS_CACHE_VERSION = 1
+DNS_CACHE_MAX_ENTRIES = 100_000
+DNS_MAX_TTL = 86400
+DNS_NEGATIVE_TTL = 300  # negative answers that carry no SOA record
+DNS_SYSTEM_TTL = 60  # answers from getaddrinfo/gethostbyaddr, which report no TTL
+# expand: modules run per target type, overridable in expand.conf
+# (e.g. "ip = ipinfo,pdns"), and graph node types that can be pivoted to
+EXPAND_MODULES = {"ip": ["ipinfo", "pdns", "shodan"], "domain": ["dnslookup", "cert", "stinfo"]}
+EXPAND_NODE_TYPES = {
+    "ip": "ip",
+    "a": "ip",
+    "aaaa": "ip",
+    "domain": "domain",
+    "san": "domain",
+    "mx": "domain",
+    "ns": "domain",
+    "cname": "domain",
+}
+EXPAND_DEFAULTS = {"depth": 1, "max_nodes": 50, "budget": 200, "workers": 8}
+# network targets (CIDR blocks and a-b ranges): modules run once per host,
+# overridable in network.conf (e.g. "modules = ping,ipinfo"). Results are
+# summarized per prefix /prefix (IPv4) or /prefix6 (IPv6).
+NETWORK_MODULES = ["ping", "dnslookup", "nmap", "webrequest", "ipinfo"]
+NETWORK_DEFAULTS = {"max_hosts": 65536, "workers": 32, "prefix": 24, "prefix6": 64}
+# Output that shows a per-host run found something; other modules count
+# any run without an error
+SWEEP_HIT_PATTERNS = {
+    "ping": re.compile(r"bytes from", re.IGNORECASE),
+    "dnslookup": re.compile(r"Hostname:"),
+    "nmap": re.compile(r"\bopen\b"),
+    "webrequest": re.compile(r"\[\+\]"),
+    "ipinfo": re.compile(r"IP Info:"),
+}
+
+SERVE_ADDRESS = "127.0.0.1:8765"
+SERVE_MEMORY_CACHE_ENTRIES = 10_000
+MEMORY_CACHE_TTL = 60  # re-read from SQLite after this, in case another process cleared it
+
+# Per-provider settings, overridable with the same key in modules/<provider>.conf
+# Rate limits match the providers' free tiers; raise them in the .conf for
+# paid plans.
+PROVIDER_DEFAULTS = {
+    "vt": {
+        "base_url": "https://www.virustotal.com/api/v3",
+        "cache_ttl": 86400,
+        "negative_ttl": 3600,
+        "timeout": 15,
+        "rate_per_minute": 4.0,
+        "rate_per_day": 500.0,
+    },
+    "shodan": {
+        "base_url": "https://api.shodan.io",
+        "cache_ttl": 86400,
+        "negative_ttl": 3600,
+        "timeout": 30,
+        "rate_per_second": 1.0,
+    },
+    "ipinfo": {
+        "base_url": "https://ipinfo.io",
+        "cache_ttl": 7 * 86400,
+        "negative_ttl": 3600,
+        "timeout": 10,
+        "rate_per_day": 1000.0,
+    },
+    "stinfo": {
+        "base_url": "https://api.securitytrails.com/v1",
+        "cache_ttl": 86400,
+        "negative_ttl": 3600,
+        "timeout": 30,
+        "rate_per_second": 1.0,
+    },
+    "pdns": {
+        "base_url": "https://api.mnemonic.no/pdns/v3",
+        "cache_ttl": 86400,
+        "negative_ttl": 3600,
+        "timeout": 300,
+    },
+    # webrequest talks to the targets themselves: one try, no shared breaker
+    "webrequest": {
+        "timeout": 5,
+        "connect_timeout": 5,
+        "pool_hosts": 64,
+        "pool_size": 2,
+        "retries": 0,
+        "breaker_threshold": 0,
+    },
+}
+HTTP_DEFAULTS = {
+    "timeout": 30,  # read timeout
+    "connect_timeout": 10,
+    "pool_hosts": 4,
+    "pool_size": 10,
+    "retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 30.0,
+    "breaker_threshold": 5,  # consecutive failures that open the circuit
+    "breaker_cooldown": 60.0,
+}
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+RETRY_STATUSES = {500, 502, 503, 504}
+
+QUOTA_FILE = SAVE_DIR / "quota.json"
+RATE_PERIODS = {"rate_per_second": 1, "rate_per_minute": 60, "rate_per_day": 86400}
+RATE_LIMIT_RETRIES = 3  # times a request is re-queued after a 429
+MAX_QUEUE_WAIT = 600.0  # longer waits fail instead of stalling the run
+
+_module_configs = {}
+
+
+def conf_dir():
+    """Directory holding the <module>.conf files: $IPINV_CONF_DIR or modules/."""
+    return Path(os.environ.get("IPINV_CONF_DIR") or MODULES_DIR)
+
+
+def module_config(name):
+    """Return the [DEFAULT] section of <conf dir>/<name>.conf as a dict."""
+    if name not in _module_configs:
+        config = configparser.ConfigParser()
+        config.read(conf_dir() / f"{name}.conf")
+        _module_configs[name] = dict(config.defaults())
+    return _module_configs[name]
+
+
+def provider_setting(provider, key, default=None):
+    value = module_config(provider).get(key)
+    fallback = PROVIDER_DEFAULTS.get(provider, {}).get(key, default)
+    if value is None:
+        return fallback
+    if isinstance(fallback, bool):
+        return value.strip().lower() in ("1", "yes", "true", "on")
+    if isinstance(fallback, (int, float)):
+        return type(fallback)(value)
+    return value
+
+
+ANSI_ESCAPE = re.compile(r"\x1B[@-_][0-?]*[ -/]*[@-~]")
+
+
+def strip_ansi(text):
+    return ANSI_ESCAPE.sub("", text)
+
+
+def parse_address(value):
+    """Return an IPv4Address/IPv6Address, or None if value is not an IP address."""
+    try:
+        return ipaddress.ip_address(value.strip().strip("[]"))
+    except ValueError:
+        return None
+
+
+def parse_network(value):
+    """Return (network, first, last) for a CIDR block or an "a-b" range, else None.
+
+    network is None for ranges. "10.0.0.1-50" is short for 10.0.0.1-10.0.0.50.
+    Raises ValueError for a range whose end comes before its start.
+    """
+    value = value.strip()
+    if "/" in value:
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            return None
+        return network, network[0], network[-1]
+    first, sep, last = value.partition("-")
+    first = parse_address(first) if sep else None
+    if first is None:
+        return None
+    if last.strip().isdigit() and first.version == 4:
+        last = ".".join(str(first).split(".")[:3] + [last.strip()])
+    last = parse_address(last)
+    if last is None or last.version != first.version:
+        return None
+    if last < first:
+        raise ValueError(f"Range {value} ends before it starts.")
+    return None, first, last
+
+
+def network_size(value):
+    network, first, last = parse_network(value)
+    return int(last) - int(first) + 1
+
+
+def network_hosts(value):
+    """Yield the host addresses of a CIDR block or range one at a time.
+
+    Nothing is materialized, so a /16 (or an IPv6 /64) costs no memory up
+    front. CIDR blocks skip the network and broadcast addresses.
+    """
+    network, first, last = parse_network(value)
+    if network is not None:
+        yield from network.hosts()
+        return
+    address_type = type(first)
+    for number in range(int(first), int(last) + 1):
+        yield address_type(number)
+
+
+@contextmanager
+def startup_timer(label):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS.append((label, time.perf_counter() - started))
+
+
+def print_startup_profile():
+    print("\033[94mStartup profile:\033[0m")
+    for label, seconds in STARTUP_TIMINGS:
+        print(f"  {seconds * 1000:8.1f} ms  {label}")
+    total = sum(seconds for _, seconds in STARTUP_TIMINGS)
+    print(f"  {total * 1000:8.1f} ms  total")
+
+
+def scan_module_source(file_path, class_name):
+    """Read the literal MANIFEST_ATTRS of class_name without executing the file.
+
+    Returns None if the file does not define the class.
+    """
+    tree = ast.parse(file_path.read_text(), filename=str(file_path))
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == class_name:
+            attrs = {}
+            for stmt in node.body:
+                if (
+                    isinstance(stmt, ast.Assign)
+                    and len(stmt.targets) == 1
+                    and isinstance(stmt.targets[0], ast.Name)
+                    and stmt.targets[0].id in MANIFEST_ATTRS
+                ):
+                    try:
+                        attrs[stmt.targets[0].id] = ast.literal_eval(stmt.value)
+                    except ValueError:
+                        pass
+            return attrs
+    return None
+
+
+def load_manifest():
+    """Return {module_name: attrs}, re-scanning only files whose mtime changed."""
+    try:
+        cached = json.loads(MANIFEST_FILE.read_text())
+        if cached.get("version") != MANIFEST_VERSION:
+            cached = {}
+    except (OSError, ValueError):
+        cached = {}
+    cached_modules = cached.get("modules", {})
+
+    entries = {}
+    changed = False
+    for file in sorted(os.listdir(MODULES_DIR)):
+        if not file.endswith(".py") or file.startswith("__"):
+            continue
+        module_name = file[:-3]
+        file_path = MODULES_DIR / file
+        stat = file_path.stat()
+        entry = cached_modules.get(module_name)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            entries[module_name] = entry
+            continue
+        changed = True
+        try:
+            attrs = scan_module_source(file_path, module_name.capitalize())
+        except (OSError, SyntaxError) as e:
+            print(f"Failed to load module '{module_name}': {e}")
+            continue
+        entries[module_name] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "attrs": attrs,
+        }
+
+    if changed or len(entries) != len(cached_modules):
+        tmp_path = MANIFEST_FILE.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(
+                json.dumps({"version": MANIFEST_VERSION, "modules": entries})
+            )
+            os.replace(tmp_path, MANIFEST_FILE)
+        except OSError:
+            pass  # read-only checkout, scan again next time
+
+    return {
+        name: entry["attrs"]
+        for name, entry in entries.items()
+        if entry["attrs"] is not None
+    }
+
+
+class LazyModule:
+    """Stands in for a module until it is first used.
+
+    attrs (a plugin's manifest help, targets, ...) are available straight
+    away; anything else calls loader() once and is looked up on what it
+    returns: the plugin's module class instance, or an imported library.
+    """
+
+    interactive = False
+    sweep_exempt_args = ()
+    targetless_args = ()
+
+    def __init__(self, loader, attrs=None):
+        self._loader = loader
+        self._instance = None
+        self._lock = threading.Lock()
+        self.__dict__.update(attrs or {})
+
+    def load(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._loader()
+        return self._instance
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+
+def import_library(name):
+    with startup_timer(f"import {name}"):
+        return importlib.import_module(name)
+
+
+nx = LazyModule(partial(import_library, "networkx"))
+
+_lazy_subclasses = {}
+
+
+def lazy_subclass(cls, base):
+    """cls with base mixed in, for base classes from lazily imported libraries.
+
+    cls is written without the base so defining it imports nothing; its
+    super() calls reach base once the two are combined. Created once per pair.
+    """
+    key = (cls, base)
+    if key not in _lazy_subclasses:
+        combined = type(cls.__name__, (cls, base), {"__module__": cls.__module__})
+        _lazy_subclasses.setdefault(key, combined)
+    return _lazy_subclasses[key]
+
+
+# ─── Metrics ──────────────────────────────────────────────
+
+
+def prometheus_labels(labels, **extra):
+    pairs = [
+        '{}="{}"'.format(
+            key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for key, value in tuple(labels) + tuple(extra.items())
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms, keyed by name and labels.
+
+    Module runs, provider HTTP calls, DNS queries, subprocesses and cache
+    lookups report here; `stats` summarizes them and prometheus() renders
+    them in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, tracer=None):
+        self.buckets = buckets
+        self.tracer = tracer or Tracer()
+        self.counters = Counter()  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):  # larger values only show up in +Inf
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block into <name>_duration_seconds; count exceptions in <name>_errors_total.
+
+        The block is also recorded as a trace span.
+        """
+        started = time.perf_counter()
+        try:
+            with self.tracer.span(" ".join([name, *map(str, labels.values())]), name, **labels):
+                yield
+        except Exception as e:
+            self.inc(f"{name}_errors_total", error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(f"{name}_duration_seconds", time.perf_counter() - started, **labels)
+
+    def counter_totals(self, name, by, **where):
+        """Sum a counter grouped by one label, optionally filtered on others."""
+        totals = Counter()
+        with self._lock:
+            for (counter, labels), value in self.counters.items():
+                labels = dict(labels)
+                if counter == name and all(labels.get(k) == v for k, v in where.items()):
+                    totals[labels.get(by)] += value
+        return totals
+
+    def histogram_totals(self, name, by):
+        """Merge a histogram grouped by one label: {value: (counts, sum, count)}."""
+        totals = {}
+        with self._lock:
+            for (histogram, labels), (counts, total, count) in self.histograms.items():
+                if histogram != name:
+                    continue
+                group = dict(labels).get(by)
+                merged = totals.setdefault(group, [[0] * len(self.buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return totals
+
+    def quantile(self, counts, count, q):
+        """Upper bound of the bucket holding the q-quantile."""
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self.histograms.items()
+            )
+        typed = set()
+        for (name, labels), value in counters:
+            name = METRICS_PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{prometheus_labels(labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            name = METRICS_PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{prometheus_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{prometheus_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{prometheus_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{prometheus_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the metrics atomically, e.g. for node_exporter's textfile collector."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics over HTTP from a daemon thread."""
+        import http.server
+
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+# ─── Tracing ──────────────────────────────────────────────
+
+
+class Tracer:
+    """Records nested spans as Chrome trace events (chrome://tracing, Perfetto).
+
+    Disabled unless given an output path; span() then returns a shared no-op
+    context manager, so instrumented code pays one call when tracing is off.
+    Spans are "complete" events, nested by time on the thread that ran them.
+    """
+
+    _NULL_SPAN = nullcontext()
+
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = path is not None
+        self.events = []
+        self._origin = time.perf_counter()
+        self._threads = set()
+        self._lock = threading.Lock()
+
+    def span(self, name, cat="app", **args):
+        if not self.enabled:
+            return self._NULL_SPAN
+        return self._span(name, cat, args)
+
+    @contextmanager
+    def _span(self, name, cat, args):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(name, cat, started, time.perf_counter(), args)
+
+    def record(self, name, cat, started, ended, args=None):
+        thread = threading.current_thread()
+        if thread.ident not in self._threads:
+            with self._lock:
+                self._threads.add(thread.ident)
+                self.events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": os.getpid(),
+                        "tid": thread.ident,
+                        "args": {"name": thread.name},
+                    }
+                )
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((started - self._origin) * 1e6, 3),
+            "dur": round((ended - started) * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        self.events.append(event)
+
+    def write(self):
+        if not self.enabled:
+            return
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms"}, f)
+
+
+def pool_classes(tracer, dns_cache=None):
+    """urllib3 pool classes whose connections look hosts up in dns_cache
+    and report connect/TLS/response spans.
+
+    Only the address connected to comes from the cache; TLS still verifies
+    and sends SNI for the host name.
+    """
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def traced(base, connect_span):
+        class TracedConnection(base):
+            def _new_conn(self):
+                if dns_cache is not None:
+                    # Keep the name: a reconnect after the TTL resolves it again
+                    self._dns_name = getattr(self, "_dns_name", self._dns_host)
+                    self._dns_host = dns_cache.address(self._dns_name)
+                with tracer.span("tcp connect", "http", host=self.host, port=self.port):
+                    return super()._new_conn()
+
+            def connect(self):
+                with tracer.span(connect_span, "http", host=self.host):
+                    return super().connect()
+
+            def request(self, method, url, *args, **kwargs):
+                with tracer.span("send request", "http", method=method):
+                    return super().request(method, url, *args, **kwargs)
+
+            def getresponse(self, *args, **kwargs):
+                with tracer.span("wait response", "http", host=self.host):
+                    return super().getresponse(*args, **kwargs)
+
+        return TracedConnection
+
+    class TracedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = traced(HTTPConnection, "connect")
+
+    class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = traced(HTTPSConnection, "connect + tls")
+
+    return {"http": TracedHTTPConnectionPool, "https": TracedHTTPSConnectionPool}
+
+
+class SingleFlight:
+    """Let threads that ask for the same thing at the same time share one call.
+
+    The first caller for a key runs fn; callers arriving while it runs wait
+    for it and get the same result, or the same exception. Nothing is kept
+    after the call finishes, so this only removes concurrent duplicates;
+    the response cache handles repeats over time.
+
+    With a recorder (see GraphRecorder), graph changes made while the call
+    runs are replayed to every caller that waited on it.
+    """
+
+    def __init__(self, metrics=None, recorder=None):
+        self.metrics = metrics
+        self.recorder = recorder
+        self._calls = {}  # (kind, key) -> {"done": Event, "value": ..., "error": ...}
+        self._lock = threading.Lock()
+
+    def do(self, kind, key, fn):
+        with self._lock:
+            call = self._calls.get((kind, key))
+            leader = call is None
+            if leader:
+                call = self._calls[(kind, key)] = {"done": threading.Event()}
+        if not leader:
+            if self.metrics:
+                self.metrics.inc("inflight_shared_total", kind=kind)
+            call["done"].wait()
+            if call.get("changes"):
+                self.recorder.replay(call["changes"])
+            if "error" in call:
+                raise call["error"]
+            return call["value"]
+        recorder = self.recorder
+        changes = recorder.start() if recorder else None
+        try:
+            call["value"] = fn()
+            return call["value"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            if recorder:
+                call["changes"] = recorder.stop(changes)
+            with self._lock:
+                del self._calls[(kind, key)]
+            call["done"].set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class ResponseCache:
+    """Persistent cache of API responses shared by all API modules and sessions.
+
+    Entries are keyed by (provider, endpoint, target) and expire after the
+    provider's cache_ttl. "No data" answers are cached as negative entries
+    for negative_ttl. The least recently used entries are evicted once the
+    cache grows past max_entries.
+
+    With memory_entries > 0, the most recently used entries are also kept
+    in memory (as JSON text, so callers never share objects), which lets a
+    long-running process answer repeat lookups without touching SQLite.
+    Concurrent misses for the same key share one loader call.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        max_entries=CACHE_MAX_ENTRIES,
+        enabled=True,
+        metrics=None,
+        memory_entries=0,
+        inflight=None,
+    ):
+        self.path = Path(path or CACHE_FILE)
+        self.metrics = metrics
+        self.inflight = inflight or SingleFlight(metrics)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()  # (provider, endpoint, target) -> (expires, JSON or None)
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._count = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened on first use so short runs that never query an API don't pay for it
+        if self._db is None:
+            self.path.parent.mkdir(exist_ok=True)
+            import sqlite3
+
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " provider TEXT, endpoint TEXT, target TEXT, value TEXT,"
+                " negative INTEGER, stored REAL, expires REAL, accessed REAL,"
+                " PRIMARY KEY (provider, endpoint, target))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return self._db
+
+    def get(self, provider, endpoint, target):
+        """Return (hit, value). A hit with value None is a cached "no data"."""
+        if not self.enabled:
+            return False, None
+        now = time.time()
+        key = (provider, endpoint, target)
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry[0] > now:
+                self.memory.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = None
+        if entry is not None:
+            return True, None if entry[1] is None else json.loads(entry[1])
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT value, negative, expires FROM responses"
+                " WHERE provider = ? AND endpoint = ? AND target = ? AND expires > ?",
+                (provider, endpoint, target, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            db.execute(
+                "UPDATE responses SET accessed = ?"
+                " WHERE provider = ? AND endpoint = ? AND target = ?",
+                (now, provider, endpoint, target),
+            )
+            db.commit()
+            self.hits += 1
+        value, negative, expires = row
+        if negative:
+            value = None
+        self._remember(key, min(expires, now + MEMORY_CACHE_TTL), value)
+        return True, None if value is None else json.loads(value)
+
+    def _remember(self, key, expires, text):
+        if not self.memory_entries:
+            return
+        with self._lock:
+            self.memory[key] = (expires, text)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def set(self, provider, endpoint, target, value):
+        """Store value, or a negative entry if value is None."""
+        if not self.enabled:
+            return
+        negative = value is None
+        ttl = provider_setting(provider, "negative_ttl" if negative else "cache_ttl", 3600)
+        now = time.time()
+        text = None if negative else json.dumps(value)
+        with self._lock:
+            db = self._connect()
+            cursor = db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    provider,
+                    endpoint,
+                    target,
+                    text,
+                    int(negative),
+                    now,
+                    now + ttl,
+                    now,
+                ),
+            )
+            self._count += cursor.rowcount
+            if self._count > self.max_entries:
+                self._evict()
+            db.commit()
+        self._remember((provider, endpoint, target), now + min(ttl, MEMORY_CACHE_TTL), text)
+
+    def fetch(self, provider, endpoint, target, loader):
+        """Return the cached value or call loader() and cache what it returns.
+
+        loader returns None when the provider has no data for the target.
+        """
+        hit, value = self.get(provider, endpoint, target)
+        if self.metrics:
+            self.metrics.inc(
+                "cache_requests_total", provider=provider, result="hit" if hit else "miss"
+            )
+        if hit:
+            return value
+
+        def load():
+            value = loader()
+            self.set(provider, endpoint, target, value)
+            return value
+
+        return self.inflight.do("api", (provider, endpoint, target), load)
+
+    def _evict(self):
+        # Expired entries go first, then the least recently used tenth
+        db = self._db
+        db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+        count = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            excess = count - self.max_entries + self.max_entries // 10
+            db.execute(
+                "DELETE FROM responses WHERE rowid IN"
+                " (SELECT rowid FROM responses ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            count -= excess
+        self._count = count
+
+    def stats(self):
+        """Return {provider: (entries, negative, expired)}."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT provider, COUNT(*), SUM(negative), SUM(expires <= ?)"
+                " FROM responses GROUP BY provider ORDER BY provider",
+                (time.time(),),
+            ).fetchall()
+        return {provider: (count, negative, expired) for provider, count, negative, expired in rows}
+
+    def clear(self, provider=None):
+        with self._lock:
+            for key in [key for key in self.memory if not provider or key[0] == provider]:
+                del self.memory[key]
+            db = self._connect()
+            if provider:
+                db.execute("DELETE FROM responses WHERE provider = ?", (provider,))
+            else:
+                db.execute("DELETE FROM responses")
+            db.commit()
+            self._count = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            db.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def negative_ttl(response):
+    """RFC 2308 TTL for a negative answer: the SOA record's TTL or MINIMUM, whichever is lower."""
+    import dns.rdatatype
+
+    for rrset in getattr(response, "authority", None) or []:
+        if rrset.rdtype == dns.rdatatype.SOA:
+            return min(rrset.ttl, rrset[0].minimum)
+    return DNS_NEGATIVE_TTL
+
+
+class DnsCache:
+    """In-process DNS cache shared by every module, honoring record TTLs.
+
+    Entries are keyed by (name, record type) and hold the records as text,
+    the rcode and the resolver that answered. NXDOMAIN and NODATA answers
+    are cached as well, for the negative TTL from the answer's SOA record
+    (RFC 2308); an NXDOMAIN answers every record type for that name. The
+    least recently used entries are dropped beyond max_entries.
+
+    With a path, unexpired entries are saved there by save() and read back
+    on first use in the next session. With enabled=False nothing is cached
+    and every lookup goes to the resolver.
+    """
+
+    def __init__(
+        self, path=None, max_entries=DNS_CACHE_MAX_ENTRIES, metrics=None, inflight=None, enabled=True
+    ):
+        self.path = Path(path) if path and enabled else None
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.metrics = metrics
+        self.inflight = inflight or SingleFlight(metrics)
+        self.entries = OrderedDict()  # (name, rtype) -> (expires, rcode, records, source)
+        self._loaded = self.path is None
+        self._resolver = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, rtype):
+        return str(name).lower().rstrip("."), rtype.upper()
+
+    def _load(self):
+        # Called with the lock held
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        if snapshot.get("version") != DNS_CACHE_VERSION:
+            return
+        now = time.time()
+        for name, rtype, expires, rcode, records, source in snapshot.get("entries", []):
+            if expires > now:
+                self.entries[(name, rtype)] = (expires, rcode, records, source)
+
+    def get(self, name, rtype, nxdomain=True):
+        """Return the cached (rcode, records, source), or None on a miss.
+
+        rcode is NOERROR, NODATA or NXDOMAIN. With nxdomain=False a cached
+        NXDOMAIN for the name is ignored.
+        """
+        if not self.enabled:
+            return None
+        name, rtype = self.key(name, rtype)
+        now = time.time()
+        entry = None
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            for key in ((name, rtype), (name, "*"))[: 2 if nxdomain else 1]:
+                found = self.entries.get(key)
+                if found is None:
+                    continue
+                if found[0] <= now:
+                    del self.entries[key]
+                    continue
+                self.entries.move_to_end(key)
+                entry = found[1:]
+                break
+        if self.metrics:
+            self.metrics.inc("dns_cache_requests_total", result="miss" if entry is None else "hit")
+        return entry
+
+    def put(self, name, rtype, rcode, records, ttl, source=None):
+        if not self.enabled or ttl <= 0:
+            return
+        key = self.key(name, "*" if rcode == "NXDOMAIN" else rtype)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self.entries[key] = (time.time() + min(ttl, DNS_MAX_TTL), rcode, list(records), source)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def store_answer(self, name, rtype, answer, source=None):
+        """Cache a dnspython Answer (NODATA if it has no records). Returns (rcode, records)."""
+        if answer.rrset:
+            rcode, records = "NOERROR", [rdata.to_text() for rdata in answer.rrset]
+            ttl = answer.expiration - time.time()  # lowest TTL along any CNAME chain
+        else:
+            rcode, records = "NODATA", []
+            ttl = negative_ttl(answer.response)
+        self.put(name, rtype, rcode, records, ttl, source)
+        return rcode, records
+
+    def store_nxdomain(self, name, error, source=None):
+        """Cache a dnspython NXDOMAIN exception. Returns (rcode, records)."""
+        response = next(iter(error.responses().values()), None)
+        self.put(name, "*", "NXDOMAIN", [], negative_ttl(response), source)
+        return "NXDOMAIN", []
+
+    def system_resolver(self):
+        import dns.resolver
+
+        with self._lock:
+            if self._resolver is None:
+                self._resolver = dns.resolver.Resolver()  # the system's nameservers
+            return self._resolver
+
+    def resolve(self, name, rtype):
+        """Return (rcode, records) from the cache, or ask the system's nameservers.
+
+        Failures (timeouts, no usable nameserver) return SERVFAIL and are
+        not cached.
+        """
+        cached = self.get(name, rtype)
+        if cached is not None:
+            return cached[:2]
+        return self.inflight.do(
+            "dns", ("system", *self.key(name, rtype)), lambda: self._query(name, rtype)
+        )
+
+    def _query(self, name, rtype):
+        import dns.exception
+        import dns.resolver
+
+        timer = self.metrics.timer("dns", rtype=rtype, resolver="system") if self.metrics else nullcontext()
+        try:
+            with timer:
+                answer = self.system_resolver().resolve(name, rtype, raise_on_no_answer=False)
+        except dns.resolver.NXDOMAIN as e:
+            return self.store_nxdomain(name, e, "system")
+        except dns.exception.DNSException:
+            return "SERVFAIL", []
+        return self.store_answer(name, rtype, answer, "system")
+
+    def system_lookup(self, name, kind, lookup):
+        """Cache lookup() for names only the OS knows (hosts file, mDNS), for DNS_SYSTEM_TTL."""
+        cached = self.get(name, kind, nxdomain=False)
+        if cached is not None:
+            return cached[1]
+
+        def load():
+            timer = self.metrics.timer("dns", rtype=kind, resolver="system") if self.metrics else nullcontext()
+            try:
+                with timer:
+                    records = lookup()
+            except OSError:
+                records = []
+            ttl = DNS_SYSTEM_TTL if records else DNS_NEGATIVE_TTL
+            self.put(name, kind, "NOERROR" if records else "NODATA", records, ttl, "system")
+            return records
+
+        return self.inflight.do("dns", ("system", *self.key(name, kind)), load)
+
+    def addresses(self, name):
+        """IP addresses of a host name, A records first, then AAAA.
+
+        Names DNS does not answer (localhost, the hosts file) fall back to
+        getaddrinfo, like a socket connect would.
+        """
+        if parse_address(name):
+            return [name]
+        name = name.rstrip(".")
+        addresses = []
+        if name.lower() != "localhost" and not name.lower().endswith(".localhost"):
+            for rtype in ("A", "AAAA"):
+                rcode, records = self.resolve(name, rtype)
+                if rcode == "NXDOMAIN":
+                    break
+                addresses += records
+        if addresses:
+            return addresses
+
+        def getaddrinfo():
+            infos = socket.getaddrinfo(name, None, type=socket.SOCK_STREAM)
+            return list(dict.fromkeys(info[4][0] for info in infos))
+
+        return self.system_lookup(name, "ADDR", getaddrinfo)
+
+    def address(self, name):
+        """The first address of name, or name itself if it does not resolve."""
+        addresses = self.addresses(name)
+        return addresses[0] if addresses else name
+
+    def hostnames(self, ip):
+        """PTR names of an IP address, falling back to gethostbyaddr."""
+        import dns.reversename
+
+        rcode, records = self.resolve(dns.reversename.from_address(ip).to_text(), "PTR")
+        if records:
+            return [record.rstrip(".") for record in records]
+        return self.system_lookup(ip, "HOST", lambda: [socket.gethostbyaddr(ip)[0]])
+
+    def stats(self):
+        """Return (entries, negative, expired)."""
+        now = time.time()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entries = list(self.entries.values())
+        negative = sum(1 for entry in entries if entry[1] != "NOERROR")
+        expired = sum(1 for entry in entries if entry[0] <= now)
+        return len(entries), negative, expired
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._loaded = True
+        if self.path and self.path.exists():
+            self.path.unlink()
+
+    def save(self):
+        if self.path is None or not self._loaded:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [
+                [name, rtype, *entry] for (name, rtype), entry in self.entries.items() if entry[0] > now
+            ]
+        self.path.parent.mkdir(exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": DNS_CACHE_VERSION, "entries": entries}, f)
+        os.replace(tmp, self.path)
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """capacity requests per period seconds, refilled continuously."""
+
+    def __init__(self, capacity, period, tokens=None, updated=None):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity if tokens is None else tokens
+        self.updated = updated or time.time()
+
+    def delay(self, now):
+        """Seconds until a token is free. Tokens may be reserved into the negative."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.capacity / self.period
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.period / self.capacity
+
+
+class RateLimiter:
+    """Per-provider token buckets plus the quota providers report in headers.
+
+    acquire() reserves a token in every bucket of the provider and sleeps
+    until the reservation comes due, so concurrent callers queue up in order
+    instead of failing. 429 answers and exhausted X-RateLimit-* quotas
+    pause the provider until the reported reset time. Bucket levels are
+    kept in saves/quota.json so per-day limits survive between runs.
+    """
+
+    def __init__(self, state_path=None):
+        self.state_path = Path(state_path or QUOTA_FILE)
+        self.reported = {}  # provider -> {"remaining", "limit", "reset"}
+        self.paused_until = {}
+        self.waited = Counter()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        try:
+            self._saved = json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            self._saved = {}
+
+    def buckets(self, provider):
+        if provider not in self._buckets:
+            buckets = {}
+            for key, period in RATE_PERIODS.items():
+                capacity = provider_setting(provider, key, 0.0)
+                if capacity > 0:
+                    saved = self._saved.get(provider, {}).get(key)
+                    if saved and saved[0] == capacity:
+                        buckets[key] = TokenBucket(capacity, period, saved[1], saved[2])
+                    else:
+                        buckets[key] = TokenBucket(capacity, period)
+            self._buckets[provider] = buckets
+        return self._buckets[provider]
+
+    def acquire(self, provider):
+        with self._lock:
+            now = time.time()
+            buckets = self.buckets(provider).values()
+            delay = max(
+                [bucket.delay(now) for bucket in buckets]
+                + [self.paused_until.get(provider, 0) - now, 0.0]
+            )
+            max_wait = provider_setting(provider, "max_queue_wait", MAX_QUEUE_WAIT)
+            if delay > max_wait:
+                raise QuotaExceeded(
+                    f"{provider} quota exhausted, next request allowed in {delay:.0f}s"
+                )
+            for bucket in buckets:
+                bucket.tokens -= 1
+            self.waited[provider] += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def observe(self, provider, response):
+        """Record quota headers. Returns True if the request was rate limited (429)."""
+        headers = response.headers
+        now = time.time()
+        remaining = headers.get("X-RateLimit-Remaining") or headers.get("RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset") or headers.get("RateLimit-Reset")
+        with self._lock:
+            if remaining is not None:
+                try:
+                    remaining = int(float(remaining))
+                    reset_at = float(reset) if reset else None
+                except ValueError:
+                    return response.status_code == 429
+                if reset_at is not None and reset_at < 1e9:
+                    reset_at += now  # seconds from now rather than an epoch
+                self.reported[provider] = {
+                    "remaining": remaining,
+                    "limit": headers.get("X-RateLimit-Limit") or headers.get("RateLimit-Limit"),
+                    "reset": reset_at,
+                }
+                if remaining <= 0 and reset_at:
+                    self.paused_until[provider] = max(self.paused_until.get(provider, 0), reset_at)
+            if response.status_code != 429:
+                return False
+            self.paused_until[provider] = max(
+                self.paused_until.get(provider, 0),
+                now + self.retry_after(headers.get("Retry-After")),
+            )
+            return True
+
+    @staticmethod
+    def retry_after(value, default=60.0):
+        """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+        if not value:
+            return default
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            import email.utils
+
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0.0, when.timestamp() - time.time())
+            except (TypeError, ValueError):
+                return default
+
+    def status(self):
+        """Return {provider: {bucket: (tokens, capacity)}} for configured providers."""
+        with self._lock:
+            now = time.time()
+            result = {}
+            for provider in PROVIDER_DEFAULTS:
+                buckets = self.buckets(provider)
+                for bucket in buckets.values():
+                    bucket.delay(now)
+                if buckets or provider in self.reported:
+                    result[provider] = {
+                        key: (bucket.tokens, bucket.capacity) for key, bucket in buckets.items()
+                    }
+            return result
+
+    def save(self):
+        with self._lock:
+            state = {
+                provider: {
+                    key: [bucket.capacity, bucket.tokens, bucket.updated]
+                    for key, bucket in buckets.items()
+                }
+                for provider, buckets in self._buckets.items()
+                if buckets
+            }
+        for provider, buckets in self._saved.items():
+            state.setdefault(provider, buckets)
+        try:
+            tmp_path = self.state_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(state))
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            pass
+
+
+class ProviderUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Fail fast while a provider is down.
+
+    After threshold consecutive failures the circuit opens and calls raise
+    ProviderUnavailable for cooldown seconds. Then a single trial request is
+    let through: success closes the circuit, failure opens it again. A
+    trial that ends without either (an unrelated exception, a 429) is
+    released so the next call can try. A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, provider, threshold, cooldown):
+        self.provider = provider
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def _reject_if_open(self):
+        # Called with the lock held
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if remaining > 0 or self.probing:
+            raise ProviderUnavailable(
+                f"{self.provider} is unavailable after {self.failures} failures,"
+                f" retrying in {max(remaining, 0):.0f}s"
+            )
+
+    def check(self):
+        """Raise ProviderUnavailable if a call would be rejected, without claiming the trial."""
+        with self._lock:
+            if self.opened_at is not None:
+                self._reject_if_open()
+
+    def before(self):
+        """Admit a call. Returns True if it is the trial request, which must
+        end in success(), failure() or release()."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            self._reject_if_open()
+            self.probing = True
+            return True
+
+    def release(self):
+        """End a trial request that neither succeeded nor failed."""
+        with self._lock:
+            self.probing = False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.threshold and (self.probing or self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ProviderSession:
+    """Keep-alive HTTP connection pool for one provider.
+
+    Requests that don't pass a timeout get the provider's (connect, read)
+    timeouts. Every request waits for the provider's rate limiter and
+    circuit breaker first. GET and HEAD requests that hit a connection
+    error or a 5xx are retried with exponential backoff and full jitter,
+    honoring Retry-After; other methods are never resent. A read timeout
+    counts against the breaker but is not retried, so a stalled provider
+    costs one timeout per call rather than one per attempt. Identical GET and
+    HEAD requests made at the same time share one response.
+    """
+
+    def __init__(self, provider, limiter, metrics, tracer, inflight=None, dns_cache=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.provider = provider
+        self.base_url = provider_setting(provider, "base_url", "").rstrip("/")
+        self.limiter = limiter
+        self.metrics = metrics
+        self.tracer = tracer
+        self.inflight = inflight or SingleFlight(metrics)
+        self.failure_errors = (requests.ConnectionError, requests.Timeout)
+        self.retryable_errors = requests.ConnectionError  # includes ConnectTimeout
+        self.timeout = (
+            provider_setting(provider, "connect_timeout", HTTP_DEFAULTS["connect_timeout"]),
+            provider_setting(provider, "timeout", HTTP_DEFAULTS["timeout"]),
+        )
+        self.retries = provider_setting(provider, "retries", HTTP_DEFAULTS["retries"])
+        self.backoff_base = provider_setting(
+            provider, "backoff_base", HTTP_DEFAULTS["backoff_base"]
+        )
+        self.backoff_max = provider_setting(provider, "backoff_max", HTTP_DEFAULTS["backoff_max"])
+        self.breaker = CircuitBreaker(
+            provider,
+            provider_setting(provider, "breaker_threshold", HTTP_DEFAULTS["breaker_threshold"]),
+            provider_setting(provider, "breaker_cooldown", HTTP_DEFAULTS["breaker_cooldown"]),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=provider_setting(
+                provider, "pool_hosts", HTTP_DEFAULTS["pool_hosts"]
+            ),
+            pool_maxsize=provider_setting(provider, "pool_size", HTTP_DEFAULTS["pool_size"]),
+        )
+        if tracer.enabled or dns_cache is not None:
+            adapter.poolmanager.pool_classes_by_scheme = pool_classes(tracer, dns_cache)
+        self.session = requests.Session()
+        ca_file = provider_setting(provider, "ca_file")
+        if ca_file:
+            self.session.verify = ca_file
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff(self, attempt):
+        import random
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if method.upper() not in IDEMPOTENT_METHODS or kwargs.get("stream"):
+            return self.send(method, url, **kwargs)
+        # The body is read before the response is returned, so sharing it is safe
+        key = (self.provider, method.upper(), url, json.dumps(kwargs, sort_keys=True, default=str))
+        return self.inflight.do("http", key, lambda: self.send(method, url, **kwargs))
+
+    def send(self, method, url, **kwargs):
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retries = rate_limited = 0
+        while True:
+            # Fail fast while the circuit is open instead of queueing for a token
+            self.breaker.check()
+            with self.metrics.timer("http_queue_wait", provider=self.provider):
+                self.limiter.acquire(self.provider)
+            probe = self.breaker.before()
+            try:
+                try:
+                    with self.metrics.timer("http_request", provider=self.provider):
+                        response = self.session.request(method, url, **kwargs)
+                except self.failure_errors as e:
+                    self.breaker.failure()
+                    retryable = isinstance(e, self.retryable_errors)
+                    if not retryable or not idempotent or retries >= self.retries:
+                        raise
+                    delay = self.backoff(retries)
+                    retries += 1
+                else:
+                    self.metrics.inc(
+                        "http_responses_total", provider=self.provider, status=response.status_code
+                    )
+                    self.metrics.inc(
+                        "http_received_bytes_total", len(response.content or b""), provider=self.provider
+                    )
+                    # A 429 was not processed, so it is safe to queue it again;
+                    # the limiter holds the provider until Retry-After passes
+                    if self.limiter.observe(self.provider, response):
+                        if rate_limited >= RATE_LIMIT_RETRIES:
+                            return response
+                        rate_limited += 1
+                        continue
+                    if response.status_code not in RETRY_STATUSES:
+                        self.breaker.success()
+                        return response
+                    self.breaker.failure()
+                    retry_after = RateLimiter.retry_after(response.headers.get("Retry-After"), 0.0)
+                    if not idempotent or retries >= self.retries or retry_after > self.backoff_max:
+                        return response
+                    delay = max(self.backoff(retries), retry_after)
+                    retries += 1
+                    response.close()
+            finally:
+                if probe:
+                    self.breaker.release()
+            self.metrics.inc("http_retries_total", provider=self.provider)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class HttpSessions:
+    """One pooled session per provider, created on first use."""
+
+    def __init__(self, limiter, metrics, tracer, inflight=None, dns_cache=None):
+        self.limiter = limiter
+        self.metrics = metrics
+        self.tracer = tracer
+        self.inflight = inflight or SingleFlight(metrics)
+        self.dns_cache = dns_cache
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, provider):
+        with self._lock:
+            if provider not in self._sessions:
+                self._sessions[provider] = ProviderSession(
+                    provider, self.limiter, self.metrics, self.tracer, self.inflight, self.dns_cache
+                )
+            return self._sessions[provider]
+
+    def breakers(self):
+        with self._lock:
+            return {provider: session.breaker for provider, session in self._sessions.items()}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class LogWriter:
+    """Writes log lines from a background thread in batches.
+
+    Lines are queued (the queue is bounded, so a stalled disk slows callers
+    down instead of eating memory) and written out when flush_bytes have
+    piled up or flush_interval seconds have passed, whichever comes first.
+    In sync mode every write is written and flushed before returning.
+    """
+
+    def __init__(
+        self, sync=False, flush_interval=0.5, flush_bytes=64 * 1024, max_queue=10_000, tracer=None
+    ):
+        self.sync = sync
+        self.tracer = tracer or Tracer()
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        if not sync:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, file, text):
+        if self.sync:
+            with self._lock, self.tracer.span("log write", "log"):
+                file.write(text)
+                file.flush()
+        else:
+            self._queue.put((file, text))
+
+    def close_file(self, file):
+        """Close file once everything queued for it has been written."""
+        if self.sync:
+            with self._lock:
+                file.close()
+        else:
+            self._queue.put((file, None))
+
+    def flush(self):
+        """Block until everything queued so far is on disk."""
+        if self._thread and self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put((None, done))
+            done.wait()
+
+    def close(self):
+        if self._thread and self._thread.is_alive():
+            self._queue.put((None, None))
+            self._thread.join()
+
+    def _run(self):
+        pending = {}
+        pending_bytes = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                file, item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                file, item = None, False
+
+            if file is not None and isinstance(item, str):
+                pending.setdefault(file, []).append(item)
+                pending_bytes += len(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if pending_bytes < self.flush_bytes:
+                    continue
+
+            # Size or time threshold reached, or a flush/close/stop request
+            self._write_pending(pending)
+            pending = {}
+            pending_bytes = 0
+            deadline = None
+
+            if file is not None and item is None:
+                file.close()
+            elif file is None and item is None:
+                return
+            elif isinstance(item, threading.Event):
+                item.set()
+
+    def _write_pending(self, pending):
+        for file, chunks in pending.items():
+            try:
+                with self.tracer.span("log write", "log", lines=len(chunks)):
+                    file.write("".join(chunks))
+                    file.flush()
+            except (OSError, ValueError) as e:
+                sys.__stderr__.write(f"Log write failed: {e}\n")
+
+
+class ThreadLocalStdout:
+    """sys.stdout stand-in that lets each thread capture its own output.
+
+    redirect_stdout swaps the process-wide stream, so two modules running at
+    the same time would write into each other's buffers. Writes go to the
+    calling thread's capture buffer if it has one, otherwise to the real
+    stream. A capture with tee=True also passes them on to the real stream
+    as they are written.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self, tee=False):
+        previous = getattr(self._local, "buffer", None), getattr(self._local, "tee", False)
+        buffer = StringIO()
+        self._local.buffer, self._local.tee = buffer, tee
+        try:
+            yield buffer
+        finally:
+            self._local.buffer, self._local.tee = previous
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self._stream.write(text)
+        if self._local.tee:
+            self._stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None or self._local.tee:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class InvestigationGraph:
+    """Session graph shared by all modules: a networkx DiGraph.
+
+    Modules may run on several worker threads at once, so mutations are
+    serialized to keep networkx's adjacency dicts consistent. Listeners are
+    called as listener(kind, key, attrs) for every node or edge that is
+    added or whose attributes change.
+
+    Every such change also gets a monotonic sequence number, so
+    changes_since(checkpoint) can return just the nodes and edges touched
+    after an earlier checkpoint without scanning the graph.
+
+    nodes_by_type and edges_by_label are secondary indexes kept up to date
+    on insert, so queries by type or label never scan the whole graph.
+
+    nx.DiGraph is mixed in when the first graph is created, so networkx is
+    only imported by sessions that build a graph.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if not issubclass(cls, nx.DiGraph):
+            cls = lazy_subclass(cls, nx.DiGraph)
+        return object.__new__(cls)
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.seq = 0
+        self.node_seq = {}
+        self.edge_seq = {}
+        self.changes = []  # (seq, kind, key), ascending seq
+        self.nodes_by_type = {}  # type -> {node}
+        self.edges_by_label = {}  # label -> {(src, dst)}
+        self.tracer = Tracer()
+        super().__init__(incoming_graph_data, **attr)
+
+    def add_node(self, node_for_adding, **attr):
+        with self.lock, self.tracer.span("graph add_node", "graph"):
+            current = self._node.get(node_for_adding)
+            if current is not None and all(current.get(k) == v for k, v in attr.items()):
+                return
+            old_type = current.get("type") if current else None
+            super().add_node(node_for_adding, **attr)
+            self._reindex(self.nodes_by_type, node_for_adding, old_type, attr.get("type", old_type))
+            self._touch("node", node_for_adding)
+            self._notify("node", node_for_adding, self._node[node_for_adding])
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        with self.lock, self.tracer.span("graph add_edge", "graph"):
+            for node in (u_of_edge, v_of_edge):
+                if node not in self._node:
+                    self.add_node(node)
+            old_label = self._adj[u_of_edge].get(v_of_edge, {}).get("label")
+            super().add_edge(u_of_edge, v_of_edge, **attr)
+            self._reindex(
+                self.edges_by_label,
+                (u_of_edge, v_of_edge),
+                old_label,
+                attr.get("label", old_label),
+            )
+            self._touch("edge", (u_of_edge, v_of_edge))
+            self._notify("edge", (u_of_edge, v_of_edge), self._adj[u_of_edge][v_of_edge])
+
+    def _notify(self, kind, key, attrs):
+        for listener in self.listeners:
+            listener(kind, key, attrs)
+
+    @staticmethod
+    def _reindex(index, key, old_value, new_value):
+        if old_value == new_value and old_value is not None:
+            index[old_value].add(key)
+            return
+        if old_value is not None:
+            index[old_value].discard(key)
+        if new_value is not None:
+            index.setdefault(new_value, set()).add(key)
+
+    def _touch(self, kind, key):
+        self.seq += 1
+        (self.node_seq if kind == "node" else self.edge_seq)[key] = self.seq
+        self.changes.append((self.seq, kind, key))
+        # Drop superseded entries once they outnumber the live ones
+        if len(self.changes) > 2 * (len(self.node_seq) + len(self.edge_seq)) + 1024:
+            self.changes = sorted(
+                [(seq, "node", k) for k, seq in self.node_seq.items()]
+                + [(seq, "edge", k) for k, seq in self.edge_seq.items()],
+                key=lambda change: change[0],
+            )
+
+    def changes_since(self, checkpoint):
+        """Return (nodes, edges, new_checkpoint) for changes after checkpoint."""
+        with self.lock:
+            start = bisect.bisect_right(self.changes, checkpoint, key=lambda change: change[0])
+            nodes, edges = [], []
+            for seq, kind, key in self.changes[start:]:
+                if kind == "node":
+                    if self.node_seq.get(key) == seq:
+                        nodes.append((key, dict(self._node[key])))
+                elif self.edge_seq.get(key) == seq:
+                    u, v = key
+                    edges.append((u, v, dict(self._adj[u][v])))
+            return nodes, edges, self.seq
+
+    # Snapshot restores write networkx's adjacency dicts directly: the
+    # generic add_*_from methods validate every item and dominate load time
+    # on large graphs.
+
+    def restore_nodes(self, nodes):
+        """Bulk-add (node, attrs) pairs from a snapshot without notifying listeners."""
+        with self.lock:
+            node_attrs, succ, pred = self._node, self._succ, self._pred
+            for node, attrs in nodes:
+                if node in node_attrs:
+                    old_type = node_attrs[node].get("type")
+                    node_attrs[node].update(attrs)
+                    self._reindex(self.nodes_by_type, node, old_type, attrs.get("type", old_type))
+                else:
+                    self._reindex(self.nodes_by_type, node, None, attrs.get("type"))
+                    node_attrs[node] = attrs
+                    succ[node] = {}
+                    pred[node] = {}
+                self._touch("node", node)
+            self._clear_view_cache()
+
+    def restore_edges(self, edges):
+        """Bulk-add (src, dst, attrs) triples between restored nodes."""
+        with self.lock:
+            succ, pred = self._succ, self._pred
+            for u, v, attrs in edges:
+                current = succ[u].get(v)
+                if current is None:
+                    succ[u][v] = pred[v][u] = attrs
+                    self._reindex(self.edges_by_label, (u, v), None, attrs.get("label"))
+                else:
+                    old_label = current.get("label")
+                    current.update(attrs)
+                    self._reindex(
+                        self.edges_by_label, (u, v), old_label, attrs.get("label", old_label)
+                    )
+                self._touch("edge", (u, v))
+            self._clear_view_cache()
+
+    # ─── Queries ──────────────────────────────────────────
+    # Relationships are explored in both directions: "within 2 hops" should
+    # not depend on which module happened to add the edge.
+
+    def neighborhood(self, node, depth=1):
+        """Return {node: hops} for nodes within depth hops of node."""
+        with self.lock:
+            seen = {node: 0}
+            frontier = [node]
+            for hops in range(1, depth + 1):
+                next_frontier = []
+                for current in frontier:
+                    for neighbor in (*self._succ[current], *self._pred[current]):
+                        if neighbor not in seen:
+                            seen[neighbor] = hops
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+            return seen
+
+    def path(self, source, target):
+        """Shortest path between two nodes ignoring direction, or None."""
+        with self.lock:
+            try:
+                return nx.shortest_path(self.to_undirected(as_view=True), source, target)
+            except nx.NetworkXNoPath:
+                return None
+
+    def pivot(self, node_type, anchor=None, depth=2):
+        """Nodes of node_type, optionally only those within depth hops of anchor."""
+        with self.lock:
+            typed = self.nodes_by_type.get(node_type, set())
+            if anchor is None:
+                return {node: None for node in typed}
+            nearby = self.neighborhood(anchor, depth)
+            if len(typed) < len(nearby):
+                return {node: nearby[node] for node in typed if node in nearby and node != anchor}
+            return {node: hops for node, hops in nearby.items() if node in typed and node != anchor}
+
+    def shared(self, label, min_sources=2):
+        """Return {dst: [sources]} for label edges whose dst has min_sources or more sources."""
+        with self.lock:
+            sources = {}
+            for src, dst in self.edges_by_label.get(label, ()):
+                sources.setdefault(dst, []).append(src)
+        return {
+            dst: sorted(map(str, srcs))
+            for dst, srcs in sources.items()
+            if len(srcs) >= min_sources
+        }
+
+    def _clear_view_cache(self):
+        cache = getattr(self, "__networkx_cache__", None)
+        if cache:
+            cache.clear()
+
+
+def write_graph_snapshot(path, graph, results):
+    """Write the graph and module results to a compressed, versioned snapshot.
+
+    Layout: GRAPH_MAGIC, a uint16 format version, then a gzip stream of
+    frames. Each frame is a one-byte kind (N nodes, E edges, R results), a
+    uint32 payload length and a JSON list of up to GRAPH_CHUNK_SIZE records.
+    Edges refer to nodes by their position in the node frames, so each node
+    id is stored once.
+    """
+    import gzip
+    import struct
+
+    with graph.lock:
+        nodes = [(node, dict(attrs)) for node, attrs in graph.nodes(data=True)]
+        edges = [(u, v, dict(attrs)) for u, v, attrs in graph.edges(data=True)]
+    positions = {node: i for i, (node, _) in enumerate(nodes)}
+
+    def write_frames(f, kind, records):
+        records = iter(records)
+        while True:
+            chunk = [record for _, record in zip(range(GRAPH_CHUNK_SIZE), records)]
+            if not chunk:
+                return
+            payload = json.dumps(chunk, separators=(",", ":"), default=str).encode()
+            f.write(kind + struct.pack("<I", len(payload)) + payload)
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as raw:
+        raw.write(GRAPH_MAGIC + struct.pack("<H", GRAPH_FORMAT_VERSION))
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            write_frames(f, b"N", ([node, attrs] for node, attrs in nodes))
+            write_frames(
+                f, b"E", ([positions[u], positions[v], attrs] for u, v, attrs in edges)
+            )
+            write_frames(
+                f,
+                b"R",
+                ([target, module, output] for (target, module), output in results.items()),
+            )
+    os.replace(tmp_path, path)
+    return len(nodes), len(edges)
+
+
+def read_graph_snapshot(path):
+    """Yield (kind, records) frames from a snapshot written by write_graph_snapshot."""
+    import gzip
+    import struct
+
+    with open(path, "rb") as raw:
+        header = raw.read(len(GRAPH_MAGIC) + 2)
+        if not header.startswith(GRAPH_MAGIC) or len(header) != len(GRAPH_MAGIC) + 2:
+            raise ValueError(f"{path.name} is not a graph snapshot")
+        (version,) = struct.unpack("<H", header[len(GRAPH_MAGIC) :])
+        if version > GRAPH_FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph snapshot version {version}")
+        with gzip.GzipFile(fileobj=raw, mode="rb") as f:
+            while True:
+                head = f.read(5)
+                if not head:
+                    return
+                (length,) = struct.unpack("<I", head[1:])
+                yield head[:1], json.loads(f.read(length))
+
+
+def restore_graph_snapshot(path, graph, results):
+    """Merge a snapshot into graph and results one frame at a time."""
+    names = []
+    for kind, records in read_graph_snapshot(path):
+        if kind == b"N":
+            names.extend(node for node, _ in records)
+            graph.restore_nodes(records)
+        elif kind == b"E":
+            graph.restore_edges((names[u], names[v], attrs) for u, v, attrs in records)
+        elif kind == b"R":
+            for target, module, output in records:
+                results[(target, module)] = output
+    return len(names)
+
+
+# ─── Graph export ─────────────────────────────────────────
+# Writers stream (node, attrs) and (src, dst, attrs) iterables straight to
+# the file, so output size is never held in memory.
+
+
+def dot_quote(value):
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return '"' + text.replace("\n", "\\n").replace("\r", "") + '"'
+
+
+def write_dot(f, nodes, edges):
+    f.write("digraph G {\n")
+    f.write("  rankdir=LR;\n")  # Left to right layout
+    f.write('  node [style=filled, fontname="Helvetica"];\n')
+    for node, attrs in nodes:
+        shape, color = NODE_STYLES.get(attrs.get("type"), DEFAULT_NODE_STYLE)
+        quoted = dot_quote(node)
+        f.write(f'  {quoted} [label={quoted}, shape={shape}, fillcolor="{color}"];\n')
+    for src, dst, attrs in edges:
+        label = attrs.get("label", "")
+        timestamp = attrs.get("timestamp", "")
+        edge_label = f"{label} ({timestamp})" if timestamp else label
+        f.write(f"  {dot_quote(src)} -> {dot_quote(dst)} [label={dot_quote(edge_label)}];\n")
+    f.write("}\n")
+
+
+def write_graphml(f, nodes, edges):
+    from xml.sax.saxutils import escape as xml_escape, quoteattr
+
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    f.write('  <key id="type" for="node" attr.name="type" attr.type="string"/>\n')
+    f.write('  <key id="label" for="edge" attr.name="label" attr.type="string"/>\n')
+    f.write('  <key id="timestamp" for="edge" attr.name="timestamp" attr.type="string"/>\n')
+    f.write('  <graph id="G" edgedefault="directed">\n')
+    for node, attrs in nodes:
+        f.write(f"    <node id={quoteattr(str(node))}>")
+        if attrs.get("type") is not None:
+            f.write(f'<data key="type">{xml_escape(str(attrs["type"]))}</data>')
+        f.write("</node>\n")
+    for src, dst, attrs in edges:
+        f.write(f"    <edge source={quoteattr(str(src))} target={quoteattr(str(dst))}>")
+        for key in ("label", "timestamp"):
+            if attrs.get(key) is not None:
+                f.write(f'<data key="{key}">{xml_escape(str(attrs[key]))}</data>')
+        f.write("</edge>\n")
+    f.write("  </graph>\n</graphml>\n")
+
+
+def write_gexf(f, nodes, edges):
+    from xml.sax.saxutils import quoteattr
+
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<gexf xmlns="http://gexf.net/1.3" version="1.3">\n')
+    f.write('  <graph defaultedgetype="directed" mode="static">\n')
+    f.write('    <attributes class="node"><attribute id="0" title="type" type="string"/></attributes>\n')
+    f.write('    <attributes class="edge"><attribute id="0" title="timestamp" type="string"/></attributes>\n')
+    f.write("    <nodes>\n")
+    for node, attrs in nodes:
+        quoted = quoteattr(str(node))
+        f.write(f"      <node id={quoted} label={quoted}>")
+        if attrs.get("type") is not None:
+            f.write(
+                f'<attvalues><attvalue for="0" value={quoteattr(str(attrs["type"]))}/></attvalues>'
+            )
+        f.write("</node>\n")
+    f.write("    </nodes>\n    <edges>\n")
+    for i, (src, dst, attrs) in enumerate(edges):
+        f.write(
+            f'      <edge id="{i}" source={quoteattr(str(src))} target={quoteattr(str(dst))}'
+            f" label={quoteattr(str(attrs.get('label', '')))}>"
+        )
+        if attrs.get("timestamp") is not None:
+            f.write(
+                f'<attvalues><attvalue for="0" value={quoteattr(str(attrs["timestamp"]))}/></attvalues>'
+            )
+        f.write("</edge>\n")
+    f.write("    </edges>\n  </graph>\n</gexf>\n")
+
+
+def write_jsonl(f, nodes, edges):
+    for node, attrs in nodes:
+        f.write(json.dumps({"kind": "node", "id": node, "attrs": attrs}, default=str) + "\n")
+    for src, dst, attrs in edges:
+        f.write(
+            json.dumps({"kind": "edge", "src": src, "dst": dst, "attrs": attrs}, default=str)
+            + "\n"
+        )
+
+
+GRAPH_WRITERS = {
+    "dot": write_dot,
+    "graphml": write_graphml,
+    "gexf": write_gexf,
+    "jsonl": write_jsonl,
+}
+GRAPH_EXTENSIONS = {".dot": "dot", ".gv": "dot", ".graphml": "graphml", ".gexf": "gexf", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def export_graph(path, fmt, nodes, edges, checkpoint=None):
+    with open(path, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+        GRAPH_WRITERS[fmt](f, nodes, edges)
+        if checkpoint is not None and fmt == "jsonl":
+            # Lets a consumer tailing exports resume from the right place
+            f.write(json.dumps({"kind": "checkpoint", "checkpoint": checkpoint}) + "\n")
+
+
+class EventLog:
+    """Structured JSONL event stream written next to the session log.
+
+    Each line is {"ts", "module", "target", "kind", "payload"}. A sidecar
+    index (<name>.idx.json) maps targets, modules and graph indicators to
+    the byte offsets of their events, so readers can seek straight to them
+    instead of scanning the whole file.
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, path, writer):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx.json")
+        self.writer = writer
+        self.file = open(self.path, "a", encoding="utf-8", newline="\n")
+        self.offset = self.file.tell()
+        self.index = {"targets": {}, "modules": {}, "indicators": {}}
+        self._lock = threading.Lock()
+
+    def emit(self, kind, payload, module=None, target=None):
+        record = {
+            "ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "module": module,
+            "target": target,
+            "kind": kind,
+            "payload": payload,
+        }
+        line = json.dumps(record, default=str, ensure_ascii=False) + "\n"
+        indicators = []
+        if kind == "node":
+            indicators.append(payload["node"])
+        elif kind == "edge":
+            indicators.extend((payload["src"], payload["dst"]))
+
+        with self._lock:
+            offset = self.offset
+            self.offset += len(line.encode("utf-8"))
+            self.writer.write(self.file, line)
+            for section, key in [("targets", target), ("modules", module)] + [
+                ("indicators", indicator) for indicator in indicators
+            ]:
+                if key is not None:
+                    self.index[section].setdefault(str(key), []).append(offset)
+
+    def save_index(self):
+        self.writer.flush()
+        with self._lock:
+            data = {
+                "version": self.INDEX_VERSION,
+                "events": self.path.name,
+                "size": self.offset,
+                **self.index,
+            }
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+
+    def read(self, target=None, module=None, indicator=None):
+        """Yield the events matching all given filters, in file order."""
+        self.writer.flush()
+        with self._lock:
+            selected = None
+            for section, key in (
+                ("targets", target),
+                ("modules", module),
+                ("indicators", indicator),
+            ):
+                if key is None:
+                    continue
+                offsets = set(self.index[section].get(str(key), ()))
+                selected = offsets if selected is None else selected & offsets
+        if selected is None:
+            return
+        with open(self.path, "rb") as f:
+            for offset in sorted(selected):
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def close(self):
+        self.save_index()
+        self.writer.close_file(self.file)
+
+
+# ─── Daemon mode ─────────────────────────────────────────
+
+
+class InvestigationJob:
+    """Graph changes made by one API request, collected from its module threads.
+
+    Fragments are self-contained: every edge comes with both of its
+    endpoints, including nodes that were already in the graph (re-adding
+    an unchanged node notifies no one), unless an earlier fragment of the
+    job already sent them.
+    """
+
+    def __init__(self, target, target_type, graph):
+        self.target = target
+        self.target_type = target_type
+        self.graph = graph
+        self.nodes = {}
+        self.edges = {}
+        self.sent = set()  # nodes sent in earlier fragments
+        self._lock = threading.Lock()
+
+    def add(self, kind, key, attrs):
+        with self._lock:
+            if kind == "node":
+                self.nodes[key] = dict(attrs)
+            else:
+                self.edges[key] = dict(attrs)
+
+    def take(self):
+        """Return the changes since the last call as a graph fragment, or None."""
+        with self._lock:
+            if not self.nodes and not self.edges:
+                return None
+            nodes, edges = self.nodes, self.edges
+            self.nodes = {}
+            self.edges = {}
+            missing = {
+                node for edge in edges for node in edge if node not in nodes and node not in self.sent
+            }
+            self.sent.update(nodes, missing)
+        # Read outside the job lock: graph listeners take the graph lock first
+        with self.graph.lock:
+            for node in missing:
+                nodes[node] = dict(self.graph.nodes[node])
+        return {
+            "nodes": [{"id": node, **attrs} for node, attrs in nodes.items()],
+            "edges": [{"src": src, "dst": dst, **attrs} for (src, dst), attrs in edges.items()],
+        }
+
+
+class GraphRecorder:
+    """Records the graph changes a thread makes while it leads a SingleFlight call.
+
+    Callers that waited on the call get them replayed through sink(kind,
+    key, attrs), so in --serve every coalesced job reports the nodes and
+    edges the shared call produced, not only the job that ran it.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._local = threading.local()
+
+    def start(self):
+        changes = []
+        self._local.__dict__.setdefault("stack", []).append(changes)
+        return changes
+
+    def stop(self, changes):
+        # By identity: a nested call's list can equal its caller's (both empty)
+        stack = self._local.stack
+        del stack[max(i for i, entry in enumerate(stack) if entry is changes)]
+        return changes
+
+    def add(self, kind, key, attrs):
+        for changes in getattr(self._local, "stack", ()):
+            changes.append((kind, key, dict(attrs)))
+
+    def replay(self, changes):
+        for kind, key, attrs in changes:
+            self.sink(kind, key, attrs)
+
+
+class ApiHandler:
+    """Local JSON API for --serve, mixed into http.server.BaseHTTPRequestHandler
+    by IPInvestigatorCLI.serve().
+
+    POST /investigate {"target": ..., "modules": [...], "stream": true}
+        streams NDJSON events (start, result, graph, skipped, done); with
+        "stream": false one JSON document is returned at the end.
+    GET /health, /modules, /metrics
+    """
+
+    server_version = "ip-investigator"
+
+    def do_GET(self):
+        cli = self.server.cli
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, {"status": "ok", "modules": len(cli.modules)})
+        elif path == "/modules":
+            self.send_json(
+                200,
+                {
+                    name: {"targets": module.targets, "help": module.help}
+                    for name, module in cli.modules.items()
+                    if not getattr(module, "interactive", False)
+                },
+            )
+        elif path == "/metrics":
+            body = cli.metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {path}"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path != "/investigate":
+            self.send_json(404, {"error": f"unknown endpoint {path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            target = str(request["target"]).strip()
+            if not target:
+                raise ValueError("empty target")
+            # Raises for inverted ranges; sweeps stay in the CLI, where max_hosts applies
+            if self.server.cli.classify_target(target) == "network":
+                raise ValueError("network targets are not served, send one request per host")
+            names = request.get("modules") or []
+            if isinstance(names, str):
+                names = names.split()
+        except (KeyError, TypeError, ValueError) as e:
+            self.send_json(400, {"error": f"invalid request: {e}"})
+            return
+
+        if not request.get("stream", True):
+            events = []
+            self.server.cli.serve_job(target, names, events.append)
+            self.send_json(200, collect_job_events(events))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        connected = True
+
+        def send(event):
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                self.wfile.write((json.dumps(event, default=str) + "\n").encode())
+                self.wfile.flush()
+            except OSError:
+                connected = False  # client went away; the job still finishes and is logged
+
+        self.server.cli.serve_job(target, names, send)
 
-LOG_DIR = Path(__file__).parent / "log"
-SAVE_DIR = Path(__file__).parent / "saves"
-MODULES_DIR = Path(__file__).parent / "modules"
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
+    def log_message(self, *args):
+        pass
 
-def strip_ansi(text):
-    ansi_escape = re.compile(r"\x1B[@-_][0-?]*[ -/]*[@-~]")
-    return ansi_escape.sub("", text)
+
+def collect_job_events(events):
+    """Fold the event stream of one job into a single result document."""
+    result = {"results": {}, "skipped": {}, "graph": {"nodes": [], "edges": []}}
+    for event in events:
+        kind = event["event"]
+        if kind == "start":
+            result.update(target=event["target"], type=event["type"])
+        elif kind == "result":
+            result["results"][event["module"]] = {
+                key: event[key] for key in ("output", "error", "seconds")
+            }
+        elif kind == "skipped":
+            result["skipped"][event["module"]] = event["reason"]
+        elif kind == "graph":
+            result["graph"]["nodes"].extend(event["nodes"])
+            result["graph"]["edges"].extend(event["edges"])
+        elif kind == "done":
+            result.update({k: v for k, v in event.items() if k != "event"})
+    return result
 
 
 class IPInvestigatorCLI(cmd.Cmd):
     intro = "Welcome to the IP Investigator. Type help or ? to list commands.\n"
     prompt = "[target: none] > "
 
-    def __init__(self):
+    def __init__(self, use_cache=True, sync_log=False, trace_file=None):
+        if not isinstance(sys.stdout, ThreadLocalStdout):
+            sys.stdout = ThreadLocalStdout(sys.stdout)
         super().__init__()
-        self.graph = nx.DiGraph()
+        self.tracer = Tracer(trace_file)
+        self._graph = None  # created on first use, see graph
+        self._graph_lock = threading.Lock()
+        self.metrics = Metrics(tracer=self.tracer)
+        self.metrics_file = None  # Prometheus text file written on exit
+        self.inflight = SingleFlight(self.metrics)  # concurrent duplicate lookups share one call
+        self.cache = ResponseCache(enabled=use_cache, metrics=self.metrics, inflight=self.inflight)
+        # --no-cache bypasses DNS answers too, in process and between sessions
+        self.dns_cache = DnsCache(
+            DNS_CACHE_FILE, metrics=self.metrics, inflight=self.inflight, enabled=use_cache
+        )
+        self.limiter = RateLimiter()
+        self.http = HttpSessions(
+            self.limiter, self.metrics, self.tracer, self.inflight, self.dns_cache
+        )
         self.modules = self.load_modules()
         self.target = None
         self.target_type = None
         self.log_file = None
+        self.writer = LogWriter(sync=sync_log, tracer=self.tracer)
+        atexit.register(self.writer.close)
+        self.context = threading.local()  # per-worker log file in batch mode
+        self.results = {}  # (target, module) -> last output, kept in save files
+        self.export_checkpoint = 0  # graph seq of the last exportgraph
         self.session_log_file = None
         self.session_log_path = None
         self.init_session_log()
         LOG_DIR.mkdir(exist_ok=True)
         SAVE_DIR.mkdir(exist_ok=True)
 
+    def onecmd(self, line):
+        with self.tracer.span(line.strip() or "(empty)", "command"):
+            return super().onecmd(line)
+
     def init_session_log(self):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
         self.session_log_path = LOG_DIR / f"session_{timestamp}.log"
         self.session_log_file = open(self.session_log_path, "a")
+        self.events = EventLog(self.session_log_path.with_suffix(".jsonl"), self.writer)
+        atexit.register(self.events.save_index)
+
+    @property
+    def graph(self):
+        """The session graph, created (and networkx imported) on first use."""
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    graph = InvestigationGraph()
+                    graph.tracer = self.tracer
+                    graph.listeners.append(self.on_graph_change)
+                    self._graph = graph
+        return self._graph
+
+    def emit(self, kind, payload):
+        """Record a structured event for the module and target running in this thread."""
+        self.events.emit(
+            kind,
+            payload,
+            module=getattr(self.context, "module", None),
+            target=getattr(self.context, "target", None) or self.target,
+        )
+
+    def on_graph_change(self, kind, key, attrs):
+        self.job_change(kind, key, attrs)
+        if kind == "node":
+            self.emit("node", {"node": key, "attrs": attrs})
+        else:
+            self.emit("edge", {"src": key[0], "dst": key[1], "attrs": attrs})
+
+    def job_change(self, kind, key, attrs):
+        """Attach a graph change to the --serve job running in this thread."""
+        job = getattr(self.context, "job", None)
+        if job is not None:
+            job.add(kind, key, attrs)
+        if self.inflight.recorder:
+            self.inflight.recorder.add(kind, key, attrs)
+
+    def record_output(self, cmd_name, output, keep=True, target=None):
+        self.log(f"[{cmd_name}] {output}")
+        text = strip_ansi(output).strip()
+        target = target or self.target
+        if keep and target:
+            self.results[(target, cmd_name)] = text
+        if text:
+            self.context.module = cmd_name
+            self.emit("output", {"text": text})
+            self.context.module = None
+
+    def module_error(self, message, heading="Error"):
+        """Print a module's error and mark the module run in this thread as failed.
+
+        Modules call this instead of printing errors themselves, so batch,
+        sweep, run and serve summaries count failures without reading the
+        output. "Nothing found" answers are not errors.
+        """
+        print(f"\033[91m{heading}:\033[0m {message}")
+        self.context.error = str(message) or heading
 
     def load_modules(self):
-        modules = {}
-        for file in os.listdir(MODULES_DIR):
-            if file.endswith(".py") and not file.startswith("__"):
-                module_name = file[:-3]
-                file_path = MODULES_DIR / file
-                try:
-                    spec = importlib.util.spec_from_file_location(
-                        module_name, file_path
-                    )
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-                    cls = getattr(mod, module_name.capitalize(), None)
-                    if cls:
-                        instance = cls()
-                        instance.cli = self  # 👈 Binds main CLI instance to the module
-                        instance.graph = self.graph  # 👈 expose graph to modules
-                        modules[module_name] = instance
-                except Exception as e:
-                    print(f"Failed to load module '{module_name}': {e}")
-        return modules
+        with startup_timer("module manifest"):
+            manifest = load_manifest()
+        return {
+            name: LazyModule(partial(self.import_module, name), attrs)
+            for name, attrs in manifest.items()
+        }
+
+    def import_module(self, module_name):
+        file_path = MODULES_DIR / f"{module_name}.py"
+        try:
+            with startup_timer(f"import modules/{module_name}.py"):
+                spec = importlib.util.spec_from_file_location(module_name, file_path)
+                mod = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(mod)
+                instance = getattr(mod, module_name.capitalize())()
+        except Exception as e:
+            raise RuntimeError(f"Failed to load module '{module_name}': {e}") from e
+        instance.cli = self  # 👈 Binds main CLI instance to the module
+        instance.config = module_config(module_name)  # 👈 settings from <module>.conf
+        instance.graph = self.graph  # 👈 expose graph to modules
+        instance.cache = self.cache  # 👈 shared API response cache
+        instance.http = self.http  # 👈 pooled per-provider HTTP sessions
+        instance.metrics = self.metrics  # 👈 timings for DNS and subprocess calls
+        instance.tracer = self.tracer  # 👈 trace spans (no-op unless --trace)
+        instance.inflight = self.inflight  # 👈 share concurrent identical DNS/API calls
+        instance.dns_cache = self.dns_cache  # 👈 TTL-aware DNS cache shared by all modules
+        return instance
 
     def do_target(self, arg):
         if not arg:
-            print("Usage: target <IP|domain|url>")
+            print("Usage: target <IP|domain|url|CIDR|range>")
+            return
+        try:
+            target_type = self.classify_target(arg)
+        except ValueError as e:
+            print(f"\033[91mError:\033[0m {e}")
             return
         self.target = arg
-        self.target_type = self.classify_target(arg)
+        self.target_type = target_type
         self.prompt = f"[\033[93mtarget\033[0m (\033[96m{self.target_type}\033[0m): \033[97m{self.target}\033[0m] > "
 
         self.init_log_file()
         self.log(f"[target] Target set to {self.target} ({self.target_type})")
+        self.emit("target", {"target": self.target, "type": self.target_type})
 
     def classify_target(self, target):
         if re.match(r"^https?://", target):
             return "url"
-        elif re.match(r"^\d{1,3}(\.\d{1,3}){3}$", target):
+        elif parse_address(target):
             return "ip"
+        elif parse_network(target):
+            return "network"
         else:
             return "domain"
 
     def init_log_file(self):
+        self.log_file_path, self.log_file = self.open_target_log(self.target)
+
+    def open_target_log(self, target):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 
         # Sanitize target for safe filename (no slashes or special chars)
-        safe_target = re.sub(r"[^\w.-]", "_", self.target)
+        safe_target = re.sub(r"[^\w.-]", "_", target)
 
-        self.log_file_path = LOG_DIR / f"{safe_target}_{timestamp}.log"
-        self.log_file = open(self.log_file_path, "a")
+        log_file_path = LOG_DIR / f"{safe_target}_{timestamp}.log"
+        return log_file_path, open(log_file_path, "a")
 
     def log(self, text, module_name=None):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        lines = text.strip().splitlines()
-        for line in lines:
-            clean_line = strip_ansi(line)
-            prefix = f"[{timestamp}]"
-            if module_name:
-                prefix += f" [{module_name}]"
-            formatted_line = f"{prefix} {clean_line}"
-            if self.log_file:
-                self.log_file.write(formatted_line + "\n")
-            if self.session_log_file:
-                self.session_log_file.write(formatted_line + "\n")
-        if self.log_file:
-            self.log_file.flush()
+        log_file = getattr(self.context, "log_file", None) or self.log_file
+        prefix = f"[{timestamp}]"
+        if module_name:
+            prefix += f" [{module_name}]"
+        text = "".join(
+            f"{prefix} {line}\n" for line in strip_ansi(text).strip().splitlines()
+        )
+        if not text:
+            return
+        if log_file:
+            self.writer.write(log_file, text)
         if self.session_log_file:
-            self.session_log_file.flush()
+            self.writer.write(self.session_log_file, text)
 
     def do_exportgraph(self, arg):
+        from concurrent.futures import ThreadPoolExecutor
+
         if not hasattr(self, "graph") or not self.graph:
             print("No graph to export.")
             return
 
-        filename = arg.strip() if arg.strip() else "session_graph.dot"
-        dot_path = Path(filename)
-
-        with open(dot_path, "w") as f:
-            f.write("digraph G {\n")
-            f.write("  rankdir=LR;\n")  # Left to right layout
-            f.write('  node [style=filled, fontname="Helvetica"];\n')
-
-            for node, attrs in self.graph.nodes(data=True):
-                label = node
-                ntype = attrs.get("type", "default")
-                shape = "ellipse"
-                color = "white"
-
-                if ntype == "ip":
-                    shape = "box"
-                    color = "lightblue"
-                elif ntype == "domain":
-                    shape = "ellipse"
-                    color = "lightgreen"
-                elif ntype == "hostname":
-                    shape = "oval"
-                    color = "gold"
-                elif ntype == "cert_subject":
-                    shape = "hexagon"
-                    color = "cyan"
-                elif ntype in ["org", "issuer_org"]:
-                    shape = "diamond"
-                    color = "lightcoral"
-                elif ntype == "port":
-                    shape = "circle"
-                    color = "orange"
-                elif ntype == "san":
-                    shape = "note"
-                    color = "lightgray"
-
-                f.write(
-                    f'  "{node}" [label="{label}", shape={shape}, fillcolor="{color}"];\n'
-                )
+        usage = (
+            "Usage: exportgraph [filename] [--format dot|graphml|gexf|jsonl]"
+            " [--split] [--workers N] [--since <checkpoint>|last]"
+        )
+        parts = shlex.split(arg)
+        filename, fmt, split, workers, since = None, None, False, 4, None
+        try:
+            while parts:
+                part = parts.pop(0)
+                if part == "--format":
+                    fmt = parts.pop(0)
+                elif part == "--since":
+                    since = parts.pop(0)
+                    since = self.export_checkpoint if since == "last" else int(since)
+                elif part == "--split":
+                    split = True
+                elif part == "--workers":
+                    workers = int(parts.pop(0))
+                elif filename is None and not part.startswith("--"):
+                    filename = part
+                else:
+                    raise ValueError(part)
+        except (IndexError, ValueError):
+            print(usage)
+            return
+
+        path = Path(filename or f"session_graph.{fmt or 'dot'}")
+        fmt = fmt or GRAPH_EXTENSIONS.get(path.suffix.lower(), "dot")
+        if fmt not in GRAPH_WRITERS:
+            print(f"Unknown graph format '{fmt}'. {usage}")
+            return
 
-            for src, dst, attrs in self.graph.edges(data=True):
-                label = attrs.get("label", "")
-                timestamp = attrs.get("timestamp", "")
-                edge_label = f"{label} ({timestamp})" if timestamp else label
-                f.write(f'  "{src}" -> "{dst}" [label="{edge_label}"];\n')
+        started = time.monotonic()
+        if since is not None:
+            if split:
+                print("--since cannot be combined with --split.")
+                return
+            nodes, edges, checkpoint = self.graph.changes_since(since)
+            export_graph(path, fmt, nodes, edges, checkpoint)
+            self.export_checkpoint = checkpoint
+            print(
+                f"Graph changes since checkpoint {since} exported to {path} "
+                f"({len(nodes)} nodes, {len(edges)} edges). Checkpoint: {checkpoint}"
+            )
+            return
 
-            f.write("}\n")
+        if not split:
+            with self.graph.lock:
+                nodes = list(self.graph.nodes(data=True))
+                edges = list(self.graph.edges(data=True))
+                checkpoint = self.graph.seq
+            export_graph(path, fmt, nodes, edges, checkpoint)
+            self.export_checkpoint = checkpoint
+            print(
+                f"Graph exported to {path} ({len(nodes)} nodes, {len(edges)} edges, "
+                f"{time.monotonic() - started:.1f}s). Checkpoint: {checkpoint}"
+            )
+            return
 
-        print(f"Graph exported to {dot_path}")
+        # One file per weakly connected component, so each stays small enough
+        # for Graphviz to lay out. Components are written concurrently.
+        with self.graph.lock:
+            components = [
+                (
+                    [(node, self.graph.nodes[node]) for node in component],
+                    list(self.graph.out_edges(component, data=True)),
+                )
+                for component in nx.weakly_connected_components(self.graph)
+            ]
+        components.sort(key=lambda c: len(c[0]), reverse=True)
+        width = len(str(len(components)))
+        paths = [
+            path.with_name(f"{path.stem}.{i:0{width}d}{path.suffix}")
+            for i in range(1, len(components) + 1)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(
+                pool.map(
+                    lambda job: export_graph(job[0], fmt, *job[1]),
+                    zip(paths, components),
+                )
+            )
+        print(
+            f"Graph exported to {len(paths)} component files "
+            f"({paths[0].name} ... {paths[-1].name}, {time.monotonic() - started:.1f}s)"
+        )
 
     def default(self, line):
         parts = line.strip().split()
@@ -191,50 +2668,560 @@ class IPInvestigatorCLI(cmd.Cmd):
             print(f"Unknown command: {cmd_name}")
             return
 
+        # Modes like dnslookup --ptr-all work on the graph, not the target
+        targetless = any(arg in getattr(module, "targetless_args", ()) for arg in args)
+
         # Check if the module requires a target
-        if module.targets:
-            if not self.target:
-                print("Please set a target first using the 'target' command.")
-                return
+        if module.targets and not self.target and not targetless:
+            print("Please set a target first using the 'target' command.")
+            return
 
-            if self.target_type not in module.targets:
-                if self.target_type == "url" and "domain" in module.targets:
-                    parsed = urlparse(self.target)
-                    if parsed.hostname:
-                        print(
-                            f"\033[93mNote:\033[0m Extracted domain '{parsed.hostname}' from URL."
-                        )
-                        target = parsed.hostname
-                    else:
-                        print("Could not extract domain from URL.")
-                        return
-                else:
-                    print(
-                        f"This module does not support targets of type '{self.target_type}'."
-                    )
-                    return
-            else:
-                target = self.target
+        if self.target_type == "network" and self.sweeps(module, args):
+            self.sweep(self.target, [cmd_name], args)
+            return
+
+        if targetless:
+            target = self.target
         else:
+            ok, target = self.module_target(module, self.target, self.target_type)
+            if not ok:
+                return
+
+        # Printed as it is written, so long runs like --brute show hits as they arrive
+        output, _ = self.run_module(cmd_name, module, target, args, live=True)
+        self.record_output(cmd_name, output)
+
+    def module_target(self, module, target, target_type):
+        """Return (ok, target) with the target adapted to what module accepts."""
+        if not module.targets:
             # Modules like history that don't require a target
-            target = self.target  # May still be None
+            return True, target  # May still be None
 
-        # Run the module and capture its output
-        buffer = StringIO()
-        with redirect_stdout(buffer):
+        if target_type in module.targets:
+            return True, target
+
+        if target_type == "url" and "domain" in module.targets:
+            parsed = urlparse(target)
+            if parsed.hostname:
+                print(
+                    f"\033[93mNote:\033[0m Extracted domain '{parsed.hostname}' from URL."
+                )
+                return True, parsed.hostname
+            print("Could not extract domain from URL.")
+            return False, None
+
+        print(f"This module does not support targets of type '{target_type}'.")
+        return False, None
+
+    def run_module(self, cmd_name, module, target, args, live=False):
+        """Run a module and capture its output. Returns (output, error).
+
+        error is set if the module raised or reported one with module_error().
+        With live=True the output is also printed as the module writes it.
+        """
+        error = None
+        self.context.module = cmd_name
+        self.context.error = None
+        started = time.perf_counter()
+        with sys.stdout.capture(tee=live) as buffer, self.tracer.span(
+            f"{cmd_name.capitalize()}.run", "module", target=target
+        ):
             try:
                 module.run(target, args)
             except Exception as e:
                 print(f"Error running {cmd_name}: {e}")
+                error = str(e) or type(e).__name__
+                self.metrics.inc("module_errors_total", module=cmd_name, error=type(e).__name__)
+            else:
+                error = self.context.error
+                if error:
+                    self.metrics.inc("module_errors_total", module=cmd_name, error="reported")
+            finally:
+                self.context.module = None
+                self.context.error = None
+        self.metrics.observe(
+            "module_duration_seconds", time.perf_counter() - started, module=cmd_name
+        )
+        return buffer.getvalue(), error
 
-        output = buffer.getvalue()
-        print(output, end="")
-        self.log(f"[{cmd_name}] {output}")
+    def applicable_modules(self, target_type):
+        """Names of the non-interactive modules that accept target_type."""
+        if target_type == "network":
+            return self.network_modules()
+        return [
+            name
+            for name, mod in self.modules.items()
+            if mod.targets
+            and not getattr(mod, "interactive", False)
+            and (
+                target_type in mod.targets
+                or (target_type == "url" and "domain" in mod.targets)
+            )
+        ]
+
+    def do_run(self, arg):
+        """Run several modules concurrently against the current target."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        if not self.target:
+            print("Please set a target first using the 'target' command.")
+            return
+
+        names = arg.split() or self.applicable_modules(self.target_type)
+        if self.target_type == "network":
+            self.sweep(self.target, names)
+            return
+
+        jobs = []
+        for name in dict.fromkeys(names):
+            module = self.modules.get(name)
+            if not module:
+                print(f"Unknown command: {name}")
+                continue
+            if getattr(module, "interactive", False):
+                print(f"Skipping interactive module '{name}'.")
+                continue
+            with sys.stdout.capture() as note:
+                ok, target = self.module_target(module, self.target, self.target_type)
+            if not ok:
+                print(f"Skipping {name}: {strip_ansi(note.getvalue()).strip()}")
+                continue
+            jobs.append((name, module, target, note.getvalue()))
+
+        if not jobs:
+            return
+
+        def timed_run(name, module, target):
+            started = time.monotonic()
+            output, error = self.run_module(name, module, target, [])
+            return output, error, time.monotonic() - started
+
+        print(f"\033[94mRunning {len(jobs)} module(s):\033[0m {' '.join(j[0] for j in jobs)}")
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [
+                (name, note, pool.submit(timed_run, name, module, target))
+                for name, module, target, note in jobs
+            ]
+            # Results are printed in the requested order as soon as each
+            # module and all modules before it have finished.
+            for name, note, future in futures:
+                output, error, elapsed = future.result()
+                status = "\033[91mfailed\033[0m" if error else f"{elapsed:.1f}s"
+                print(f"\n\033[96m── {name} ({status}) ──\033[0m")
+                print(f"{note}{output}", end="")
+                self.record_output(name, f"{note}{output}")
+        print(f"\n\033[94mAll modules finished in {time.monotonic() - started:.1f}s.\033[0m")
+
+    def do_all(self, _):
+        """Run every module applicable to the current target concurrently."""
+        self.do_run("")
+
+    # ─── Network sweeps ──────────────────────────────────────
+    def sweeps(self, module, args):
+        """Whether module, run with args, is run per host on a network target.
+
+        Target-less and interactive modules, and modes listed in a module's
+        sweep_exempt_args (e.g. dnslookup --ptr-all), are run once as usual.
+        """
+        return (
+            bool(module.targets)
+            and not getattr(module, "interactive", False)
+            and not any(arg in getattr(module, "sweep_exempt_args", ()) for arg in args)
+        )
+
+    def within_max_hosts(self, target):
+        """Print an error and return False if target is larger than max_hosts."""
+        size = network_size(target)
+        limit = provider_setting("network", "max_hosts", NETWORK_DEFAULTS["max_hosts"])
+        if size > limit:
+            print(
+                f"\033[91mError:\033[0m {target} has {size} addresses, more than"
+                f" max_hosts ({limit}) in network.conf."
+            )
+            return False
+        return True
+
+    def network_modules(self):
+        """Modules run once per host on network targets (network.conf: modules)."""
+        configured = provider_setting("network", "modules", ",".join(NETWORK_MODULES))
+        return [
+            name
+            for name in (n.strip() for n in configured.split(","))
+            if name in self.modules
+            and "ip" in self.modules[name].targets
+            and not getattr(self.modules[name], "interactive", False)
+        ]
+
+    def sweep_prefix(self, host, block):
+        """The prefix a host's results are summarized under."""
+        setting = "prefix" if host.version == 4 else "prefix6"
+        prefix = provider_setting("network", setting, NETWORK_DEFAULTS[setting])
+        if block is not None:
+            prefix = max(prefix, block.prefixlen)
+        return ipaddress.ip_network(f"{host}/{prefix}", strict=False)
+
+    def sweep_host(self, host, names, args):
+        """Run names against one host. Returns [(name, hit, error)]."""
+        results = []
+        self.context.target = host
+        try:
+            for name in names:
+                output, error = self.run_module(name, self.modules[name], host, list(args))
+                pattern = SWEEP_HIT_PATTERNS.get(name)
+                hit = not error and (pattern.search(strip_ansi(output)) if pattern else True)
+                # Only hosts that answered are kept in results, so a /16 stays small
+                self.record_output(name, output, keep=bool(hit), target=host)
+                results.append((name, bool(hit), error))
+        finally:
+            self.context.target = None
+        return results
+
+    def sweep(self, target, names, args=()):
+        """Run per-host modules across a CIDR block or range.
+
+        Hosts are generated lazily and at most two per worker are queued,
+        so blocks of any size stream through in constant memory. Hosts where
+        a module found something are printed as they finish, linked to the
+        network node in the graph and summarized per prefix at the end.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        allowed = self.network_modules()
+        jobs = []
+        for name in dict.fromkeys(names):
+            if name not in self.modules:
+                print(f"Unknown command: {name}")
+            elif name not in allowed:
+                print(f"Skipping {name}: not run per host on network targets.")
+            else:
+                jobs.append(name)
+        if not jobs:
+            return
+
+        if not self.within_max_hosts(target):
+            return
+        size = network_size(target)
+        block = parse_network(target)[0]
+        workers = max(1, provider_setting("network", "workers", NETWORK_DEFAULTS["workers"]))
+        prefixes = defaultdict(Counter)  # prefix -> {"hosts": n, module: hits}
+        failures = Counter()
+        done = 0
+
+        def report(future, host):
+            nonlocal done
+            done += 1
+            prefix = prefixes[self.sweep_prefix(host, block)]
+            prefix["hosts"] += 1
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [("sweep", False, str(e))]
+            hits = []
+            for name, hit, error in results:
+                prefix[name] += hit
+                if error:
+                    failures[name] += 1
+                if hit:
+                    hits.append(name)
+            if hits:
+                host = str(host)
+                self.graph.add_node(target, type="network")
+                self.graph.add_node(host, type="ip")
+                self.graph.add_edge(
+                    target, host, label="contains", timestamp=datetime.datetime.now().isoformat()
+                )
+                self.log_graph(f"Added edge: {target} → {host} (label=contains)")
+                print(f"  \033[92m{host:<16}\033[0m {', '.join(hits)}")
+
+        print(
+            f"\033[94mSweeping {target} ({size} address(es)) with {', '.join(jobs)}"
+            f" on {workers} worker(s)\033[0m"
+        )
+        self.log(f"[sweep] Sweeping {target}: {' | '.join(jobs)}")
+        started = time.monotonic()
+        interrupted = False
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            try:
+                for host in network_hosts(target):
+                    if len(pending) >= workers * 2:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            report(future, pending.pop(future))
+                    pending[pool.submit(self.sweep_host, str(host), jobs, args)] = host
+                for future in list(pending):
+                    report(future, pending.pop(future))
+            except KeyboardInterrupt:
+                interrupted = True
+                for future in pending:
+                    future.cancel()
+
+        elapsed = time.monotonic() - started
+        summary = f"Swept {done} host(s) of {target} in {elapsed:.1f}s"
+        if interrupted:
+            summary += " (interrupted)"
+        print(f"\n\033[94m{summary}\033[0m")
+        self.log(f"[sweep] {summary}")
+        print(f"  {'prefix':<24} {'hosts':>7}" + "".join(f" {name:>10}" for name in jobs))
+        for prefix, counts in sorted(prefixes.items()):
+            row = f"  {str(prefix):<24} {counts['hosts']:>7}"
+            row += "".join(f" {counts[name]:>10}" for name in jobs)
+            print(row)
+            self.log(f"[sweep] {prefix}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        if failures:
+            print("\033[91mFailures:\033[0m " + ", ".join(f"{n} {c}" for n, c in failures.most_common()))
+
+    # ─── Daemon mode ─────────────────────────────────────────
+    def serve(self, address=SERVE_ADDRESS, workers=8):
+        """Serve investigation jobs over a local HTTP API until interrupted.
+
+        address is host:port or unix:/path/to/socket. Modules, connection
+        pools and caches stay warm between requests; module runs from all
+        requests share one pool of workers.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        for module in self.modules.values():
+            if isinstance(module, LazyModule):
+                module.load()
+        self.cache.memory_entries = SERVE_MEMORY_CACHE_ENTRIES
+        self.inflight.recorder = GraphRecorder(self.job_change)
+        self.job_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+        import http.server
+        import socketserver
+
+        handler = lazy_subclass(ApiHandler, http.server.BaseHTTPRequestHandler)
+        socket_path = None
+        if address.startswith("unix:"):
+            socket_path = Path(address[len("unix:"):])
+            if socket_path.exists():
+                socket_path.unlink()  # stale socket from an earlier run
+            server = socketserver.ThreadingUnixStreamServer(str(socket_path), handler)
+            server.daemon_threads = True
+            os.chmod(socket_path, 0o600)
+        else:
+            host, _, port = address.rpartition(":")
+            server = http.server.ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+        server.cli = self
+        print(f"\033[94mServing on {address} with {workers} workers. Ctrl-C to stop.\033[0m")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print()
+        finally:
+            server.server_close()
+            self.job_pool.shutdown(wait=True)
+            if socket_path and socket_path.exists():
+                socket_path.unlink()
+
+    def serve_job(self, target, names, send):
+        """Run modules against target on the job pool, calling send(event) as results arrive."""
+        from concurrent.futures import as_completed
+
+        started = time.perf_counter()
+        target_type = self.classify_target(target)
+        job = InvestigationJob(target, target_type, self.graph)
+
+        jobs = []
+        skipped = []
+        for name in dict.fromkeys(names or self.applicable_modules(target_type)):
+            module = self.modules.get(name)
+            if not module or getattr(module, "interactive", False):
+                skipped.append((name, "unknown or interactive module"))
+                continue
+            with sys.stdout.capture() as note:
+                ok, module_target = self.module_target(module, target, target_type)
+            if not ok:
+                skipped.append((name, strip_ansi(note.getvalue()).strip()))
+                continue
+            jobs.append((name, module, module_target))
+
+        send({"event": "start", "target": target, "type": target_type, "modules": [j[0] for j in jobs]})
+        for name, reason in skipped:
+            send({"event": "skipped", "module": name, "reason": reason})
+        _, log_file = self.open_target_log(target)
+
+        def run(name, module, module_target):
+            self.context.log_file = log_file
+            self.context.target = target
+            self.context.job = job
+            run_started = time.perf_counter()
+            try:
+                output, error = self.run_module(name, module, module_target, [])
+                self.record_output(name, output, keep=False)
+            finally:
+                self.context.log_file = None
+                self.context.target = None
+                self.context.job = None
+            return name, output, error, time.perf_counter() - run_started
+
+        failures = 0
+        try:
+            futures = [self.job_pool.submit(run, *j) for j in jobs]
+            for future in as_completed(futures):
+                name, output, error, seconds = future.result()
+                failures += bool(error)
+                send(
+                    {
+                        "event": "result",
+                        "module": name,
+                        "output": strip_ansi(output).strip(),
+                        "error": error,
+                        "seconds": round(seconds, 4),
+                    }
+                )
+                fragment = job.take()
+                if fragment:
+                    send({"event": "graph", **fragment})
+        finally:
+            self.writer.close_file(log_file)
+        send(
+            {
+                "event": "done",
+                "seconds": round(time.perf_counter() - started, 4),
+                "failures": failures,
+            }
+        )
+
+    # ─── Batch mode ──────────────────────────────────────────
+    def investigate(self, target, commands):
+        """Run commands against one target with its own log file.
+
+        Used by batch mode from worker threads, so nothing here touches the
+        interactive target. Returns (target_type, failures) where failures is
+        a list of (command, reason) tuples.
+        """
+        target_type = self.classify_target(target)
+        failures = []
+        _, log_file = self.open_target_log(target)
+        self.context.log_file = log_file
+        self.context.target = target
+        try:
+            self.log(f"[target] Target set to {target} ({target_type})")
+            self.emit("target", {"target": target, "type": target_type})
+            with self.tracer.span(f"investigate {target}", "command"):
+                for line in commands:
+                    parts = line.strip().split()
+                    if not parts:
+                        continue
+                    cmd_name, args = parts[0], parts[1:]
+                    module = self.modules.get(cmd_name)
+                    if not module:
+                        failures.append((cmd_name, "unknown command"))
+                        continue
+
+                    with sys.stdout.capture() as buffer:
+                        ok, module_target = self.module_target(module, target, target_type)
+                    if not ok:
+                        failures.append((cmd_name, strip_ansi(buffer.getvalue()).strip()))
+                        continue
+
+                    output, error = self.run_module(cmd_name, module, module_target, args)
+                    self.record_output(cmd_name, f"{buffer.getvalue()}{output}", keep=False)
+                    if error:
+                        failures.append((cmd_name, error))
+        finally:
+            self.context.log_file = None
+            self.context.target = None
+            self.writer.close_file(log_file)
+        return target_type, failures
+
+    def run_batch(self, lines, commands, workers=8):
+        """Investigate every target in lines using a bounded worker pool.
+
+        Targets are read lazily and at most two per worker are queued, so
+        target lists of any size stream through in constant memory.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        def expand(target):
+            # CIDR blocks and ranges are expanded host by host as the pool drains
+            try:
+                network = self.classify_target(target) == "network"
+            except ValueError:
+                network = False  # investigate() reports it as a failed target
+            if not network:
+                return (target,)
+            if not self.within_max_hosts(target):
+                return ()
+            return map(str, network_hosts(target))
+
+        targets = (line.strip() for line in lines)
+        targets = (t for t in targets if t and not t.startswith("#"))
+        targets = (host for t in targets for host in expand(t))
+        workers = max(1, workers)
+
+        started = time.monotonic()
+        done = 0
+        failed_targets = {}
+        failures_by_module = Counter()
+
+        def report(future, target):
+            nonlocal done
+            done += 1
+            try:
+                target_type, failures = future.result()
+            except Exception as e:
+                target_type, failures = "?", [("batch", str(e))]
+            if failures:
+                failed_targets[target] = failures
+                failures_by_module.update(name for name, _ in failures)
+                status = "\033[91mfailed:\033[0m " + ", ".join(
+                    name for name, _ in failures
+                )
+            else:
+                status = "\033[92mok\033[0m"
+            print(f"[{done}] {target} ({target_type}): {status}")
+
+        self.log(f"[batch] Started batch run: {' | '.join(commands)}")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            for target in targets:
+                if len(pending) >= workers * 2:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        report(future, pending.pop(future))
+                pending[pool.submit(self.investigate, target, commands)] = target
+            for future in list(pending):
+                report(future, pending.pop(future))
+
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        summary = (
+            f"Batch finished: {done} target(s) in {elapsed:.1f}s ({rate:.2f} targets/sec)"
+        )
+        print(f"\n\033[94m{summary}\033[0m")
+        self.log(f"[batch] {summary}")
+
+        if failed_targets:
+            total = sum(failures_by_module.values())
+            print(
+                f"\033[91mFailures:\033[0m {total} across {len(failed_targets)} target(s)"
+            )
+            for name, count in failures_by_module.most_common():
+                print(f"  {name:<12} {count}")
+            for target, failures in list(failed_targets.items())[:20]:
+                for name, reason in failures:
+                    print(f"  {target} [{name}] {reason}")
+            if len(failed_targets) > 20:
+                print(f"  ... and {len(failed_targets) - 20} more target(s)")
+            for target, failures in failed_targets.items():
+                for name, reason in failures:
+                    self.log(f"[batch] Failed: {target} [{name}] {reason}")
+
+        self.events.save_index()
+        if self.graph:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+            self.do_exportgraph(shlex.quote(str(LOG_DIR / f"batch_{timestamp}.dot")))
 
     def do_help(self, arg):
         if not arg:
             print("Available commands:")
-            print("  target <IP|domain|url>")
+            print("  target <IP|domain|url|CIDR|range>")
+            print("  run <module> [module ...]  (run modules concurrently)")
+            print("  all                        (run every applicable module)")
             print("  reload")
             print("  log")
             print("  save")
@@ -242,7 +3229,18 @@ class IPInvestigatorCLI(cmd.Cmd):
             print("  saveas <filename>")
             print("  clearlog")
             print("  listsaves")
-            print("  exportgraph [filename]     (export session graph as .dot)")
+            print("  exportgraph [filename] [--format dot|graphml|gexf|jsonl] [--split]")
+            print("  exportgraph <file> --since <checkpoint>|last  (only changes since)")
+            print("  neighbors [node] [depth]   (nodes within depth hops)")
+            print("  path [source] <dest>       (shortest path between nodes)")
+            print("  pivot <type> [node|*] [depth]  (nodes of a type near a node)")
+            print("  expand [node] [--depth N] [--max-nodes N] [--budget N] [--workers N]")
+            print("  shared <label> [min]       (edge targets shared by several nodes)")
+            print("  cache [stats|clear [provider|dns]]")
+            print("  quota                      (rate limits and remaining API quota)")
+            print("  stats [prometheus [file]|reset]")
+            print("  events [module|*] [target] (structured events for a target)")
+            print("  results [module]           (module output kept in save files)")
             print("  help <module>")
             print("\nAvailable modules:")
             for name, mod in self.modules.items():
@@ -257,13 +3255,465 @@ class IPInvestigatorCLI(cmd.Cmd):
             else:
                 print(f"No help available for '{arg}'")
 
+    # ─── Graph queries ───────────────────────────────────────
+    QUERY_LIMIT = 200
+
+    def graph_node(self, name):
+        """Return name if it is a node in the graph, printing an error otherwise."""
+        if name in self.graph:
+            return name
+        print(f"\033[91mError:\033[0m '{name}' is not in the graph.")
+        return None
+
+    def print_nodes(self, nodes):
+        """Print {node: hops} sorted by distance, capped at QUERY_LIMIT lines."""
+        ordered = sorted(nodes.items(), key=lambda item: (item[1] or 0, str(item[0])))
+        for node, hops in ordered[: self.QUERY_LIMIT]:
+            ntype = self.graph.nodes[node].get("type", "-")
+            distance = f"{hops} hop(s)  " if hops is not None else ""
+            print(f"  {distance}\033[96m{ntype:<14}\033[0m {node}")
+        if len(ordered) > self.QUERY_LIMIT:
+            print(f"  ... and {len(ordered) - self.QUERY_LIMIT} more")
+
+    def do_neighbors(self, arg):
+        """neighbors [node] [depth]: nodes within depth hops (default: target, 1)."""
+        parts = shlex.split(arg)
+        depth = int(parts.pop()) if parts and parts[-1].isdigit() else 1
+        node = self.graph_node(parts[0] if parts else self.target)
+        if node is None:
+            return
+        nodes = self.graph.neighborhood(node, depth)
+        del nodes[node]
+        print(f"\033[94m{len(nodes)} node(s) within {depth} hop(s) of {node}:\033[0m")
+        self.print_nodes(nodes)
+
+    def do_path(self, arg):
+        """path [source] <destination>: shortest path between two nodes."""
+        parts = shlex.split(arg)
+        if not parts or len(parts) > 2:
+            print("Usage: path [source] <destination>")
+            return
+        if len(parts) == 1:
+            parts.insert(0, self.target)
+        source, destination = (self.graph_node(p) for p in parts)
+        if source is None or destination is None:
+            return
+        path = self.graph.path(source, destination)
+        if path is None:
+            print(f"No path between {source} and {destination}.")
+            return
+        steps = [str(path[0])]
+        for u, v in zip(path, path[1:]):
+            if self.graph.has_edge(u, v):
+                steps.append(f"-[{self.graph.edges[u, v].get('label', '')}]-> {v}")
+            else:
+                steps.append(f"<-[{self.graph.edges[v, u].get('label', '')}]- {v}")
+        print(" ".join(steps))
+
+    def do_pivot(self, arg):
+        """pivot <type> [node|*] [depth]: nodes of a type near a node (default: target, 2)."""
+        parts = shlex.split(arg)
+        if not parts:
+            types = ", ".join(f"{t} ({len(n)})" for t, n in sorted(self.graph.nodes_by_type.items()) if n)
+            print(f"Usage: pivot <type> [node|*] [depth]\nNode types: {types or 'none'}")
+            return
+        node_type = parts.pop(0)
+        depth = int(parts.pop()) if parts and parts[-1].isdigit() else 2
+        anchor = parts[0] if parts else self.target
+        if anchor == "*" or anchor is None:
+            anchor = None
+        elif self.graph_node(anchor) is None:
+            return
+        nodes = self.graph.pivot(node_type, anchor, depth)
+        where = f" within {depth} hop(s) of {anchor}" if anchor is not None else ""
+        print(f"\033[94m{len(nodes)} {node_type} node(s){where}:\033[0m")
+        self.print_nodes(nodes)
+
+    def do_shared(self, arg):
+        """shared <label> [min]: edge targets reached from at least min sources."""
+        parts = shlex.split(arg)
+        if not parts:
+            labels = ", ".join(sorted(l for l, e in self.graph.edges_by_label.items() if e))
+            print(f"Usage: shared <edge label> [min sources]\nEdge labels: {labels or 'none'}")
+            return
+        min_sources = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 2
+        shared = self.graph.shared(parts[0], min_sources)
+        if not shared:
+            print(f"No '{parts[0]}' targets shared by {min_sources} or more nodes.")
+            return
+        ordered = sorted(shared.items(), key=lambda item: -len(item[1]))
+        for dst, sources in ordered[: self.QUERY_LIMIT]:
+            print(f"\033[93m{dst}\033[0m ← {len(sources)}: {', '.join(sources)}")
+        if len(ordered) > self.QUERY_LIMIT:
+            print(f"... and {len(ordered) - self.QUERY_LIMIT} more")
+
+    def expand_candidate(self, node, node_type):
+        """Return (target, target_type) if a graph node can be investigated, else None."""
+        if node_type not in EXPAND_NODE_TYPES:
+            return None
+        value = str(node).strip()
+        if node_type == "mx":
+            value = value.split()[-1] if value else value  # "10 mail.example.com."
+        value = value.rstrip(".")
+        if not value or "*" in value or " " in value:
+            return None
+        try:
+            target_type = self.classify_target(value)
+        except ValueError:
+            return None
+        if target_type != EXPAND_NODE_TYPES[node_type]:
+            return None
+        return value, target_type
+
+    def expand_run(self, name, target):
+        self.context.target = target
+        try:
+            output, error = self.run_module(name, self.modules[name], target, [])
+            self.record_output(name, output, target=target)
+        finally:
+            self.context.target = None
+        return error
+
+    def do_expand(self, arg):
+        """Pivot breadth-first from a node, running modules on everything it finds.
+
+        expand [node] [--depth N] [--max-nodes N] [--budget N] [--workers N]
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        usage = "Usage: expand [node] [--depth N] [--max-nodes N] [--budget N] [--workers N]"
+        options = {key: provider_setting("expand", key, value) for key, value in EXPAND_DEFAULTS.items()}
+        start = None
+        parts = shlex.split(arg)
+        try:
+            while parts:
+                part = parts.pop(0)
+                if part.startswith("--") and part[2:].replace("-", "_") in options:
+                    options[part[2:].replace("-", "_")] = int(parts.pop(0))
+                elif start is None and not part.startswith("--"):
+                    start = part
+                else:
+                    raise ValueError(part)
+        except (IndexError, ValueError):
+            print(usage)
+            return
+        start = start or self.target
+        if not start:
+            print("Please set a target first using the 'target' command, or name a node.")
+            return
+
+        modules_for = {}
+        for target_type, names in EXPAND_MODULES.items():
+            configured = provider_setting("expand", target_type, ",".join(names)).split(",")
+            modules_for[target_type] = [
+                name.strip() for name in configured if name.strip() in self.modules
+            ]
+
+        def api_requests():
+            responses = self.metrics.counter_totals("http_responses_total", "provider")
+            return sum(count for provider, count in responses.items() if provider != "webrequest")
+
+        try:
+            start_type = self.classify_target(start)
+        except ValueError as e:
+            print(f"\033[91mError:\033[0m {e}")
+            print(usage)
+            return
+        if start_type not in modules_for:
+            print(f"Cannot expand from '{start}': expand starts from an IP or domain, not a {start_type}.")
+            return
+        first = self.expand_candidate(start, start_type)
+        if not first:
+            print(f"Cannot expand from '{start}'.")
+            return
+        visited = {first[0]}
+        frontier = [(start, *first)]  # (graph node, target, target type)
+        spent_before = api_requests()
+        nodes_before, edges_before = len(self.graph), self.graph.number_of_edges()
+        started = time.monotonic()
+        runs = failures = 0
+        stop = None  # why expansion ended early
+        full = False  # node limit reached: finish this level, then stop
+        workers = max(1, options["workers"])
+        self.log(f"[expand] Expanding from {start}: {options}")
+
+        try:
+            for depth in range(options["depth"] + 1):
+                tasks = []
+                for _, target, target_type in frontier:
+                    for name in modules_for.get(target_type, []):
+                        with sys.stdout.capture():
+                            ok, _ = self.module_target(self.modules[name], target, target_type)
+                        if ok:
+                            tasks.append((name, target))
+                print(
+                    f"\033[94m[depth {depth}]\033[0m {len(frontier)} node(s),"
+                    f" {len(tasks)} module run(s)"
+                )
+
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    pending = {}
+                    remaining = iter(tasks)
+                    done = 0
+                    exhausted = False
+                    while True:
+                        while len(pending) < workers and not exhausted:
+                            task = next(remaining, None)
+                            if task is None:
+                                break
+                            if api_requests() - spent_before >= options["budget"]:
+                                stop = f"API budget of {options['budget']} requests reached"
+                                exhausted = True
+                                break
+                            pending[pool.submit(self.expand_run, *task)] = task
+                        if not pending:
+                            break
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            name, target = pending.pop(future)
+                            done += 1
+                            runs += 1
+                            try:
+                                error = future.result()
+                            except Exception as e:
+                                error = str(e)
+                            failures += bool(error)
+                            status = f"\033[91m{error}\033[0m" if error else "\033[92mok\033[0m"
+                            print(f"  [{done}/{len(tasks)}] {name} {target}: {status}")
+
+                if exhausted or full or depth == options["depth"]:
+                    break
+
+                # Next level: unvisited neighbors of this level's nodes
+                next_frontier = []
+                with self.graph.lock:
+                    for node, target, _ in frontier:
+                        for source in dict.fromkeys((node, target)):
+                            if source not in self.graph:
+                                continue
+                            for neighbor in (*self.graph._succ[source], *self.graph._pred[source]):
+                                candidate = self.expand_candidate(
+                                    neighbor, self.graph.nodes[neighbor].get("type")
+                                )
+                                if not candidate or candidate[0] in visited or full:
+                                    continue
+                                if len(visited) >= options["max_nodes"]:
+                                    full = True
+                                    stop = f"node limit of {options['max_nodes']} reached"
+                                    continue
+                                visited.add(candidate[0])
+                                next_frontier.append((neighbor, *candidate))
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+        except KeyboardInterrupt:
+            stop = "interrupted"
+
+        summary = (
+            f"Expanded {len(visited)} node(s): {runs} module run(s), {failures} failed,"
+            f" {api_requests() - spent_before} API request(s),"
+            f" +{len(self.graph) - nodes_before} nodes / +{self.graph.number_of_edges() - edges_before} edges"
+            f" in {time.monotonic() - started:.1f}s"
+        )
+        print(f"\n\033[94m{summary}\033[0m")
+        if stop:
+            print(f"\033[93mStopped:\033[0m {stop}")
+        self.log(f"[expand] {summary}" + (f" (stopped: {stop})" if stop else ""))
+
+    def do_quota(self, _):
+        """Show remaining rate-limit tokens and provider-reported quotas."""
+        status = self.limiter.status()
+        breakers = self.http.breakers()
+        for provider, breaker in breakers.items():
+            if breaker.state != "closed":
+                status.setdefault(provider, {})
+        if not status:
+            print("No rate limits configured.")
+            return
+        print("\033[94mProvider quotas:\033[0m")
+        for provider, buckets in status.items():
+            parts = [
+                f"{key.replace('rate_per_', '')} {max(tokens, 0):.0f}/{capacity:g}"
+                for key, (tokens, capacity) in buckets.items()
+            ]
+            print(f"  {provider:<12} {'   '.join(parts) or 'no local limit'}")
+            reported = self.limiter.reported.get(provider)
+            if reported:
+                reset = reported["reset"]
+                when = (
+                    datetime.datetime.fromtimestamp(reset).strftime("%H:%M:%S")
+                    if reset
+                    else "unknown"
+                )
+                print(
+                    f"  {'':<12} reported: {reported['remaining']}/{reported['limit'] or '?'}"
+                    f" remaining, resets {when}"
+                )
+            paused = self.limiter.paused_until.get(provider, 0) - time.time()
+            if paused > 0:
+                print(f"  {'':<12} \033[93mpaused for {paused:.0f}s\033[0m")
+            breaker = breakers.get(provider)
+            if breaker and breaker.state != "closed":
+                print(
+                    f"  {'':<12} \033[91mcircuit {breaker.state}"
+                    f" after {breaker.failures} failures\033[0m"
+                )
+            if self.limiter.waited[provider]:
+                print(f"  {'':<12} queued {self.limiter.waited[provider]:.1f}s this session")
+
+    def print_latency_table(self, title, name, by, errors=None):
+        histograms = self.metrics.histogram_totals(f"{name}_duration_seconds", by)
+        if not histograms:
+            return
+        errors = self.metrics.counter_totals(errors or f"{name}_errors_total", by)
+        print(f"\033[94m{title}:\033[0m")
+        print(f"  {by:<14} {'calls':>7} {'errors':>7} {'mean':>8} {'p95':>8} {'total':>9}")
+        for key, (counts, total, count) in sorted(
+            histograms.items(), key=lambda item: -item[1][1]
+        ):
+            p95 = self.metrics.quantile(counts, count, 0.95)
+            p95 = f">{self.metrics.buckets[-1]}s" if p95 == float("inf") else f"{p95:g}s"
+            print(
+                f"  {str(key):<14} {count:>7} {errors[key]:>7} {total / count:>7.3f}s"
+                f" {p95:>8} {total:>8.1f}s"
+            )
+
+    def do_stats(self, arg):
+        """Show module, HTTP, DNS, subprocess and cache metrics.
+
+        stats                      summary tables
+        stats prometheus [file]    Prometheus text format (to a file or the screen)
+        stats reset                start counting from zero
+        """
+        args = arg.split()
+        if args and args[0] == "reset":
+            self.metrics.reset()
+            print("Metrics reset.")
+            return
+        if args and args[0] == "prometheus":
+            if len(args) > 1:
+                self.metrics.write_prometheus(args[1])
+                print(f"Metrics written to {args[1]}")
+            else:
+                print(self.metrics.prometheus(), end="")
+            return
+        if args:
+            print("Usage: stats [prometheus [file]|reset]")
+            return
+        if not self.metrics.histograms and not self.metrics.counters:
+            print("No metrics recorded yet.")
+            return
+
+        self.print_latency_table("Modules", "module", "module")
+        self.print_latency_table("HTTP requests", "http_request", "provider")
+        responses = self.metrics.counter_totals("http_responses_total", "provider")
+        if responses:
+            received = self.metrics.counter_totals("http_received_bytes_total", "provider")
+            retries = self.metrics.counter_totals("http_retries_total", "provider")
+            waits = self.metrics.histogram_totals("http_queue_wait_duration_seconds", "provider")
+            print(f"  {'provider':<14} {'responses':>9} {'retries':>7} {'received':>10} {'queued':>8}")
+            for provider, count in sorted(responses.items(), key=lambda item: -item[1]):
+                queued = waits.get(provider, (None, 0.0, 0))[1]
+                print(
+                    f"  {provider:<14} {count:>9} {retries[provider]:>7}"
+                    f" {received[provider] / 1024:>8.1f}KB {queued:>7.1f}s"
+                )
+        self.print_latency_table("DNS queries", "dns", "rtype")
+        self.print_latency_table("Subprocesses", "subprocess", "command")
+        hits = self.metrics.counter_totals("cache_requests_total", "provider", result="hit")
+        misses = self.metrics.counter_totals("cache_requests_total", "provider", result="miss")
+        if hits or misses:
+            print("\033[94mResponse cache:\033[0m")
+            print(f"  {'provider':<14} {'hits':>7} {'misses':>7} {'hit rate':>9}")
+            for provider in sorted(hits.keys() | misses.keys()):
+                total = hits[provider] + misses[provider]
+                print(
+                    f"  {provider:<14} {hits[provider]:>7} {misses[provider]:>7}"
+                    f" {100 * hits[provider] / total:>8.0f}%"
+                )
+        dns_cache = self.metrics.counter_totals("dns_cache_requests_total", "result")
+        if dns_cache:
+            total = dns_cache["hit"] + dns_cache["miss"]
+            print(
+                f"\033[94mDNS cache:\033[0m {dns_cache['hit']} hits, {dns_cache['miss']} misses"
+                f" ({100 * dns_cache['hit'] / total:.0f}% hit rate)"
+            )
+        shared = self.metrics.counter_totals("inflight_shared_total", "kind")
+        if shared:
+            print("\033[94mShared in-flight calls:\033[0m")
+            for kind, count in sorted(shared.items()):
+                print(f"  {kind:<14} {count:>7}")
+
+    def do_cache(self, arg):
+        parts = arg.split()
+        if not parts or parts[0] == "stats":
+            if not self.cache.enabled:
+                print("Response cache is disabled (--no-cache).")
+            else:
+                stats = self.cache.stats()
+                size = self.cache.path.stat().st_size if self.cache.path.exists() else 0
+                total = sum(count for count, _, _ in stats.values())
+                print(
+                    f"\033[94mResponse cache:\033[0m {self.cache.path} "
+                    f"({total} entries, {size / 1024:.1f} KiB)"
+                )
+                for provider, (count, negative, expired) in stats.items():
+                    print(
+                        f"  {provider:<12} {count:>7} entries  {negative:>6} negative  {expired:>6} expired"
+                    )
+                print(f"  Session: {self.cache.hits} hits, {self.cache.misses} misses")
+            if not self.dns_cache.enabled:
+                print("DNS cache is disabled (--no-cache).")
+            else:
+                entries, negative, expired = self.dns_cache.stats()
+                print(
+                    f"\033[94mDNS cache:\033[0m {self.dns_cache.path or 'in memory only'}"
+                    f" ({entries} entries, {negative} negative, {expired} expired)"
+                )
+        elif parts[0] == "clear" and parts[1:] == ["dns"]:
+            self.dns_cache.clear()
+            print("Cleared cached DNS answers.")
+        elif parts[0] == "clear":
+            provider = parts[1] if len(parts) > 1 else None
+            self.cache.clear(provider)
+            print(f"Cleared cached responses{f' for {provider}' if provider else ''}.")
+        else:
+            print("Usage: cache [stats] | cache clear [provider|dns]")
+
+    def do_events(self, arg):
+        """Show structured events for the current target, optionally for one module."""
+        parts = arg.split()
+        if not parts and not self.target:
+            print("Usage: events [module] [target]")
+            return
+        module = parts[0] if parts and parts[0] != "*" else None
+        target = parts[1] if len(parts) > 1 else self.target
+        count = 0
+        for event in self.events.read(target=target, module=module):
+            count += 1
+            payload = event["payload"]
+            if event["kind"] == "output":
+                detail = payload["text"]
+            elif event["kind"] == "node":
+                detail = f"{payload['node']} (type={payload['attrs'].get('type')})"
+            elif event["kind"] == "edge":
+                detail = f"{payload['src']} → {payload['dst']} (label={payload['attrs'].get('label')})"
+            else:
+                detail = json.dumps(payload)
+            print(
+                f"\033[90m{event['ts']}\033[0m \033[96m{event['module'] or '-'}\033[0m "
+                f"[{event['kind']}] {detail}"
+            )
+        if not count:
+            print("No matching events.")
+
     def do_reload(self, _):
         self.modules = self.load_modules()
         print("Modules reloaded.")
 
     def do_log(self, _):
         if self.log_file:
-            self.log_file.flush()
+            self.writer.flush()
             with open(self.log_file_path) as f:
                 print(f.read())
         else:
@@ -273,11 +3723,11 @@ class IPInvestigatorCLI(cmd.Cmd):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         line = f"[{timestamp}] [graph] {message}"
         if self.session_log_file:
-            self.session_log_file.write(strip_ansi(line) + "\n")
-            self.session_log_file.flush()
+            self.writer.write(self.session_log_file, strip_ansi(line) + "\n")
 
     def do_clearlog(self, _):
         if self.session_log_file:
+            self.writer.flush()
             self.session_log_file.close()
             open(self.session_log_path, "w").close()
             self.session_log_file = open(self.session_log_path, "a")
@@ -290,6 +3740,7 @@ class IPInvestigatorCLI(cmd.Cmd):
             print("No log file to save.")
             return
         dest_path = LOG_DIR / filename
+        self.writer.flush()
         with open(dest_path, "w") as dest, open(self.log_file_path) as src:
             dest.write(src.read())
         print(f"Log saved as {filename}.")
@@ -298,17 +3749,27 @@ class IPInvestigatorCLI(cmd.Cmd):
         if not self.target or not self.log_file:
             print("No active investigation to save.")
             return
-        save_file = SAVE_DIR / f"{self.target}.save"
+        # Sanitize target for safe filename (CIDR blocks contain a slash)
+        safe_target = re.sub(r"[^\w.-]", "_", self.target)
+        save_file = SAVE_DIR / f"{safe_target}.save"
+        graph_file = save_file.with_suffix(".graph")
+        started = time.monotonic()
+        nodes, edges = write_graph_snapshot(graph_file, self.graph, self.results)
         config = configparser.ConfigParser()
         config["session"] = {
             "target": self.target,
             "target_type": self.target_type,
             "log_path": str(self.log_file_path),
+            "graph_path": str(graph_file),
+            "graph_format": str(GRAPH_FORMAT_VERSION),
         }
         with open(save_file, "w") as f:
             config.write(f)
         self.log("[save] Investigation session saved.")
-        print(f"Session saved to {save_file.name}.")
+        print(
+            f"Session saved to {save_file.name} "
+            f"({nodes} nodes, {edges} edges in {time.monotonic() - started:.1f}s)."
+        )
 
     def do_load(self, filename=None):
         if not filename:
@@ -337,6 +3798,37 @@ class IPInvestigatorCLI(cmd.Cmd):
             print(f"Session loaded for target: {self.target}")
         except KeyError as e:
             print(f"Missing key in save file: {e}")
+            return
+
+        # Saves from older versions have no graph snapshot
+        graph_path = config["session"].get("graph_path")
+        if graph_path and Path(graph_path).exists():
+            started = time.monotonic()
+            try:
+                restore_graph_snapshot(Path(graph_path), self.graph, self.results)
+            except (OSError, ValueError, EOFError) as e:
+                print(f"\033[91mError:\033[0m Could not restore graph: {e}")
+                return
+            print(
+                f"Graph restored: {self.graph.number_of_nodes()} nodes, "
+                f"{self.graph.number_of_edges()} edges in {time.monotonic() - started:.1f}s."
+            )
+
+    def do_results(self, arg):
+        """Show module output kept for the current target (restored by load)."""
+        if not self.target:
+            print("Please set a target first using the 'target' command.")
+            return
+        modules = [m for (t, m) in self.results if t == self.target]
+        if not arg:
+            if not modules:
+                print("No module results for this target.")
+                return
+            print(f"\033[94mModule results for {self.target}:\033[0m {' '.join(modules)}")
+        elif arg in modules:
+            print(self.results[(self.target, arg)])
+        else:
+            print(f"No results from '{arg}' for this target.")
 
     def do_listsaves(self, _):
         saves = sorted(SAVE_DIR.glob("*.save"), key=os.path.getmtime, reverse=True)
@@ -352,6 +3844,15 @@ class IPInvestigatorCLI(cmd.Cmd):
 
     def do_exit(self, _):
         print("Exiting.")
+        self.cache.close()
+        self.http.close()
+        self.limiter.save()
+        self.dns_cache.save()
+        if self.metrics_file:
+            self.metrics.write_prometheus(self.metrics_file)
+        self.events.close()
+        self.writer.close()
+        self.tracer.write()
         if self.log_file:
             self.log_file.close()
         if self.session_log_file:
@@ -375,20 +3876,96 @@ def main():
         "--exit-after", action="store_true", help="Exit after running commands"
     )
     parser.add_argument("--saveas", help="Save log with given filename after commands")
+    parser.add_argument(
+        "--targets-file",
+        help="Batch mode: run the commands against every target in this file ('-' for stdin)",
+    )
+    parser.add_argument(
+        "--sync-log",
+        action="store_true",
+        help="Write and flush every log line immediately instead of buffering",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always query APIs instead of using cached responses",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print per-import startup timings after running commands",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Write metrics in Prometheus text format to this file on exit",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve metrics in Prometheus text format on 127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        const=SERVE_ADDRESS,
+        metavar="ADDRESS",
+        help=f"Run as a daemon serving a local JSON API on host:port or unix:/path"
+        f" (default: {SERVE_ADDRESS}); uses --workers",
+    )
+    parser.add_argument(
+        "--conf-dir",
+        help="Read module .conf files (API keys, endpoints, limits) from this directory",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Record a Chrome/Perfetto trace (JSON) of commands, modules and I/O to FILE",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of targets investigated concurrently in batch mode (default: 8)",
+    )
     args = parser.parse_args()
+    if args.conf_dir:
+        os.environ["IPINV_CONF_DIR"] = args.conf_dir  # modules read their keys from here too
+
+    with startup_timer("CLI init"):
+        cli = IPInvestigatorCLI(
+            use_cache=not args.no_cache, sync_log=args.sync_log, trace_file=args.trace
+        )
+    cli.metrics_file = args.metrics_file
+    if args.metrics_port:
+        cli.metrics.serve(args.metrics_port)
 
-    cli = IPInvestigatorCLI()
+    if args.serve:
+        cli.serve(args.serve, args.workers)
+        cli.do_exit(None)
+        return
+
+    if args.targets_file:
+        if not args.command:
+            print("Batch mode needs at least one command (-c).")
+        elif args.targets_file == "-":
+            cli.run_batch(sys.stdin, args.command, args.workers)
+        else:
+            with open(args.targets_file) as f:
+                cli.run_batch(f, args.command, args.workers)
 
     if args.target:
         cli.do_target(args.target)
 
-    if args.command:
+    if args.command and not args.targets_file:
         for cmd_name in args.command:
-            cli.default(cmd_name)
+            cli.onecmd(cmd_name)
 
     if args.saveas:
         cli.do_saveas(args.saveas)
 
+    if args.profile_startup:
+        print_startup_profile()
+
     if args.exit_after:
         cli.do_exit(None)
     else:
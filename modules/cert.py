@@ -18,7 +18,7 @@ class Cert:
         original_target = target
 
         if target.startswith("http://"):
-            print("\033[91mError:\033[0m HTTP does not use certificates.")
+            self.cli.module_error("HTTP does not use certificates.")
             return
 
         if not target.startswith("https://"):
@@ -31,14 +31,15 @@ class Cert:
         host = parsed.hostname
         port = parsed.port or 443
 
-        context = ssl.create_default_context()
+        context = ssl.create_default_context(cafile=self.config.get("ca_file"))
         try:
-            with socket.create_connection((host, port), timeout=5) as sock:
+            address = self.dns_cache.address(host)
+            with socket.create_connection((address, port), timeout=5) as sock:
                 with context.wrap_socket(sock, server_hostname=host) as ssock:
                     cert = ssock.getpeercert(binary_form=False)
                     cert_bin = ssock.getpeercert(binary_form=True)
         except Exception as e:
-            print(f"\033[91mError:\033[0m Failed to retrieve certificate: {e}")
+            self.cli.module_error(f"Failed to retrieve certificate: {e}")
             return
 
         print(f"\033[94mCertificate for {host}:{port}\033[0m")
@@ -84,75 +85,74 @@ class Cert:
         )
 
         # ─── Graph Integration ────────────────────────────────
-        if hasattr(self, "graph") and hasattr(self, "cli"):
-            self.graph.add_node(host, type="domain")
-            self.cli.log_graph(f"Added node: {host} (type=domain)")
+        self.graph.add_node(host, type="domain")
+        self.cli.log_graph(f"Added node: {host} (type=domain)")
+
+        subject_cn = subject.get("commonName", "Unknown CN")
+        self.graph.add_node(subject_cn, type="cert_subject")
+        self.cli.log_graph(f"Added node: {subject_cn} (type=cert_subject)")
+
+        self.graph.add_edge(
+            host,
+            subject_cn,
+            label="cert_subject",
+            timestamp=datetime.now().isoformat(),
+        )
+        self.cli.log_graph(
+            f"Added edge: {host} → {subject_cn} (label=cert_subject)"
+        )
 
-            subject_cn = subject.get("commonName", "Unknown CN")
-            self.graph.add_node(subject_cn, type="cert_subject")
-            self.cli.log_graph(f"Added node: {subject_cn} (type=cert_subject)")
+        # Subject metadata
+        for key, label, ntype in [
+            ("organizationName", "Org", "org"),
+            ("countryName", "Country", "country"),
+            ("stateOrProvinceName", "Region", "region"),
+        ]:
+            val = subject.get(key)
+            if val:
+                self.graph.add_node(val, type=ntype)
+                self.cli.log_graph(f"Added node: {val} (type={ntype})")
+                self.graph.add_edge(
+                    subject_cn,
+                    val,
+                    label=label,
+                    timestamp=datetime.now().isoformat(),
+                )
+                self.cli.log_graph(
+                    f"Added edge: {subject_cn} → {val} (label={label})"
+                )
 
+        # Issuer organization
+        issuer_org = issuer.get("organizationName")
+        if issuer_org:
+            self.graph.add_node(issuer_org, type="issuer_org")
+            self.cli.log_graph(f"Added node: {issuer_org} (type=issuer_org)")
             self.graph.add_edge(
-                host,
                 subject_cn,
-                label="cert_subject",
+                issuer_org,
+                label="issued_by",
                 timestamp=datetime.now().isoformat(),
             )
             self.cli.log_graph(
-                f"Added edge: {host} → {subject_cn} (label=cert_subject)"
+                f"Added edge: {subject_cn} → {issuer_org} (label=issued_by)"
             )
 
-            # Subject metadata
-            for key, label, ntype in [
-                ("organizationName", "Org", "org"),
-                ("countryName", "Country", "country"),
-                ("stateOrProvinceName", "Region", "region"),
-            ]:
-                val = subject.get(key)
-                if val:
-                    self.graph.add_node(val, type=ntype)
-                    self.cli.log_graph(f"Added node: {val} (type={ntype})")
+        # SAN entries
+        if alt_names:
+            for typ, name in alt_names:
+                if typ == "DNS":
+                    self.graph.add_node(name, type="san")
+                    self.cli.log_graph(f"Added node: {name} (type=san)")
                     self.graph.add_edge(
                         subject_cn,
-                        val,
-                        label=label,
+                        name,
+                        label="SAN",
                         timestamp=datetime.now().isoformat(),
                     )
                     self.cli.log_graph(
-                        f"Added edge: {subject_cn} → {val} (label={label})"
+                        f"Added edge: {subject_cn} → {name} (label=SAN)"
                     )
 
-            # Issuer organization
-            issuer_org = issuer.get("organizationName")
-            if issuer_org:
-                self.graph.add_node(issuer_org, type="issuer_org")
-                self.cli.log_graph(f"Added node: {issuer_org} (type=issuer_org)")
-                self.graph.add_edge(
-                    subject_cn,
-                    issuer_org,
-                    label="issued_by",
-                    timestamp=datetime.now().isoformat(),
-                )
-                self.cli.log_graph(
-                    f"Added edge: {subject_cn} → {issuer_org} (label=issued_by)"
-                )
-
-            # SAN entries
-            if alt_names:
-                for typ, name in alt_names:
-                    if typ == "DNS":
-                        self.graph.add_node(name, type="san")
-                        self.cli.log_graph(f"Added node: {name} (type=san)")
-                        self.graph.add_edge(
-                            subject_cn,
-                            name,
-                            label="SAN",
-                            timestamp=datetime.now().isoformat(),
-                        )
-                        self.cli.log_graph(
-                            f"Added edge: {subject_cn} → {name} (label=SAN)"
-                        )
-
     def print_field(self, label, value):
         if value:
             print(f"\033[93m{label}:\033[0m {value}")
@@ -1,6 +1,14 @@
-import socket
+import asyncio
+import ipaddress
+import random
+import re
+import string
+import time
+import dns.asyncresolver
+import dns.exception
 import dns.resolver
 import dns.reversename
+from pathlib import Path
 from urllib.parse import urlparse
 from datetime import datetime
 
@@ -9,20 +17,59 @@ class Dnslookup:
     help = (
         "dnslookup: Perform DNS lookups on domains or reverse lookups on IPs.\n"
         "Usage: dnslookup\n"
+        "       dnslookup --ptr-all [--concurrency N]  (reverse DNS for every IP in the graph)\n"
+        "       dnslookup --brute <wordlist> [--concurrency N]  (find subdomains of the target)\n"
         "Supported target types: IP, domain"
     )
 
     targets = ["ip", "domain"]
+    sweep_exempt_args = ["--ptr-all", "--brute"]  # run once, not per host on networks
+    targetless_args = ["--ptr-all"]  # works on the graph, no target needed
+
+    PRIMARY_NAMESERVERS = ["1.1.1.1", "8.8.8.8"]  # Cloudflare & Google
+    RECORD_TYPES = ["A", "AAAA", "MX", "NS", "TXT", "CNAME", "SOA"]
+    HEDGE_DELAY = 0.2  # seconds to wait for the primary before also asking the fallback
+    PTR_CONCURRENCY = 200  # PTR queries in flight for --ptr-all
+    BRUTE_CONCURRENCY = 1000  # most queries in flight for --brute
+    BRUTE_MIN_CONCURRENCY = 20
+    BRUTE_TIMEOUT = 2.0  # seconds per query before trying the next nameserver
+    BRUTE_RETRIES = 2
+    BRUTE_WINDOW = 500  # queries between concurrency adjustments
+    BRUTE_MAX_TIMEOUT_RATE = 0.05  # above this, halve the concurrency
+    WILDCARD_PROBES = 3
+    SUBDOMAIN_LABELS = re.compile(r"[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?(\.[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?)*")
 
     def __init__(self):
-        self.primary_resolver = dns.resolver.Resolver(configure=False)
-        self.primary_resolver.nameservers = [
-            "1.1.1.1",
-            "8.8.8.8",
-        ]  # Cloudflare & Google
-        self.fallback_resolver = dns.resolver.Resolver()  # Use system DNS config
+        self.primary_resolver = None
+        self.fallback_resolver = None
+        self.hedge_delay = self.HEDGE_DELAY
+
+    def setup_resolvers(self):
+        # nameservers / fallback_nameservers / port / hedge_delay in
+        # dnslookup.conf override the defaults, e.g. to point at a local server
+        config = self.config
+        port = int(config.get("port", 53))
+        self.hedge_delay = float(config.get("hedge_delay", self.HEDGE_DELAY))
+        self.primary_resolver = dns.asyncresolver.Resolver(configure=False)
+        self.primary_resolver.nameservers = (
+            config["nameservers"].split(",")
+            if config.get("nameservers")
+            else self.PRIMARY_NAMESERVERS
+        )
+        self.primary_resolver.port = port
+        if config.get("fallback_nameservers"):
+            self.fallback_resolver = dns.asyncresolver.Resolver(configure=False)
+            self.fallback_resolver.nameservers = config["fallback_nameservers"].split(",")
+            self.fallback_resolver.port = port
+        else:
+            self.fallback_resolver = dns.asyncresolver.Resolver()  # Use system DNS config
 
     def run(self, target, args):
+        if self.primary_resolver is None:
+            self.setup_resolvers()
+        if "--ptr-all" in args:
+            self.ptr_all(args)
+            return
         if target.startswith("http"):
             domain = urlparse(target).hostname
             print(
@@ -30,97 +77,426 @@ class Dnslookup:
             )
             target = domain
 
+        if "--brute" in args:
+            self.brute(target, args)
+            return
+
         if self.is_ip(target):
             self.reverse_dns(target)
         else:
             self.forward_dns(target)
 
+    def normalize_ip(self, value):
+        try:
+            return str(ipaddress.ip_address(str(value).strip()))
+        except ValueError:
+            return None
+
     def is_ip(self, value):
         try:
-            socket.inet_aton(value)
+            ipaddress.ip_address(value)
             return True
-        except socket.error:
+        except ValueError:
             return False
 
     def reverse_dns(self, ip):
         print(f"\033[94mReverse DNS lookup for {ip}\033[0m")
-        try:
-            reversed_dns = socket.gethostbyaddr(ip)
-            hostname = reversed_dns[0]
+        hostnames = self.dns_cache.hostnames(ip)
+        if hostnames:
+            hostname = hostnames[0]
             print(f"\033[93mHostname:\033[0m {hostname}")
+            self.add_reverse_dns(ip, hostname)
+        else:
+            print("\033[91mError:\033[0m No reverse DNS entry found.")
 
-            # ─── Graph ─────────────────────────────
-            if hasattr(self, "graph") and hasattr(self, "cli"):
-                self.graph.add_node(ip, type="ip")
-                self.graph.add_node(hostname, type="domain")
-                self.graph.add_edge(
-                    ip,
-                    hostname,
-                    label="reverse_dns",
-                    timestamp=datetime.now().isoformat(),
+    def add_reverse_dns(self, ip, hostname):
+        # ─── Graph ─────────────────────────────
+        self.graph.add_node(ip, type="ip")
+        self.graph.add_node(hostname, type="domain")
+        self.graph.add_edge(
+            ip,
+            hostname,
+            label="reverse_dns",
+            timestamp=datetime.now().isoformat(),
+        )
+        self.cli.log_graph(f"Added node: {ip} (type=ip)")
+        self.cli.log_graph(f"Added node: {hostname} (type=domain)")
+        self.cli.log_graph(f"Added edge: {ip} → {hostname} (label=reverse_dns)")
+
+    def ptr_all(self, args):
+        """Reverse-resolve every IP node in the graph in one pass.
+
+        IPs are found through the graph's type index and deduplicated, and
+        ones that already have a reverse_dns edge are skipped. Up to
+        --concurrency PTR queries (ptr_concurrency in dnslookup.conf) are
+        in flight at once, answers come from and go to the shared DNS
+        cache, and edges are added as answers arrive.
+        """
+        concurrency = int(self.config.get("ptr_concurrency", self.PTR_CONCURRENCY))
+        if "--concurrency" in args:
+            try:
+                concurrency = int(args[args.index("--concurrency") + 1])
+            except (IndexError, ValueError):
+                print("Usage: dnslookup --ptr-all [--concurrency N]")
+                return
+        concurrency = max(1, concurrency)
+
+        with self.graph.lock:
+            nodes = list(self.graph.nodes_by_type.get("ip", ()))
+            resolved = [src for src, _ in self.graph.edges_by_label.get("reverse_dns", ())]
+        done = {self.normalize_ip(node) for node in resolved}
+        ips = {}  # normalized address -> graph node
+        for node in nodes:
+            ip = self.normalize_ip(node)
+            if ip and ip not in done:
+                ips.setdefault(ip, node)
+        if not ips:
+            print(f"No unresolved IP nodes in the graph ({len(done)} already have reverse DNS).")
+            return
+
+        print(
+            f"\033[94mReverse DNS for {len(ips)} IP(s), up to {concurrency} queries in flight"
+            f" ({len(done)} already resolved)\033[0m"
+        )
+        names = {dns.reversename.from_address(ip).to_text(): ip for ip in ips}
+        counts = {"found": 0, "missing": 0, "failed": 0}
+
+        def on_result(name, result):
+            if isinstance(result, Exception):
+                counts["failed"] += 1
+                return
+            _, rcode, records = result
+            if not records:
+                counts["missing"] += 1
+                return
+            counts["found"] += 1
+            node = ips[names[name]]
+            hostname = records[0].rstrip(".")
+            print(f"  {node} → {hostname}")
+            self.add_reverse_dns(node, hostname)
+
+        started = datetime.now()
+        try:
+            asyncio.run(self.resolve_stream(names, "PTR", concurrency, on_result))
+        except KeyboardInterrupt:
+            print("\033[93mInterrupted.\033[0m")
+        elapsed = (datetime.now() - started).total_seconds()
+        print(
+            f"\033[94mReverse DNS done in {elapsed:.1f}s:\033[0m {counts['found']} found,"
+            f" {counts['missing']} without PTR, {counts['failed']} failed"
+        )
+
+    def brute(self, domain, args):
+        """Find subdomains of domain by resolving every word of a wordlist.
+
+        The wordlist is read line by line as queries go out, so its size
+        doesn't matter. Queries are spread round-robin over every configured
+        nameserver; a query that times out is retried on the next one.
+        Concurrency starts at a quarter of --concurrency (brute_concurrency
+        in dnslookup.conf) and grows by a tenth after every clean window of
+        queries; a window with too many timeouts halves it. Random labels
+        are resolved first to detect wildcard DNS, and answers matching the
+        wildcard are dropped. Hits go to the graph as they arrive.
+        """
+        usage = "Usage: dnslookup --brute <wordlist> [--concurrency N]"
+        if self.is_ip(domain):
+            self.cli.module_error("--brute needs a domain target.")
+            return
+        concurrency = int(self.config.get("brute_concurrency", self.BRUTE_CONCURRENCY))
+        try:
+            wordlist = Path(args[args.index("--brute") + 1]).expanduser()
+            if "--concurrency" in args:
+                concurrency = int(args[args.index("--concurrency") + 1])
+        except (IndexError, ValueError):
+            print(usage)
+            return
+        if not wordlist.is_file():
+            self.cli.module_error(f"Wordlist not found: {wordlist}")
+            return
+
+        domain = domain.lower().rstrip(".")
+        resolvers = self.brute_resolvers()
+        state = {
+            "tried": 0,
+            "found": 0,
+            "wildcard": 0,
+            "failed": 0,
+            "skipped": 0,
+            "limit": max(1, min(concurrency, max(self.BRUTE_MIN_CONCURRENCY, concurrency // 4))),
+        }
+        started = time.monotonic()
+        print(
+            f"\033[94mBrute-forcing subdomains of {domain} from {wordlist}"
+            f" over {len(resolvers)} nameserver(s), up to {concurrency} queries in flight\033[0m"
+        )
+
+        def candidates(f):
+            for line in f:
+                word = line.strip().lower().rstrip(".")
+                if not word or word.startswith("#"):
+                    continue
+                if not self.SUBDOMAIN_LABELS.fullmatch(word):
+                    state["skipped"] += 1
+                    continue
+                yield f"{word}.{domain}"
+
+        try:
+            with open(wordlist, errors="replace") as f:
+                asyncio.run(
+                    self.brute_stream(domain, candidates(f), resolvers, max(1, concurrency), state)
                 )
-                self.cli.log_graph(f"Added node: {ip} (type=ip)")
-                self.cli.log_graph(f"Added node: {hostname} (type=domain)")
-                self.cli.log_graph(f"Added edge: {ip} → {hostname} (label=reverse_dns)")
+        except KeyboardInterrupt:
+            print("\033[93mInterrupted.\033[0m")
 
-        except socket.herror:
-            print("\033[91mError:\033[0m No reverse DNS entry found.")
+        elapsed = time.monotonic() - started
+        rate = state["tried"] / elapsed if elapsed > 0 else 0.0
+        print(
+            f"\033[94mBrute force done: {state['tried']} name(s) in {elapsed:.1f}s"
+            f" ({rate:.0f}/s):\033[0m {state['found']} found, {state['wildcard']} wildcard"
+            f" matches, {state['failed']} failed, {state['skipped']} invalid word(s);"
+            f" concurrency ended at {state['limit']}"
+        )
 
-    def forward_dns(self, domain):
-        print(f"\033[94mDNS records for {domain}\033[0m")
-        record_types = ["A", "AAAA", "MX", "NS", "TXT", "CNAME", "SOA"]
+    def brute_resolvers(self):
+        """One resolver per configured nameserver (primary and fallback), deduplicated."""
+        resolvers = []
+        nameservers = self.primary_resolver.nameservers + self.fallback_resolver.nameservers
+        timeout = float(self.config.get("brute_timeout", self.BRUTE_TIMEOUT))
+        for nameserver in dict.fromkeys(str(n) for n in nameservers):
+            resolver = dns.asyncresolver.Resolver(configure=False)
+            resolver.nameservers = [nameserver]
+            resolver.port = self.primary_resolver.port
+            resolver.timeout = resolver.lifetime = timeout
+            resolvers.append(resolver)
+        return resolvers
+
+    async def wildcard_answers(self, domain, resolvers):
+        """Addresses random names under domain resolve to; empty without wildcard DNS."""
+        answers = set()
+        for n in range(self.WILDCARD_PROBES):
+            label = "".join(random.choices(string.ascii_lowercase + string.digits, k=16))
+            try:
+                answer = await resolvers[n % len(resolvers)].resolve(f"{label}.{domain}", "A")
+                answers.update(rdata.to_text() for rdata in answer)
+            except dns.exception.DNSException:
+                continue
+        return answers
+
+    async def brute_stream(self, domain, names, resolvers, concurrency, state):
+        wildcard = await self.wildcard_answers(domain, resolvers)
+        if wildcard:
+            print(
+                f"\033[93mWildcard DNS:\033[0m *.{domain} → {', '.join(sorted(wildcard))};"
+                " names answering only with these are ignored."
+            )
+        gate = asyncio.Condition()
+        window = {"queries": 0, "timeouts": 0}
+        in_flight = 0
+        next_resolver = 0
+        last_progress = time.monotonic()
+
+        async def acquire():
+            nonlocal in_flight
+            async with gate:
+                await gate.wait_for(lambda: in_flight < state["limit"])
+                in_flight += 1
+
+        async def release(timed_out):
+            # Additive increase after a clean window, halve on too many timeouts
+            nonlocal in_flight
+            async with gate:
+                in_flight -= 1
+                window["queries"] += 1
+                window["timeouts"] += timed_out
+                if window["queries"] >= self.BRUTE_WINDOW:
+                    if window["timeouts"] / window["queries"] > self.BRUTE_MAX_TIMEOUT_RATE:
+                        state["limit"] = max(self.BRUTE_MIN_CONCURRENCY, state["limit"] // 2)
+                    elif not window["timeouts"]:
+                        state["limit"] = min(concurrency, state["limit"] + max(1, state["limit"] // 10))
+                    window["queries"] = window["timeouts"] = 0
+                gate.notify(max(1, state["limit"] - in_flight))
+
+        async def query(name):
+            nonlocal next_resolver
+            for _ in range(self.BRUTE_RETRIES + 1):
+                resolver = resolvers[next_resolver % len(resolvers)]
+                next_resolver += 1
+                await acquire()
+                timed_out = False
+                try:
+                    with self.metrics.timer("dns", rtype="A", resolver="brute"):
+                        return await resolver.resolve(name, "A", raise_on_no_answer=False)
+                except (dns.exception.Timeout, dns.resolver.NoNameservers):
+                    timed_out = True
+                finally:
+                    await release(timed_out)
+            raise dns.exception.Timeout()
 
-        for rtype in record_types:
-            for resolver, label in [
-                (self.primary_resolver, "Primary"),
-                (self.fallback_resolver, "Fallback"),
-            ]:
+        async def worker():
+            nonlocal last_progress
+            for name in names:
+                state["tried"] += 1
+                if time.monotonic() - last_progress > 10:
+                    last_progress = time.monotonic()
+                    self.cli.log(
+                        f"[dnslookup] brute {domain}: {state['tried']} tried,"
+                        f" {state['found']} found, concurrency {state['limit']}"
+                    )
                 try:
-                    answers = resolver.resolve(domain, rtype, raise_on_no_answer=False)
-                    if answers.rrset:
-                        print(f"\033[93m{rtype} Records ({label}):\033[0m")
-                        for rdata in answers:
-                            val = rdata.to_text()
-                            print(f"  {val}")
-
-                            # ─── Skip TXT from graph ────────
-                            if rtype == "TXT":
-                                continue
-
-                            # ─── Graph ───────────────────────
-                            if hasattr(self, "graph") and hasattr(self, "cli"):
-                                self.graph.add_node(domain, type="domain")
-                                self.cli.log_graph(
-                                    f"Added node: {domain} (type=domain)"
-                                )
-
-                                if rtype in ["A", "AAAA"]:
-                                    self.graph.add_node(val, type="ip")
-                                else:
-                                    self.graph.add_node(val, type=rtype.lower())
-
-                                self.graph.add_edge(
-                                    domain,
-                                    val,
-                                    label=rtype,
-                                    timestamp=datetime.now().isoformat(),
-                                )
-                                self.cli.log_graph(
-                                    f"Added node: {val} (type={rtype.lower()})"
-                                )
-                                self.cli.log_graph(
-                                    f"Added edge: {domain} → {val} (label={rtype})"
-                                )
-
-                        break  # success, don't fall back
-                except dns.resolver.NoNameservers:
+                    answer = await query(name)
+                except (dns.resolver.NXDOMAIN, dns.resolver.YXDOMAIN):
                     continue
-                except dns.resolver.NXDOMAIN:
-                    print("\033[91mError:\033[0m Domain does not exist.")
-                    return
-                except Exception:
+                except dns.exception.DNSException:
+                    state["failed"] += 1
                     continue
-            else:
-                print(
-                    f"\033[91mError:\033[0m Could not retrieve {rtype} records from any resolver."
+                addresses = [rdata.to_text() for rdata in answer.rrset] if answer.rrset else []
+                if wildcard and set(addresses) <= wildcard:
+                    state["wildcard"] += 1
+                    continue
+                state["found"] += 1
+                self.dns_cache.store_answer(name, "A", answer, "brute")
+                print(f"  {name} {' '.join(addresses)}".rstrip())
+                self.add_subdomain(domain, name, addresses)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    def add_subdomain(self, domain, name, addresses):
+        # ─── Graph ─────────────────────────────
+        self.graph.add_node(domain, type="domain")
+        self.graph.add_node(name, type="domain")
+        self.graph.add_edge(
+            domain, name, label="subdomain", timestamp=datetime.now().isoformat()
+        )
+        self.cli.log_graph(f"Added node: {name} (type=domain)")
+        self.cli.log_graph(f"Added edge: {domain} → {name} (label=subdomain)")
+        for address in addresses:
+            self.graph.add_node(address, type="ip")
+            self.graph.add_edge(name, address, label="A", timestamp=datetime.now().isoformat())
+            self.cli.log_graph(f"Added edge: {name} → {address} (label=A)")
+
+    async def resolve_stream(self, names, rtype, concurrency, on_result):
+        """Resolve names with up to concurrency queries in flight.
+
+        names may be any iterable and is consumed lazily, so it can be a
+        generator. on_result(name, (label, rcode, records) or exception) is
+        called as each query finishes.
+        """
+        names = iter(names)
+
+        async def worker():
+            # Workers share the iterator; next() never awaits, so this is safe
+            for name in names:
+                try:
+                    result = await self.cached_query(name, rtype, hedge=False)
+                except Exception as e:
+                    result = e
+                on_result(name, result)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def query(self, resolver, label, domain, rtype):
+        with self.metrics.timer("dns", rtype=rtype, resolver=label.lower()):
+            return await resolver.resolve(domain, rtype, raise_on_no_answer=False)
+
+    async def hedged_query(self, domain, rtype, hedge=True):
+        """Return (label, answer) from whichever resolver answers first.
+
+        The primary is asked first. If it has not answered within
+        hedge_delay, or fails sooner, the fallback is asked as well, and the
+        slower query is cancelled. NXDOMAIN is an answer, not a failure.
+        With hedge=False the fallback is only asked once the primary fails,
+        which keeps bulk lookups from doubling their traffic under load.
+        """
+        attempts = [(self.primary_resolver, "Primary"), (self.fallback_resolver, "Fallback")]
+        pending = {}
+        error = None
+        try:
+            while attempts or pending:
+                if attempts:
+                    resolver, label = attempts.pop(0)
+                    task = asyncio.create_task(self.query(resolver, label, domain, rtype))
+                    pending[task] = label
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if attempts and hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    label = pending.pop(task)
+                    try:
+                        return label, task.result()
+                    except dns.resolver.NXDOMAIN:
+                        raise
+                    except Exception as e:
+                        error = e
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    async def cached_query(self, domain, rtype, hedge=True):
+        """Return (label, rcode, records), from the shared DNS cache while it is fresh."""
+        cached = self.dns_cache.get(domain, rtype)
+        if cached is not None:
+            rcode, records, source = cached
+            return f"{source}, cached", rcode, records
+        try:
+            label, answer = await self.hedged_query(domain, rtype, hedge)
+        except dns.resolver.NXDOMAIN as e:
+            return None, *self.dns_cache.store_nxdomain(domain, e)
+        return label, *self.dns_cache.store_answer(domain, rtype, answer, label)
+
+    async def query_all(self, domain):
+        """Query every record type at once. Returns {rtype: (label, rcode, records) or exception}."""
+        results = await asyncio.gather(
+            *(self.cached_query(domain, rtype) for rtype in self.RECORD_TYPES),
+            return_exceptions=True,
+        )
+        return dict(zip(self.RECORD_TYPES, results))
+
+    def forward_dns(self, domain):
+        print(f"\033[94mDNS records for {domain}\033[0m")
+        # Workers asking the same resolvers about the same domain share one lookup
+        key = (
+            tuple(self.primary_resolver.nameservers),
+            self.primary_resolver.port,
+            domain.lower(),
+        )
+        results = self.inflight.do("dns", key, lambda: asyncio.run(self.query_all(domain)))
+
+        if any(not isinstance(r, Exception) and r[1] == "NXDOMAIN" for r in results.values()):
+            print("\033[91mError:\033[0m Domain does not exist.")
+            return
+
+        for rtype in self.RECORD_TYPES:
+            if isinstance(results[rtype], Exception):
+                self.cli.module_error(f"Could not retrieve {rtype} records from any resolver.")
+                continue
+            label, _, records = results[rtype]
+            if not records:
+                continue
+            print(f"\033[93m{rtype} Records ({label}):\033[0m")
+            for val in records:
+                print(f"  {val}")
+
+                # ─── Skip TXT from graph ────────
+                if rtype == "TXT":
+                    continue
+
+                # ─── Graph ───────────────────────
+                self.graph.add_node(domain, type="domain")
+                self.cli.log_graph(f"Added node: {domain} (type=domain)")
+
+                if rtype in ["A", "AAAA"]:
+                    self.graph.add_node(val, type="ip")
+                else:
+                    self.graph.add_node(val, type=rtype.lower())
+
+                self.graph.add_edge(
+                    domain,
+                    val,
+                    label=rtype,
+                    timestamp=datetime.now().isoformat(),
                 )
+                self.cli.log_graph(f"Added node: {val} (type={rtype.lower()})")
+                self.cli.log_graph(f"Added edge: {domain} → {val} (label={rtype})")
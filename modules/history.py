@@ -15,15 +15,12 @@ class History:
     )
 
     targets = []  # ❗ allows running without a target set
+    interactive = True
 
     def __init__(self):
         self.sorted_history = []
 
     def run(self, target, args):
-        if not hasattr(self, "cli"):
-            print("\033[91mError:\033[0m History module must be bound to CLI instance.")
-            return
-
         log_dir = Path("log")
         if not log_dir.exists():
             print("\033[91mNo log directory found.\033[0m")
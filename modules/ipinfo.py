@@ -1,7 +1,5 @@
 import requests
 import socket
-import configparser
-from pathlib import Path
 import datetime
 
 
@@ -14,65 +12,67 @@ class Ipinfo:
 
     targets = ["ip"]
 
-    def __init__(self):
-        self.api_key = None
-        self.load_api_key()
-
-    def load_api_key(self):
-        config_path = Path(__file__).parent / "ipinfo.conf"
-        if config_path.exists():
-            config = configparser.ConfigParser()
-            config.read(config_path)
-            self.api_key = config.get("DEFAULT", "api_key", fallback=None)
+    @property
+    def api_key(self):
+        return self.config.get("api_key")
 
     def run(self, target, args):
-        url = f"https://ipinfo.io/{target}"
+        url = f"{self.http.session('ipinfo').base_url}/{target}"
         if self.api_key:
             url += f"?token={self.api_key}"
 
-        try:
-            response = requests.get(url, timeout=10)
+        def load():
+            response = self.http.session("ipinfo").get(url)
+            if response.status_code == 404:
+                return None
             response.raise_for_status()
-            data = response.json()
+            with self.tracer.span("parse", "module"):
+                return response.json()
+
+        try:
+            data = self.cache.fetch("ipinfo", "ip", target, load)
+
+            if data is None:
+                print(f"\033[93mNo ipinfo data found for {target}.\033[0m")
+                return
 
             print("\033[92mIP Info:\033[0m")
             for k, v in data.items():
                 print(f"  \033[93m{k.capitalize()}:\033[0m {v}")
 
             # ─── Graph Integration ────────────────────────────────
-            if hasattr(self, "graph") and hasattr(self, "cli"):
-                self.graph.add_node(target, type="ip")
-                self.cli.log_graph(f"Added node: {target} (type=ip)")
+            self.graph.add_node(target, type="ip")
+            self.cli.log_graph(f"Added node: {target} (type=ip)")
+
+            org = data.get("org")
+            if org:
+                self.graph.add_node(org, type="org")
+                self.cli.log_graph(f"Added node: {org} (type=org)")
+                self.graph.add_edge(
+                    target,
+                    org,
+                    label="org",
+                    timestamp=datetime.datetime.now().isoformat(),
+                )
+                self.cli.log_graph(f"Added edge: {target} → {org} (label=org)")
 
-                org = data.get("org")
-                if org:
-                    self.graph.add_node(org, type="org")
-                    self.cli.log_graph(f"Added node: {org} (type=org)")
+            asn = data.get("asn")
+            if asn:
+                asn_id = asn.get("asn")
+                if asn_id:
+                    self.graph.add_node(asn_id, type="asn")
+                    self.cli.log_graph(f"Added node: {asn_id} (type=asn)")
                     self.graph.add_edge(
                         target,
-                        org,
-                        label="org",
+                        asn_id,
+                        label="ASN",
                         timestamp=datetime.datetime.now().isoformat(),
                     )
-                    self.cli.log_graph(f"Added edge: {target} → {org} (label=org)")
-
-                asn = data.get("asn")
-                if asn:
-                    asn_id = asn.get("asn")
-                    if asn_id:
-                        self.graph.add_node(asn_id, type="asn")
-                        self.cli.log_graph(f"Added node: {asn_id} (type=asn)")
-                        self.graph.add_edge(
-                            target,
-                            asn_id,
-                            label="ASN",
-                            timestamp=datetime.datetime.now().isoformat(),
-                        )
-                        self.cli.log_graph(
-                            f"Added edge: {target} → {asn_id} (label=ASN)"
-                        )
+                    self.cli.log_graph(
+                        f"Added edge: {target} → {asn_id} (label=ASN)"
+                    )
 
         except requests.exceptions.HTTPError as e:
-            print(f"\033[91mHTTP Error:\033[0m {e}")
+            self.cli.module_error(e, "HTTP Error")
         except Exception as e:
-            print(f"\033[91mError:\033[0m {e}")
+            self.cli.module_error(e)
@@ -1,3 +1,4 @@
+import ipaddress
 import subprocess
 import datetime
 from urllib.parse import urlparse
@@ -16,7 +17,7 @@ class Nmap:
         original_target = target
 
         if target.startswith("http"):
-            print("\033[91mError:\033[0m This module only supports IP addresses.")
+            self.cli.module_error("This module only supports IP addresses.")
             return
 
         print(f"\033[94mRunning Nmap on {target}...\033[0m")
@@ -41,12 +42,17 @@ class Nmap:
         ]
         port_list = ",".join(common_ports)
 
+        command = ["nmap", "-Pn", "-p", port_list, target]
+        if self.is_ipv6(target):
+            command.insert(1, "-6")  # nmap scans IPv4 unless told otherwise
+
         try:
-            result = subprocess.run(
-                ["nmap", "-Pn", "-p", port_list, target],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
+            with self.metrics.timer("subprocess", command="nmap"):
+                result = subprocess.run(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
             output = result.stdout.decode("utf-8", errors="replace")
             print()
             print("\033[94mNmap Results:\033[0m\n")
@@ -81,58 +87,59 @@ class Nmap:
                         )
 
         except FileNotFoundError:
-            print(
-                "\033[91mError:\033[0m The 'nmap' command is not available on this system."
-            )
+            self.cli.module_error("The 'nmap' command is not available on this system.")
             return
         except Exception as e:
-            print(f"\033[91mError:\033[0m Failed to run nmap: {e}")
+            self.cli.module_error(f"Failed to run nmap: {e}")
             return
 
         # Log the results
-        if hasattr(self, "cli"):
-            self.cli.log(f"[nmap] {output}")
+        self.cli.log(f"[nmap] {output}")
 
         # ─── Graph integration ────────────────────────────────
-        if hasattr(self, "graph"):
-            self.graph.add_node(target, type="ip")
-            self.graph.add_node("nmap", type="tool")
-            self.graph.add_edge(
-                target,
-                "nmap",
-                label="nmap",
-                timestamp=datetime.datetime.now().isoformat(),
-            )
-
-            # Extract open ports from Nmap output
-            parsing_ports = False
-            for line in output.splitlines():
-                line = line.strip()
-                if line.startswith("PORT"):
-                    parsing_ports = True
+        self.graph.add_node(target, type="ip")
+        self.graph.add_node("nmap", type="tool")
+        self.graph.add_edge(
+            target,
+            "nmap",
+            label="nmap",
+            timestamp=datetime.datetime.now().isoformat(),
+        )
+
+        # Extract open ports from Nmap output
+        parsing_ports = False
+        for line in output.splitlines():
+            line = line.strip()
+            if line.startswith("PORT"):
+                parsing_ports = True
+                continue
+            if parsing_ports:
+                if not line:
+                    parsing_ports = False
                     continue
-                if parsing_ports:
-                    if not line:
-                        parsing_ports = False
-                        continue
-                    parts = line.split()
-                    if len(parts) >= 3:
-                        port_proto = parts[0]  # e.g. 80/tcp
-                        state = parts[1]  # e.g. open
-                        service = parts[2]  # e.g. http
-                        if state == "open":
-                            port_node = f"port:{port_proto}/{service}"
-                            self.graph.add_node(port_node, type="port")
-                            self.graph.add_edge(
-                                target,
-                                port_node,
-                                label="open",
-                                timestamp=datetime.datetime.now().isoformat(),
-                            )
-                            if hasattr(self, "cli"):
-                                self.cli.log_graph(
-                                    f"Added node: {port_node} (type=port)"
-                                )
-                                self.cli.log_graph(
-                                    f"Added edge: {target} → {port_node} (label=open)"
-                                )
+                parts = line.split()
+                if len(parts) >= 3:
+                    port_proto = parts[0]  # e.g. 80/tcp
+                    state = parts[1]  # e.g. open
+                    service = parts[2]  # e.g. http
+                    if state == "open":
+                        port_node = f"port:{port_proto}/{service}"
+                        self.graph.add_node(port_node, type="port")
+                        self.graph.add_edge(
+                            target,
+                            port_node,
+                            label="open",
+                            timestamp=datetime.datetime.now().isoformat(),
+                        )
+                        self.cli.log_graph(
+                            f"Added node: {port_node} (type=port)"
+                        )
+                        self.cli.log_graph(
+                            f"Added edge: {target} → {port_node} (label=open)"
+                        )
+
+    def is_ipv6(self, value):
+        try:
+            return ipaddress.ip_address(value).version == 6
+        except ValueError:
+            return False
@@ -1,5 +1,4 @@
-import requests
-import socket
+import ipaddress
 from datetime import datetime
 from urllib.parse import urlparse
 
@@ -25,17 +24,24 @@ class Pdns:
             target = domain
 
         print(f"Querying Mnemonic Passive DNS for target: \033[96m{target}\033[0m")
-        url = f"https://api.mnemonic.no/pdns/v3/{target}?offset={offset}"
+        url = f"{self.http.session('pdns').base_url}/{target}?offset={offset}"
 
-        try:
-            response = requests.get(url, timeout=300)
+        def load():
+            response = self.http.session("pdns").get(url)
+            if response.status_code == 404:
+                return None
             response.raise_for_status()
-            data = response.json()
+            with self.tracer.span("parse", "module"):
+                data = response.json()
+            return data if data.get("data") else None
+
+        try:
+            data = self.cache.fetch("pdns", f"pdns?offset={offset}", target, load)
         except Exception as e:
-            print(f"\033[91mError:\033[0m Failed to contact Mnemonic PDNS API: {e}")
+            self.cli.module_error(f"Failed to contact Mnemonic PDNS API: {e}")
             return
 
-        records = data.get("data", [])
+        records = (data or {}).get("data", [])
         count = len(records)
 
         if not records:
@@ -62,36 +68,35 @@ class Pdns:
             print(f"  Last seen:  {last_seen}\n")
 
             # ─── Graph Integration ─────────────────────────────
-            if hasattr(self, "graph") and hasattr(self, "cli"):
-                # Determine direction
-                if self.is_ip(target):  # IP → domain
-                    self.graph.add_node(target, type="ip")
-                    self.graph.add_node(query, type="domain")
-                    self.graph.add_edge(
-                        target,
-                        query,
-                        label="pdns",
-                        timestamp=datetime.now().isoformat(),
-                    )
-                    self.cli.log_graph(f"Added node: {target} (type=ip)")
-                    self.cli.log_graph(f"Added node: {query} (type=domain)")
-                    self.cli.log_graph(f"Added edge: {target} → {query} (label=pdns)")
-                else:  # domain → IP
-                    self.graph.add_node(target, type="domain")
-                    self.graph.add_node(answer, type="ip")
-                    self.graph.add_edge(
-                        target,
-                        answer,
-                        label="pdns",
-                        timestamp=datetime.now().isoformat(),
-                    )
-                    self.cli.log_graph(f"Added node: {target} (type=domain)")
-                    self.cli.log_graph(f"Added node: {answer} (type=ip)")
-                    self.cli.log_graph(f"Added edge: {target} → {answer} (label=pdns)")
+            # Determine direction
+            if self.is_ip(target):  # IP → domain
+                self.graph.add_node(target, type="ip")
+                self.graph.add_node(query, type="domain")
+                self.graph.add_edge(
+                    target,
+                    query,
+                    label="pdns",
+                    timestamp=datetime.now().isoformat(),
+                )
+                self.cli.log_graph(f"Added node: {target} (type=ip)")
+                self.cli.log_graph(f"Added node: {query} (type=domain)")
+                self.cli.log_graph(f"Added edge: {target} → {query} (label=pdns)")
+            else:  # domain → IP
+                self.graph.add_node(target, type="domain")
+                self.graph.add_node(answer, type="ip")
+                self.graph.add_edge(
+                    target,
+                    answer,
+                    label="pdns",
+                    timestamp=datetime.now().isoformat(),
+                )
+                self.cli.log_graph(f"Added node: {target} (type=domain)")
+                self.cli.log_graph(f"Added node: {answer} (type=ip)")
+                self.cli.log_graph(f"Added edge: {target} → {answer} (label=pdns)")
 
     def is_ip(self, value):
         try:
-            socket.inet_aton(value)
+            ipaddress.ip_address(value)
             return True
-        except socket.error:
+        except ValueError:
             return False
@@ -22,30 +22,35 @@ class Ping:
             )
             target = domain
 
-        print(f"Pinging {target} with 3 packets...\n")
+        # Resolve through the shared DNS cache so ping itself doesn't have to
+        address = self.dns_cache.address(target)
+        if address != target:
+            print(f"Pinging {target} ({address}) with 3 packets...\n")
+        else:
+            print(f"Pinging {target} with 3 packets...\n")
         count_flag = "-n" if platform.system().lower() == "windows" else "-c"
         try:
-            result = subprocess.run(
-                ["ping", count_flag, "3", target],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+            with self.metrics.timer("subprocess", command="ping"):
+                result = subprocess.run(
+                    ["ping", count_flag, "3", address],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
             print(result.stdout)
         except subprocess.CalledProcessError as e:
             print("Ping failed:", e)
         except FileNotFoundError:
-            print(
+            self.cli.module_error(
                 "The 'ping' command is not available on this system. Please install it to use this module."
             )
 
         # ─── Graph integration ────────────────────────────────
-        if hasattr(self, "graph"):
-            self.graph.add_node(target, type="ip_or_domain")
-            self.graph.add_node("ping", type="tool")
-            self.graph.add_edge(
-                target,
-                "ping",
-                label="ping",
-                timestamp=datetime.datetime.now().isoformat(),
-            )
+        self.graph.add_node(target, type="ip_or_domain")
+        self.graph.add_node("ping", type="tool")
+        self.graph.add_edge(
+            target,
+            "ping",
+            label="ping",
+            timestamp=datetime.datetime.now().isoformat(),
+        )
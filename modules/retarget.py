@@ -12,18 +12,13 @@ class Retarget:
     )
 
     targets = ["ip", "domain", "url"]
+    interactive = True  # changes the CLI target, never run alongside other modules
 
     def __init__(self):
         self.extracted = []
         self.filtered = []
 
     def run(self, target, args):
-        if not hasattr(self, "cli"):
-            print(
-                "\033[91mError:\033[0m Retarget module must be bound to CLI instance."
-            )
-            return
-
         if not self.cli.log_file_path or not self.cli.log_file_path.exists():
             print("\033[91mError:\033[0m No active log file.")
             return
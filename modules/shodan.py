@@ -1,7 +1,5 @@
-import socket
+import ipaddress
 import requests
-import configparser
-from pathlib import Path
 from urllib.parse import urlparse
 from datetime import datetime
 
@@ -16,20 +14,13 @@ class Shodan:
 
     targets = ["ip", "domain", "url"]
 
-    def __init__(self):
-        self.api_key = None
-        self.load_api_key()
-
-    def load_api_key(self):
-        config_path = Path(__file__).parent / "shodan.conf"
-        if config_path.exists():
-            config = configparser.ConfigParser()
-            config.read(config_path)
-            self.api_key = config.get("DEFAULT", "api_key", fallback=None)
+    @property
+    def api_key(self):
+        return self.config.get("api_key")
 
     def resolve_domain_to_ip(self, domain):
         try:
-            ips = socket.gethostbyname_ex(domain)[2]
+            ips = self.dns_cache.addresses(domain)
             if not ips:
                 print("\033[91mError:\033[0m No A records found.")
                 return None
@@ -37,12 +28,12 @@ class Shodan:
                 print(f"\033[93mNote:\033[0m Multiple IPs found. Using first: {ips[0]}")
             return ips[0]
         except Exception as e:
-            print(f"\033[91mError:\033[0m DNS resolution failed: {e}")
+            self.cli.module_error(f"DNS resolution failed: {e}")
             return None
 
     def run(self, target, args):
         if not self.api_key:
-            print("\033[91mError:\033[0m Shodan API key not found in shodan.conf.")
+            self.cli.module_error("Shodan API key not found in shodan.conf.")
             return
 
         original = target
@@ -64,10 +55,11 @@ class Shodan:
 
         print(f"\033[94mQuerying Shodan for IP:\033[0m {target}")
         try:
-            url = f"https://api.shodan.io/shodan/host/{target}?key={self.api_key}"
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = self.cache.fetch("shodan", "host", target, lambda: self.fetch_host(target))
+
+            if data is None:
+                print(f"\033[93mNo Shodan data found for {target}.\033[0m")
+                return
 
             print("\n\033[92mGeneral Information:\033[0m")
             print(f"  \033[93mIP:\033[0m {data.get('ip_str', 'N/A')}")
@@ -99,82 +91,87 @@ class Shodan:
                     print(f"  \033[93mPort {port}:\033[0m {banner}")
 
             # ─── Graph Integration ────────────────────────────────
-            if hasattr(self, "graph") and hasattr(self, "cli"):
-                ip = data.get("ip_str", target)
-                self.graph.add_node(ip, type="ip")
-                self.cli.log_graph(f"Added node: {ip} (type=ip)")
-
-                # Hostnames
-                for h in data.get("hostnames", []):
-                    self.graph.add_node(h, type="hostname")
-                    self.graph.add_edge(
-                        ip, h, label="hostname", timestamp=datetime.now().isoformat()
-                    )
-                    self.cli.log_graph(f"Added node: {h} (type=hostname)")
-                    self.cli.log_graph(f"Added edge: {ip} → {h} (label=hostname)")
+            ip = data.get("ip_str", target)
+            self.graph.add_node(ip, type="ip")
+            self.cli.log_graph(f"Added node: {ip} (type=ip)")
 
-                # Ports
-                for port in data.get("ports", []):
-                    port_node = f"port_{port}"
-                    self.graph.add_node(port_node, type="port")
+            # Hostnames
+            for h in data.get("hostnames", []):
+                self.graph.add_node(h, type="hostname")
+                self.graph.add_edge(
+                    ip, h, label="hostname", timestamp=datetime.now().isoformat()
+                )
+                self.cli.log_graph(f"Added node: {h} (type=hostname)")
+                self.cli.log_graph(f"Added edge: {ip} → {h} (label=hostname)")
+
+            # Ports
+            for port in data.get("ports", []):
+                port_node = f"port_{port}"
+                self.graph.add_node(port_node, type="port")
+                self.graph.add_edge(
+                    ip,
+                    port_node,
+                    label="port",
+                    timestamp=datetime.now().isoformat(),
+                )
+                self.cli.log_graph(f"Added node: {port_node} (type=port)")
+                self.cli.log_graph(f"Added edge: {ip} → {port_node} (label=port)")
+
+            # Services
+            for svc in data.get("data", []):
+                port = svc.get("port")
+                service = svc.get("product") or svc.get("http", {}).get("title")
+                if service:
+                    svc_node = f"svc_{port}_{service}"
+                    self.graph.add_node(svc_node, type="service")
                     self.graph.add_edge(
                         ip,
-                        port_node,
-                        label="port",
+                        svc_node,
+                        label="service",
                         timestamp=datetime.now().isoformat(),
                     )
-                    self.cli.log_graph(f"Added node: {port_node} (type=port)")
-                    self.cli.log_graph(f"Added edge: {ip} → {port_node} (label=port)")
-
-                # Services
-                for svc in data.get("data", []):
-                    port = svc.get("port")
-                    service = svc.get("product") or svc.get("http", {}).get("title")
-                    if service:
-                        svc_node = f"svc_{port}_{service}"
-                        self.graph.add_node(svc_node, type="service")
-                        self.graph.add_edge(
-                            ip,
-                            svc_node,
-                            label="service",
-                            timestamp=datetime.now().isoformat(),
-                        )
-                        self.cli.log_graph(f"Added node: {svc_node} (type=service)")
-                        self.cli.log_graph(
-                            f"Added edge: {ip} → {svc_node} (label=service)"
-                        )
-
-                # Org and ASN
-                org = data.get("org")
-                if org:
-                    self.graph.add_node(org, type="org")
-                    self.graph.add_edge(
-                        ip, org, label="org", timestamp=datetime.now().isoformat()
+                    self.cli.log_graph(f"Added node: {svc_node} (type=service)")
+                    self.cli.log_graph(
+                        f"Added edge: {ip} → {svc_node} (label=service)"
                     )
-                    self.cli.log_graph(f"Added node: {org} (type=org)")
-                    self.cli.log_graph(f"Added edge: {ip} → {org} (label=org)")
 
-                asn = data.get("asn")
-                if asn:
-                    self.graph.add_node(asn, type="asn")
-                    self.graph.add_edge(
-                        ip, asn, label="asn", timestamp=datetime.now().isoformat()
-                    )
-                    self.cli.log_graph(f"Added node: {asn} (type=asn)")
-                    self.cli.log_graph(f"Added edge: {ip} → {asn} (label=asn)")
+            # Org and ASN
+            org = data.get("org")
+            if org:
+                self.graph.add_node(org, type="org")
+                self.graph.add_edge(
+                    ip, org, label="org", timestamp=datetime.now().isoformat()
+                )
+                self.cli.log_graph(f"Added node: {org} (type=org)")
+                self.cli.log_graph(f"Added edge: {ip} → {org} (label=org)")
+
+            asn = data.get("asn")
+            if asn:
+                self.graph.add_node(asn, type="asn")
+                self.graph.add_edge(
+                    ip, asn, label="asn", timestamp=datetime.now().isoformat()
+                )
+                self.cli.log_graph(f"Added node: {asn} (type=asn)")
+                self.cli.log_graph(f"Added edge: {ip} → {asn} (label=asn)")
 
         except requests.exceptions.HTTPError as e:
-            if response.status_code == 404:
-                print(f"\033[93mNo Shodan data found for {target}.\033[0m")
-            else:
-                print(f"\033[91mHTTP Error:\033[0m {e}")
-                print(f"\033[90mResponse:\033[0m {response.text}")
+            self.cli.module_error(e, "HTTP Error")
+            print(f"\033[90mResponse:\033[0m {e.response.text}")
         except Exception as e:
-            print(f"\033[91mError:\033[0m {e}")
+            self.cli.module_error(e)
+
+    def fetch_host(self, ip):
+        url = f"{self.http.session('shodan').base_url}/shodan/host/{ip}?key={self.api_key}"
+        response = self.http.session("shodan").get(url)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        with self.tracer.span("parse", "module"):
+            return response.json()
 
     def is_ip(self, value):
         try:
-            socket.inet_aton(value)
+            ipaddress.ip_address(value)
             return True
-        except socket.error:
+        except ValueError:
             return False
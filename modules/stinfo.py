@@ -1,7 +1,4 @@
-import requests
-import configparser
 from urllib.parse import urlparse
-from pathlib import Path
 from datetime import datetime
 
 
@@ -14,22 +11,13 @@ class Stinfo:
 
     targets = ["domain"]
 
-    def __init__(self):
-        self.api_key = None
-        self.load_api_key()
-
-    def load_api_key(self):
-        config_path = Path(__file__).parent / "stinfo.conf"
-        if config_path.exists():
-            config = configparser.ConfigParser()
-            config.read(config_path)
-            self.api_key = config.get("DEFAULT", "api_key", fallback=None)
+    @property
+    def api_key(self):
+        return self.config.get("api_key")
 
     def run(self, target, args):
         if not self.api_key:
-            print(
-                "\033[91mError:\033[0m SecurityTrails API key not found in stinfo.conf."
-            )
+            self.cli.module_error("SecurityTrails API key not found in stinfo.conf.")
             return
 
         if target.startswith("http"):
@@ -40,15 +28,25 @@ class Stinfo:
             target = domain
 
         print(f"Querying SecurityTrails for domain: \033[96m{target}\033[0m")
-        url = f"https://api.securitytrails.com/v1/domain/{target}"
+        url = f"{self.http.session('stinfo').base_url}/domain/{target}"
         headers = {"apikey": self.api_key}
 
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
+        def load():
+            response = self.http.session("stinfo").get(url, headers=headers)
+            if response.status_code == 404:
+                return None
             response.raise_for_status()
-            data = response.json()
+            with self.tracer.span("parse", "module"):
+                return response.json()
+
+        try:
+            data = self.cache.fetch("stinfo", "domain", target, load)
         except Exception as e:
-            print(f"\033[91mError:\033[0m {e}")
+            self.cli.module_error(e)
+            return
+
+        if data is None:
+            print("No current DNS records found.")
             return
 
         current_dns = data.get("current_dns", {})
@@ -67,20 +65,19 @@ class Stinfo:
                         if title == "TXT":
                             continue
                         # Graph node/edge
-                        if hasattr(self, "graph") and hasattr(self, "cli"):
-                            self.graph.add_node(value, type=title.lower())
-                            self.cli.log_graph(
-                                f"Added node: {value} (type={title.lower()})"
-                            )
-                            self.graph.add_edge(
-                                target,
-                                value,
-                                label=title,
-                                timestamp=datetime.now().isoformat(),
-                            )
-                            self.cli.log_graph(
-                                f"Added edge: {target} → {value} (label={title})"
-                            )
+                        self.graph.add_node(value, type=title.lower())
+                        self.cli.log_graph(
+                            f"Added node: {value} (type={title.lower()})"
+                        )
+                        self.graph.add_edge(
+                            target,
+                            value,
+                            label=title,
+                            timestamp=datetime.now().isoformat(),
+                        )
+                        self.cli.log_graph(
+                            f"Added edge: {target} → {value} (label={title})"
+                        )
 
         print("\n\033[94mDNS Records:\033[0m")
 
@@ -106,6 +103,5 @@ class Stinfo:
         print_records("SOA", current_dns.get("soa", {}).get("values", []), "email")
 
         # ─── Graph node for target ─────────────────────────────
-        if hasattr(self, "graph") and hasattr(self, "cli"):
-            self.graph.add_node(target, type="domain")
-            self.cli.log_graph(f"Added node: {target} (type=domain)")
+        self.graph.add_node(target, type="domain")
+        self.cli.log_graph(f"Added node: {target} (type=domain)")
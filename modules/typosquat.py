@@ -0,0 +1,314 @@
+import asyncio
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from datetime import datetime
+
+
+class Typosquat:
+    help = (
+        "typosquat: Generate lookalike domains of the target and find the registered ones.\n"
+        "Usage: typosquat [--concurrency N] [--only fuzzer,fuzzer]\n"
+        "Fuzzers: bitsquatting, homoglyph, idn, insertion, omission, repetition,\n"
+        "         replacement, transposition, hyphenation, tld\n"
+        "Supported target types: domain"
+    )
+
+    targets = ["domain"]
+
+    CONCURRENCY = 200  # queries in flight
+    DEDUPE_WINDOW = 50000  # recent candidates remembered to skip duplicates
+    TLDS = [
+        "com", "net", "org", "info", "biz", "co", "io", "me", "us", "uk", "de", "fr",
+        "nl", "eu", "ru", "cn", "in", "ca", "au", "cc", "tv", "ws", "xyz", "top",
+        "online", "site", "app", "dev", "shop", "store", "live", "link", "click",
+    ]
+    # Second-level labels under country TLDs, as in example.co.uk
+    SECOND_LEVEL = {"co", "com", "net", "org", "gov", "edu", "ac", "or", "ne", "go"}
+    KEYBOARD = {
+        "1": "2q", "2": "3wq1", "3": "4ew2", "4": "5re3", "5": "6tr4", "6": "7yt5",
+        "7": "8uy6", "8": "9iu7", "9": "0oi8", "0": "po9",
+        "q": "12wa", "w": "3esaq2", "e": "4rdsw3", "r": "5tfde4", "t": "6ygfr5",
+        "y": "7uhgt6", "u": "8ijhy7", "i": "9okju8", "o": "0plki9", "p": "lo0",
+        "a": "qwsz", "s": "edxzaw", "d": "rfcxse", "f": "tgvcdr", "g": "yhbvft",
+        "h": "ujnbgy", "j": "ikmnhu", "k": "olmji", "l": "kop",
+        "z": "asx", "x": "zsdc", "c": "xdfv", "v": "cfgb", "b": "vghn",
+        "n": "bhjm", "m": "njk",
+    }
+    # Lookalikes that stay plain ASCII
+    HOMOGLYPHS = {
+        "o": ["0"], "0": ["o"], "l": ["1", "i"], "i": ["1", "l"], "1": ["l", "i"],
+        "m": ["rn", "nn"], "w": ["vv"], "d": ["cl"], "rn": ["m"], "vv": ["w"], "cl": ["d"],
+        "g": ["q"], "q": ["g"], "u": ["v"], "v": ["u"], "b": ["6"], "s": ["5"], "z": ["2"],
+    }
+    # Unicode lookalikes; names using them are registered in punycode (xn--)
+    IDN_HOMOGLYPHS = {
+        "a": "àáâãäåɑаạ", "b": "ƅьḃ", "c": "çćċсϲ", "d": "ďđԁḋ", "e": "èéêëēėеẹ",
+        "g": "ġğǵɡ", "h": "һḣ", "i": "ìíîïıіɩ", "j": "јʝ", "k": "ķкκ", "l": "ḷӏ",
+        "m": "ṁм", "n": "ñńņṅ", "o": "òóôõöøοоọ", "p": "рρṗ", "q": "ԛ", "r": "ŗṙг",
+        "s": "śşѕṡ", "t": "ţṫτ", "u": "ùúûüυ", "v": "νѵ", "w": "ŵẁẃẅѡ", "x": "хχ",
+        "y": "ýÿуγ", "z": "źżžʐ",
+    }
+    LABEL_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789-")
+
+    def run(self, target, args):
+        if "dnslookup" not in self.cli.modules:
+            self.cli.module_error("typosquat resolves names with the dnslookup module, which is not loaded.")
+            return
+        # Queries go through dnslookup's resolvers, DNS cache and fallback handling
+        dnslookup = self.cli.modules["dnslookup"].load()
+        if dnslookup.primary_resolver is None:
+            dnslookup.setup_resolvers()
+        if target.startswith("http"):
+            target = urlparse(target).hostname
+        usage = "Usage: typosquat [--concurrency N] [--only fuzzer,fuzzer]"
+        fuzzers = self.fuzzers()
+        concurrency = int(self.config.get("concurrency", self.CONCURRENCY))
+        try:
+            if "--concurrency" in args:
+                concurrency = int(args[args.index("--concurrency") + 1])
+            if "--only" in args:
+                only = args[args.index("--only") + 1].split(",")
+                unknown = [name for name in only if name not in fuzzers]
+                if unknown:
+                    self.cli.module_error(f"Unknown fuzzer(s): {', '.join(unknown)}")
+                    return
+                fuzzers = {name: fuzzers[name] for name in only}
+        except (IndexError, ValueError):
+            print(usage)
+            return
+
+        domain = self.registered_domain(target)
+        if not domain:
+            self.cli.module_error(f"Cannot derive a registrable domain from '{target}'.")
+            return
+        label, suffix = domain.split(".", 1)
+        ascii_domain = ".".join(self.encode(part) or part for part in domain.split("."))
+        tlds = (
+            self.config["tlds"].split(",") if self.config.get("tlds") else self.TLDS
+        )
+        started = time.monotonic()
+        print(
+            f"\033[94mLookalike domains of {domain} ({', '.join(fuzzers)}),"
+            f" up to {concurrency} queries in flight\033[0m"
+        )
+        # Workers asking the same resolvers about the same lookalikes share one run
+        key = (
+            tuple(dnslookup.primary_resolver.nameservers),
+            dnslookup.primary_resolver.port,
+            ascii_domain,
+            tuple(fuzzers),
+            tuple(tlds),
+        )
+        leader = []
+
+        def find():
+            leader.append(True)
+            candidates = self.permutations(label, suffix, fuzzers, tlds)
+            return self.find(dnslookup, ascii_domain, candidates, max(1, concurrency))
+
+        hits, state = self.inflight.do("typosquat", key, find)
+        if not leader:  # the run that did the lookups printed its hits already
+            for hit in hits:
+                self.show(*hit)
+
+        elapsed = time.monotonic() - started
+        print(
+            f"\033[94mTyposquat done: {state['checked']} candidate(s) in {elapsed:.1f}s:\033[0m"
+            f" {state['registered']} registered, {state['failed']} failed,"
+            f" {state['duplicates']} duplicate(s) skipped"
+        )
+
+    def registered_domain(self, target):
+        """The name a lookalike would be registered under: example.co.uk for www.example.co.uk."""
+        try:
+            # Permute the Unicode form of an IDN, so homoglyphs apply to its letters
+            labels = target.lower().rstrip(".").encode("ascii").decode("idna").split(".")
+        except UnicodeError:
+            labels = target.lower().rstrip(".").split(".")
+        if len(labels) < 2 or not all(labels):
+            return None
+        if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in self.SECOND_LEVEL:
+            return ".".join(labels[-3:])
+        return ".".join(labels[-2:])
+
+    def fuzzers(self):
+        """Fuzzer name -> generator function of label permutations."""
+        return {
+            "bitsquatting": self.bitsquatting,
+            "homoglyph": self.homoglyph,
+            "idn": self.idn,
+            "insertion": self.insertion,
+            "omission": self.omission,
+            "repetition": self.repetition,
+            "replacement": self.replacement,
+            "transposition": self.transposition,
+            "hyphenation": self.hyphenation,
+            "tld": None,  # swaps the suffix instead of changing the label
+        }
+
+    def permutations(self, label, suffix, fuzzers, tlds):
+        """Yield (fuzzer, ascii name, display name) one candidate at a time."""
+        for name, fuzzer in fuzzers.items():
+            if fuzzer is None:
+                variants = ((label, tld) for tld in tlds if tld != suffix)
+            else:
+                variants = ((variant, suffix) for variant in fuzzer(label))
+            for variant, tld in variants:
+                ascii_label = self.encode(variant)
+                ascii_suffix = ".".join(self.encode(part) or "" for part in tld.split("."))
+                if ascii_label and all(ascii_suffix.split(".")):
+                    yield name, f"{ascii_label}.{ascii_suffix}", f"{variant}.{tld}"
+
+    def encode(self, label):
+        """ASCII (punycode) form of a label, or None if it isn't a valid hostname label."""
+        try:
+            encoded = label.encode("idna").decode("ascii") if not label.isascii() else label
+        except UnicodeError:
+            return None
+        if (
+            not encoded
+            or len(encoded) > 63
+            or encoded[0] == "-"
+            or encoded[-1] == "-"
+            or not set(encoded) <= self.LABEL_CHARS
+        ):
+            return None
+        return encoded
+
+    def dedupe(self, candidates, domain, state):
+        """Drop candidates seen within the last DEDUPE_WINDOW, keeping memory bounded.
+
+        Fuzzers overlap mostly on nearby candidates (omission and
+        transposition of doubled letters, say), so a window catches nearly
+        every duplicate without remembering the whole set.
+        """
+        seen = OrderedDict()
+        seen[domain] = None
+        for fuzzer, name, display in candidates:
+            if name in seen:
+                seen.move_to_end(name)
+                state["duplicates"] += 1
+                continue
+            seen[name] = None
+            if len(seen) > self.DEDUPE_WINDOW:
+                seen.popitem(last=False)
+            yield fuzzer, name, display
+
+    # ─── Fuzzers ─────────────────────────────
+
+    def bitsquatting(self, label):
+        for i, char in enumerate(label):
+            for bit in range(8):
+                flipped = chr(ord(char) ^ (1 << bit)).lower()
+                if flipped in self.LABEL_CHARS and flipped != char:
+                    yield label[:i] + flipped + label[i + 1:]
+
+    def homoglyph(self, label):
+        for glyph, replacements in self.HOMOGLYPHS.items():
+            start = label.find(glyph)
+            while start != -1:
+                for replacement in replacements:
+                    yield label[:start] + replacement + label[start + len(glyph):]
+                start = label.find(glyph, start + 1)
+
+    def idn(self, label):
+        for i, char in enumerate(label):
+            for replacement in self.IDN_HOMOGLYPHS.get(char, ""):
+                yield label[:i] + replacement + label[i + 1:]
+
+    def insertion(self, label):
+        for i, char in enumerate(label):
+            for key in self.KEYBOARD.get(char, ""):
+                yield label[:i] + key + label[i:]
+                yield label[:i + 1] + key + label[i + 1:]
+
+    def omission(self, label):
+        for i in range(len(label)):
+            yield label[:i] + label[i + 1:]
+
+    def repetition(self, label):
+        for i, char in enumerate(label):
+            if char.isalnum():
+                yield label[:i] + char + label[i:]
+
+    def replacement(self, label):
+        for i, char in enumerate(label):
+            for key in self.KEYBOARD.get(char, ""):
+                yield label[:i] + key + label[i + 1:]
+
+    def transposition(self, label):
+        for i in range(len(label) - 1):
+            if label[i] != label[i + 1]:
+                yield label[:i] + label[i + 1] + label[i] + label[i + 2:]
+
+    def hyphenation(self, label):
+        for i in range(1, len(label)):
+            yield label[:i] + "-" + label[i:]
+
+    # ─── Resolution ──────────────────────────
+
+    def find(self, dnslookup, domain, candidates, concurrency):
+        """Resolve candidates, printing registered ones as they arrive.
+
+        Returns (hits, state): hits are (fuzzer, name, display, addresses)
+        tuples and state counts what was checked.
+        """
+        state = {"duplicates": 0, "checked": 0, "registered": 0, "failed": 0}
+        pending = {}  # name -> (fuzzer, display) while its query is in flight
+        hits = []
+        last_progress = time.monotonic()
+
+        def names():
+            for fuzzer, name, display in self.dedupe(candidates, domain, state):
+                pending[name] = fuzzer, display
+                yield name
+
+        def on_result(name, result):
+            nonlocal last_progress
+            fuzzer, display = pending.pop(name)
+            state["checked"] += 1
+            if time.monotonic() - last_progress > 10:
+                last_progress = time.monotonic()
+                self.cli.log(
+                    f"[typosquat] {domain}: {state['checked']} checked,"
+                    f" {state['registered']} registered"
+                )
+            if isinstance(result, Exception):
+                state["failed"] += 1
+                return
+            _, rcode, addresses = result
+            if rcode == "NXDOMAIN":
+                return
+            state["registered"] += 1
+            hits.append((fuzzer, name, display, addresses))
+            self.show(fuzzer, name, display, addresses)
+            self.add_lookalike(domain, name, fuzzer, addresses)
+
+        try:
+            asyncio.run(dnslookup.resolve_stream(names(), "A", concurrency, on_result))
+        except KeyboardInterrupt:
+            print("\033[93mInterrupted.\033[0m")
+        return hits, state
+
+    def show(self, fuzzer, name, display, addresses):
+        shown = name if name == display else f"{name} ({display})"
+        print(f"  \033[93m{fuzzer:<14}\033[0m {shown} {' '.join(addresses)}".rstrip())
+
+    def add_lookalike(self, domain, name, fuzzer, addresses):
+        # ─── Graph ─────────────────────────────
+        self.graph.add_node(domain, type="domain")
+        self.graph.add_node(name, type="domain")
+        self.graph.add_edge(
+            domain,
+            name,
+            label="lookalike",
+            fuzzer=fuzzer,
+            timestamp=datetime.now().isoformat(),
+        )
+        self.cli.log_graph(f"Added node: {name} (type=domain)")
+        self.cli.log_graph(f"Added edge: {domain} → {name} (label=lookalike)")
+        for address in addresses:
+            self.graph.add_node(address, type="ip")
+            self.graph.add_edge(name, address, label="A", timestamp=datetime.now().isoformat())
+            self.cli.log_graph(f"Added edge: {name} → {address} (label=A)")
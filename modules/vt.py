@@ -1,8 +1,5 @@
-import requests
-import configparser
-import re
+import ipaddress
 from urllib.parse import urlparse
-from pathlib import Path
 from datetime import datetime
 
 
@@ -15,20 +12,13 @@ class Vt:
 
     targets = ["ip", "domain", "url"]
 
-    def __init__(self):
-        self.api_key = None
-        self.load_api_key()
-
-    def load_api_key(self):
-        config_path = Path(__file__).parent / "vt.conf"
-        if config_path.exists():
-            config = configparser.ConfigParser()
-            config.read(config_path)
-            self.api_key = config.get("DEFAULT", "api_key", fallback=None)
+    @property
+    def api_key(self):
+        return self.config.get("api_key")
 
     def run(self, target, args):
         if not self.api_key:
-            print("\033[91mError:\033[0m VirusTotal API key not found in vt.conf.")
+            self.cli.module_error("VirusTotal API key not found in vt.conf.")
             return
 
         # Normalize domain from URL if needed
@@ -42,7 +32,7 @@ class Vt:
         self.query_virustotal(target)
 
     def query_virustotal(self, target):
-        base_url = "https://www.virustotal.com/api/v3"
+        base_url = self.http.session("vt").base_url
         headers = {"x-apikey": self.api_key}
         target_type = self.classify_target(target)
 
@@ -53,17 +43,16 @@ class Vt:
         }
 
         if target_type not in endpoint_map:
-            print(f"\033[91mError:\033[0m Unsupported target type: {target_type}")
+            self.cli.module_error(f"Unsupported target type: {target_type}")
             return
 
-        try:
+        def load():
             if target_type == "url":
                 # For URLs, first submit it to get its analysis ID
-                response = requests.post(
+                response = self.http.session("vt").post(
                     f"{base_url}/urls",
                     headers=headers,
                     data={"url": target},
-                    timeout=15,
                 )
                 response.raise_for_status()
                 analysis_id = response.json()["data"]["id"]
@@ -72,11 +61,21 @@ class Vt:
                 endpoint = endpoint_map[target_type]
 
             url = f"{base_url}{endpoint}"
-            response = requests.get(url, headers=headers, timeout=15)
+            response = self.http.session("vt").get(url, headers=headers)
+            if response.status_code == 404:
+                return None
             response.raise_for_status()
-            data = response.json()
+            with self.tracer.span("parse", "module"):
+                return response.json()
+
+        try:
+            data = self.cache.fetch("vt", target_type, target, load)
         except Exception as e:
-            print(f"\033[91mError:\033[0m API request failed: {e}")
+            self.cli.module_error(f"API request failed: {e}")
+            return
+
+        if data is None:
+            print(f"\033[93mNo VirusTotal data found for {target}.\033[0m")
             return
 
         print(f"\033[94mVirusTotal results for {target} ({target_type}):\033[0m\n")
@@ -96,8 +95,7 @@ class Vt:
         for label, value in fields:
             if value:
                 print(f"\033[93m{label}:\033[0m {value}")
-                if hasattr(self, "cli"):
-                    self.cli.log(f"[vt] {label}: {value}")
+                self.cli.log(f"[vt] {label}: {value}")
 
         # Last analysis results
         engines = attributes.get("last_analysis_results", {})
@@ -122,115 +120,113 @@ class Vt:
                     color = "\033[90m"  # gray
 
                 print(f"  {color}{engine}: {category}\033[0m")
-                if hasattr(self, "cli"):
-                    self.cli.log(f"[vt] {engine}: {category}")
+                self.cli.log(f"[vt] {engine}: {category}")
 
         # Graph integration
-        if hasattr(self, "graph"):
-            self.graph.add_node(target, type=target_type)
-            self.graph.add_node("virustotal", type="tool")
+        self.graph.add_node(target, type=target_type)
+        self.graph.add_node("virustotal", type="tool")
+        self.graph.add_edge(
+            target,
+            "virustotal",
+            label="vt_query",
+            timestamp=datetime.now().isoformat(),
+        )
+        self.cli.log_graph(f"Added node: {target} (type={target_type})")
+        self.cli.log_graph("Added node: virustotal (type=tool)")
+        self.cli.log_graph(
+            f"Added edge: {target} → virustotal (label=vt_query)"
+        )
+
+        # Graph some relationships
+        self.graph.add_node(target, type=target_type)
+        self.graph.add_node("virustotal", type="tool")
+
+        self.graph.add_edge(
+            target,
+            "virustotal",
+            label="vt_query",
+            timestamp=datetime.now().isoformat(),
+        )
+        self.cli.log_graph(f"Added node: {target} (type={target_type})")
+        self.cli.log_graph("Added node: virustotal (type=tool)")
+        self.cli.log_graph(
+            f"Added edge: {target} → virustotal (label=vt_query)"
+        )
+
+        # Tags
+        for tag in attributes.get("tags", []):
+            self.graph.add_node(tag, type="vt_tag")
             self.graph.add_edge(
-                target,
                 "virustotal",
-                label="vt_query",
+                tag,
+                label="tag",
                 timestamp=datetime.now().isoformat(),
             )
-            if hasattr(self, "cli"):
-                self.cli.log_graph(f"Added node: {target} (type={target_type})")
-                self.cli.log_graph("Added node: virustotal (type=tool)")
-                self.cli.log_graph(
-                    f"Added edge: {target} → virustotal (label=vt_query)"
-                )
+            self.cli.log_graph(f"Added node: {tag} (type=vt_tag)")
+            self.cli.log_graph(
+                f"Added edge: virustotal → {tag} (label=tag)"
+            )
+
+        # Categories
+        for cat_val in attributes.get("categories", {}).values():
+            self.graph.add_node(cat_val, type="vt_category")
+            self.graph.add_edge(
+                "virustotal",
+                cat_val,
+                label="category",
+                timestamp=datetime.now().isoformat(),
+            )
+            self.cli.log_graph(f"Added node: {cat_val} (type=vt_category)")
+            self.cli.log_graph(
+                f"Added edge: virustotal → {cat_val} (label=category)"
+            )
 
-            # Graph some relationships
-            if hasattr(self, "graph"):
-                self.graph.add_node(target, type=target_type)
-                self.graph.add_node("virustotal", type="tool")
+        # Reputation
+        rep = attributes.get("reputation")
+        if rep is not None:
+            rep_node = f"vt_reputation:{rep}"
+            self.graph.add_node(rep_node, type="vt_score")
+            self.graph.add_edge(
+                "virustotal",
+                rep_node,
+                label="reputation",
+                timestamp=datetime.now().isoformat(),
+            )
+            self.cli.log_graph(f"Added node: {rep_node} (type=vt_score)")
+            self.cli.log_graph(
+                f"Added edge: virustotal → {rep_node} (label=reputation)"
+            )
 
+        # Stats (e.g., malicious: 3)
+        stats = attributes.get("last_analysis_stats", {})
+        for key, val in stats.items():
+            if val > 0:
+                stat_node = f"vt_{key}:{val}"
+                self.graph.add_node(stat_node, type="vt_stat")
                 self.graph.add_edge(
-                    target,
                     "virustotal",
-                    label="vt_query",
+                    stat_node,
+                    label="analysis",
                     timestamp=datetime.now().isoformat(),
                 )
-                if hasattr(self, "cli"):
-                    self.cli.log_graph(f"Added node: {target} (type={target_type})")
-                    self.cli.log_graph("Added node: virustotal (type=tool)")
-                    self.cli.log_graph(
-                        f"Added edge: {target} → virustotal (label=vt_query)"
-                    )
-
-                # Tags
-                for tag in attributes.get("tags", []):
-                    self.graph.add_node(tag, type="vt_tag")
-                    self.graph.add_edge(
-                        "virustotal",
-                        tag,
-                        label="tag",
-                        timestamp=datetime.now().isoformat(),
-                    )
-                    if hasattr(self, "cli"):
-                        self.cli.log_graph(f"Added node: {tag} (type=vt_tag)")
-                        self.cli.log_graph(
-                            f"Added edge: virustotal → {tag} (label=tag)"
-                        )
-
-                # Categories
-                for cat_val in attributes.get("categories", {}).values():
-                    self.graph.add_node(cat_val, type="vt_category")
-                    self.graph.add_edge(
-                        "virustotal",
-                        cat_val,
-                        label="category",
-                        timestamp=datetime.now().isoformat(),
-                    )
-                    if hasattr(self, "cli"):
-                        self.cli.log_graph(f"Added node: {cat_val} (type=vt_category)")
-                        self.cli.log_graph(
-                            f"Added edge: virustotal → {cat_val} (label=category)"
-                        )
-
-                # Reputation
-                rep = attributes.get("reputation")
-                if rep is not None:
-                    rep_node = f"vt_reputation:{rep}"
-                    self.graph.add_node(rep_node, type="vt_score")
-                    self.graph.add_edge(
-                        "virustotal",
-                        rep_node,
-                        label="reputation",
-                        timestamp=datetime.now().isoformat(),
-                    )
-                    if hasattr(self, "cli"):
-                        self.cli.log_graph(f"Added node: {rep_node} (type=vt_score)")
-                        self.cli.log_graph(
-                            f"Added edge: virustotal → {rep_node} (label=reputation)"
-                        )
-
-                # Stats (e.g., malicious: 3)
-                stats = attributes.get("last_analysis_stats", {})
-                for key, val in stats.items():
-                    if val > 0:
-                        stat_node = f"vt_{key}:{val}"
-                        self.graph.add_node(stat_node, type="vt_stat")
-                        self.graph.add_edge(
-                            "virustotal",
-                            stat_node,
-                            label="analysis",
-                            timestamp=datetime.now().isoformat(),
-                        )
-                        if hasattr(self, "cli"):
-                            self.cli.log_graph(
-                                f"Added node: {stat_node} (type=vt_stat)"
-                            )
-                            self.cli.log_graph(
-                                f"Added edge: virustotal → {stat_node} (label=analysis)"
-                            )
+                self.cli.log_graph(
+                    f"Added node: {stat_node} (type=vt_stat)"
+                )
+                self.cli.log_graph(
+                    f"Added edge: virustotal → {stat_node} (label=analysis)"
+                )
+
+    def is_ip(self, value):
+        try:
+            ipaddress.ip_address(value)
+            return True
+        except ValueError:
+            return False
 
     def classify_target(self, value):
         if value.startswith("http"):
             return "url"
-        elif re.match(r"^\d{1,3}(\.\d{1,3}){3}$", value):
+        elif self.is_ip(value):
             return "ip"
         else:
             return "domain"
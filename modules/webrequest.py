@@ -1,3 +1,4 @@
+import ipaddress
 import requests
 from urllib.parse import urlparse
 import datetime
@@ -24,17 +25,24 @@ class Webrequest:
 
         print(f"\033[94mScanning HTTP/HTTPS services for {target}...\033[0m")
 
+        ports = self.COMMON_PORTS
+        if self.config.get("ports"):
+            ports = [int(port) for port in self.config["ports"].split(",")]
+
+        # IPv6 literals are bracketed in URLs and Host headers
+        netloc = f"[{host}]" if self.is_ipv6(host) else host
+
         for scheme in ["http", "https"]:
-            for port in self.COMMON_PORTS:
-                url = f"{scheme}://{host}:{port}"
+            for port in ports:
+                url = f"{scheme}://{netloc}:{port}"
                 headers = {
                     "User-Agent": self.USER_AGENT,
-                    "Host": host,  # always supply for IPs or domains
+                    "Host": netloc,  # always supply for IPs or domains
                 }
 
                 try:
-                    response = requests.get(
-                        url, headers=headers, allow_redirects=True, timeout=5
+                    response = self.http.session("webrequest").get(
+                        url, headers=headers, allow_redirects=True
                     )
 
                     print(
@@ -56,40 +64,42 @@ class Webrequest:
                             )
 
                     # Logging
-                    if hasattr(self, "cli"):
-                        self.cli.log(f"[webrequest] Response from {url}")
-                        self.cli.log(f"[webrequest] Status: {response.status_code}")
-                        self.cli.log(f"[webrequest] Final URL: {response.url}")
-                        for k, v in response.headers.items():
-                            self.cli.log(f"[webrequest] Header: {k}: {v}")
-                        self.cli.log(
-                            f"[webrequest] Body size: {len(response.content)} bytes"
-                        )
-                        if response.history:
-                            for step in response.history:
-                                self.cli.log(
-                                    f"[webrequest] Redirect: {step.status_code} → {step.headers.get('Location')}"
-                                )
+                    self.cli.log(f"[webrequest] Response from {url}")
+                    self.cli.log(f"[webrequest] Status: {response.status_code}")
+                    self.cli.log(f"[webrequest] Final URL: {response.url}")
+                    for k, v in response.headers.items():
+                        self.cli.log(f"[webrequest] Header: {k}: {v}")
+                    self.cli.log(
+                        f"[webrequest] Body size: {len(response.content)} bytes"
+                    )
+                    if response.history:
+                        for step in response.history:
+                            self.cli.log(
+                                f"[webrequest] Redirect: {step.status_code} → {step.headers.get('Location')}"
+                            )
 
                     # Graph
-                    if hasattr(self, "graph"):
-                        node_label = f"{scheme}://{host}:{port}"
-                        self.graph.add_node(node_label, type="web")
-                        self.graph.add_edge(
-                            target,
-                            node_label,
-                            label=f"{scheme.upper()} {response.status_code}",
-                            timestamp=datetime.datetime.now().isoformat(),
-                        )
-                        if hasattr(self, "cli"):
-                            self.cli.log_graph(f"Added node: {node_label} (type=web)")
-                            self.cli.log_graph(
-                                f"Added edge: {target} → {node_label} (label={scheme.upper()} {response.status_code})"
-                            )
+                    node_label = url
+                    self.graph.add_node(node_label, type="web")
+                    self.graph.add_edge(
+                        target,
+                        node_label,
+                        label=f"{scheme.upper()} {response.status_code}",
+                        timestamp=datetime.datetime.now().isoformat(),
+                    )
+                    self.cli.log_graph(f"Added node: {node_label} (type=web)")
+                    self.cli.log_graph(
+                        f"Added edge: {target} → {node_label} (label={scheme.upper()} {response.status_code})"
+                    )
 
                 except requests.exceptions.ConnectionError:
                     continue
                 except requests.exceptions.RequestException as e:
                     print(f"\033[91m[-] {url} failed:\033[0m {e}")
-                    if hasattr(self, "cli"):
-                        self.cli.log(f"[webrequest] Request failed for {url}: {e}")
+                    self.cli.log(f"[webrequest] Request failed for {url}: {e}")
+
+    def is_ipv6(self, value):
+        try:
+            return ipaddress.ip_address(value).version == 6
+        except ValueError:
+            return False
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ip_investigator  # noqa: E402
+
+
+@pytest.fixture
+def conf_dir(tmp_path, monkeypatch):
+    """An empty module .conf directory; write <name>.conf files into it."""
+    path = tmp_path / "conf"
+    path.mkdir()
+    monkeypatch.setenv("IPINV_CONF_DIR", str(path))
+    monkeypatch.setattr(ip_investigator, "_module_configs", {})
+    return path
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch, conf_dir):
+    """A CLI whose logs, saves and caches live in tmp_path."""
+    monkeypatch.setattr(ip_investigator, "LOG_DIR", tmp_path / "log")
+    monkeypatch.setattr(ip_investigator, "SAVE_DIR", tmp_path / "saves")
+    monkeypatch.setattr(ip_investigator, "CACHE_FILE", tmp_path / "saves" / "responses.sqlite")
+    monkeypatch.setattr(ip_investigator, "DNS_CACHE_FILE", tmp_path / "saves" / "dns_cache.json")
+    monkeypatch.setattr(ip_investigator, "QUOTA_FILE", tmp_path / "saves" / "quota.json")
+    monkeypatch.setattr(sys, "stdout", sys.stdout)  # the CLI wraps it; undo that afterwards
+    (tmp_path / "log").mkdir()
+    instance = ip_investigator.IPInvestigatorCLI(use_cache=False, sync_log=True)
+    yield instance
+    instance.do_exit(None)
+
+
+@pytest.fixture
+def capture_stdout(monkeypatch):
+    """Call from the test body to let cli capture module output.
+
+    pytest swaps sys.stdout between test phases, so the ThreadLocalStdout the
+    CLI installs during fixture setup is gone by the time the test runs.
+    """
+    return lambda: monkeypatch.setattr(
+        sys, "stdout", ip_investigator.ThreadLocalStdout(sys.stdout)
+    )
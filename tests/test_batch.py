@@ -0,0 +1,108 @@
+import threading
+import time
+
+import ip_investigator
+
+
+class Echo:
+    help = "test module"
+    targets = ["ip", "domain"]
+
+    def __init__(self):
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def run(self, target, args):
+        with self.lock:
+            self.seen.append(target)
+        print(f"echo {target} {' '.join(args)}")
+
+
+class Picky:
+    """Fails on one domain the way API modules report errors."""
+
+    help = "test module"
+    targets = ["domain"]
+
+    def run(self, target, args):
+        if target == "bad.example":
+            self.cli.module_error("no API key")
+        else:
+            print("Nothing found.")
+
+
+class Broken:
+    help = "test module"
+    targets = ["ip"]
+
+    def run(self, target, args):
+        raise RuntimeError("boom")
+
+
+def add_modules(cli, **modules):
+    for name, module in modules.items():
+        module.cli = cli
+        cli.modules[name] = module
+
+
+def test_every_target_is_investigated(cli, capture_stdout, capsys):
+    capture_stdout()
+    echo = Echo()
+    add_modules(cli, echo=echo)
+    lines = ["example.com\n", "# comment\n", "\n", "192.0.2.1\n", "https://example.org/x\n"]
+    cli.run_batch(lines, ["echo -v"], workers=2)
+    assert sorted(echo.seen) == ["192.0.2.1", "example.com", "example.org"]
+    out = capsys.readouterr().out
+    assert "Batch finished: 3 target(s)" in out
+    assert "Failures" not in out
+    assert cli.target is None
+
+
+def test_failures_are_summarized_per_module(cli, capture_stdout, capsys):
+    capture_stdout()
+    add_modules(cli, picky=Picky(), broken=Broken())
+    cli.run_batch(["good.example", "bad.example", "192.0.2.1"], ["picky", "broken", "nosuch"])
+    out = ip_investigator.strip_ansi(capsys.readouterr().out)
+    assert "Failures: 8 across 3 target(s)" in out
+    assert "  nosuch       3" in out
+    assert "  broken       3" in out  # two unsupported targets and one exception
+    assert "  picky        2" in out  # bad.example and the unsupported IP
+    assert "bad.example [picky] no API key" in out
+    assert "192.0.2.1 [broken] boom" in out
+    assert "good.example [picky]" not in out
+
+
+def test_each_target_gets_its_own_log(cli, capture_stdout, tmp_path):
+    capture_stdout()
+    add_modules(cli, echo=Echo())
+    cli.run_batch(["example.com", "192.0.2.1"], ["echo"])
+    for target in ("example.com", "192.0.2.1"):
+        (log,) = (tmp_path / "log").glob(f"{target}_*.log")
+        text = log.read_text()
+        assert f"echo {target}" in text
+        other = "192.0.2.1" if target == "example.com" else "example.com"
+        assert f"echo {other}" not in text
+
+
+def test_targets_are_read_lazily(cli, capture_stdout):
+    capture_stdout()
+    release = threading.Event()
+    read = []
+
+    class Slow(Echo):
+        def run(self, target, args):
+            release.wait(5)
+
+    def lines():
+        for i in range(1, 101):
+            read.append(i)
+            yield f"192.0.2.{i}"
+
+    add_modules(cli, slow=Slow())
+    batch = threading.Thread(target=cli.run_batch, args=(lines(), ["slow"]), kwargs={"workers": 2})
+    batch.start()
+    time.sleep(0.2)
+    assert len(read) <= 2 * 2 + 1  # queued targets plus the one waiting to be queued
+    release.set()
+    batch.join(10)
+    assert len(read) == 100
@@ -0,0 +1,93 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import ip_investigator
+
+BENCH_DIR = Path(__file__).resolve().parent.parent / "bench"
+sys.path.insert(0, str(BENCH_DIR))
+
+from run import SINGLE_MODULES, summarize, write_configs  # noqa: E402
+from servers import BenchServers  # noqa: E402
+
+
+@pytest.fixture
+def servers(tmp_path, conf_dir, monkeypatch):
+    with BenchServers(tmp_path) as servers:
+        write_configs(conf_dir, servers.module_configs())
+        monkeypatch.setattr(ip_investigator, "_module_configs", {})
+        yield servers
+
+
+def test_modules_run_against_the_stand_ins(servers, cli, capture_stdout):
+    capture_stdout()
+    targets = {
+        "ip": "198.51.100.7",
+        "domain": "example.test",
+        "http": f"http://localhost:{servers.http.port}/",
+        "https": f"https://localhost:{servers.https.port}/" if servers.https else None,
+    }
+    for name, target_type in SINGLE_MODULES.items():
+        if targets[target_type] is None:
+            continue  # no openssl for the TLS endpoint
+        output, error = cli.run_module(name, cli.modules[name], targets[target_type], [])
+        assert error is None, f"{name}: {error}\n{output}"
+        assert output.strip(), name
+    requests = cli.metrics.counter_totals("http_responses_total", "provider")
+    assert {"vt", "shodan", "ipinfo", "stinfo", "pdns"} <= requests.keys()
+
+
+def test_summarize():
+    summary = summarize([0.3, 0.1, 0.2, 0.4])
+    assert summary == {
+        "runs": 4,
+        "mean": pytest.approx(0.25),
+        "p50": 0.3,
+        "p95": 0.4,
+        "min": 0.1,
+        "max": 0.4,
+    }
+
+
+def result(mean, throughput, **config):
+    return {
+        "commit": "abc1234",
+        "timestamp": "2026-01-01T00:00:00",
+        "config": {"iterations": 20, **config},
+        "single": {"vt": {"mean": mean, "p95": mean * 2}},
+        "batch": {"ip": {"targets_per_second": throughput}},
+    }
+
+
+def compare(tmp_path, old, new, *args):
+    files = []
+    for name, data in (("old.json", old), ("new.json", new)):
+        files.append(tmp_path / name)
+        files[-1].write_text(json.dumps(data))
+    return subprocess.run(
+        [sys.executable, str(BENCH_DIR / "compare.py"), *map(str, files), *args],
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_compare_passes_within_the_threshold(tmp_path):
+    run = compare(tmp_path, result(0.010, 100), result(0.0105, 96))
+    assert run.returncode == 0, run.stdout
+    assert "+5.0%" in run.stdout
+    assert "Regressions" not in run.stdout
+
+
+def test_compare_fails_on_regressions(tmp_path):
+    run = compare(tmp_path, result(0.010, 100), result(0.012, 80), "--threshold", "15")
+    assert run.returncode == 1
+    assert "vt mean latency +20%" in run.stdout
+    assert "ip batch throughput -20%" in run.stdout
+
+
+def test_compare_warns_about_different_settings(tmp_path):
+    run = compare(tmp_path, result(0.01, 100), result(0.01, 100, workers=16))
+    assert "different settings" in run.stdout
@@ -0,0 +1,169 @@
+import time
+
+import pytest
+import requests
+
+from ip_investigator import (
+    CircuitBreaker,
+    Metrics,
+    ProviderSession,
+    ProviderUnavailable,
+    QuotaExceeded,
+    Tracer,
+)
+
+
+class FakeLimiter:
+    def __init__(self, error=None):
+        self.error = error
+
+    def acquire(self, provider):
+        if self.error:
+            raise self.error
+
+    def observe(self, provider, response):
+        return False
+
+
+def open_breaker(breaker, cooldown_elapsed=True):
+    for _ in range(breaker.threshold):
+        breaker.failure()
+    if cooldown_elapsed:
+        breaker.opened_at -= breaker.cooldown
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker("test", threshold=3, cooldown=60)
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == "closed"
+    assert breaker.before() is False
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(ProviderUnavailable):
+        breaker.before()
+    with pytest.raises(ProviderUnavailable):
+        breaker.check()
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test", threshold=2, cooldown=60)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.state == "closed"
+
+
+def test_single_trial_after_cooldown():
+    breaker = CircuitBreaker("test", threshold=1, cooldown=60)
+    open_breaker(breaker)
+    breaker.check()  # does not claim the trial
+    assert breaker.before() is True
+    assert breaker.state == "half-open"
+    with pytest.raises(ProviderUnavailable):
+        breaker.before()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.before() is False
+
+
+def test_failed_trial_opens_the_circuit_again():
+    breaker = CircuitBreaker("test", threshold=5, cooldown=60)
+    open_breaker(breaker)
+    assert breaker.before() is True
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(ProviderUnavailable):
+        breaker.before()
+
+
+def test_released_trial_lets_the_next_call_try():
+    breaker = CircuitBreaker("test", threshold=1, cooldown=60)
+    open_breaker(breaker)
+    assert breaker.before() is True
+    breaker.release()
+    assert breaker.before() is True
+
+
+def test_zero_threshold_disables_the_breaker():
+    breaker = CircuitBreaker("test", threshold=0, cooldown=60)
+    for _ in range(100):
+        breaker.failure()
+    assert breaker.state == "closed"
+
+
+@pytest.fixture
+def session(conf_dir):
+    def make(limiter):
+        return ProviderSession("test", limiter, Metrics(), Tracer())
+
+    return make
+
+
+def test_quota_error_does_not_claim_the_trial(session):
+    provider = session(FakeLimiter(QuotaExceeded("test quota exhausted")))
+    open_breaker(provider.breaker)
+    with pytest.raises(QuotaExceeded):
+        provider.get("http://127.0.0.1:9/")
+    assert not provider.breaker.probing
+    assert provider.breaker.before() is True
+
+
+def test_non_transient_error_releases_the_trial(session, monkeypatch):
+    provider = session(FakeLimiter())
+    open_breaker(provider.breaker)
+
+    def invalid(*args, **kwargs):
+        raise requests.exceptions.InvalidURL("bad url")
+
+    monkeypatch.setattr(provider.session, "request", invalid)
+    with pytest.raises(requests.exceptions.InvalidURL):
+        provider.get("http://127.0.0.1:9/")
+    assert not provider.breaker.probing
+    assert provider.breaker.state == "half-open"
+    assert provider.breaker.before() is True
+
+
+def test_open_circuit_fails_before_waiting_for_a_token(session):
+    limiter = FakeLimiter()
+    limiter.acquire = lambda provider: pytest.fail("token taken while the circuit is open")
+    provider = session(limiter)
+    open_breaker(provider.breaker, cooldown_elapsed=False)
+    started = time.monotonic()
+    with pytest.raises(ProviderUnavailable):
+        provider.get("http://127.0.0.1:9/")
+    assert time.monotonic() - started < 1
+
+
+def failing_session(provider, monkeypatch, error):
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(kwargs["timeout"])
+        raise error
+
+    monkeypatch.setattr(provider.session, "request", fail)
+    monkeypatch.setattr(provider, "backoff", lambda attempt: 0)
+    return calls
+
+
+def test_read_timeout_is_not_retried(session, monkeypatch):
+    provider = session(FakeLimiter())
+    calls = failing_session(provider, monkeypatch, requests.exceptions.ReadTimeout())
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        provider.get("http://127.0.0.1:9/")
+    assert len(calls) == 1
+    assert provider.breaker.failures == 1
+
+
+def test_connect_timeout_is_retried(session, monkeypatch):
+    provider = session(FakeLimiter())
+    calls = failing_session(provider, monkeypatch, requests.exceptions.ConnectTimeout())
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        provider.get("http://127.0.0.1:9/")
+    assert len(calls) == provider.retries + 1
+
+
+def test_webrequest_connect_timeout_matches_its_read_timeout(conf_dir):
+    provider = ProviderSession("webrequest", FakeLimiter(), Metrics(), Tracer())
+    assert provider.timeout == (5, 5)
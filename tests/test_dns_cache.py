@@ -0,0 +1,130 @@
+import time
+
+import dns.message
+import dns.rrset
+import pytest
+
+import ip_investigator
+from ip_investigator import DnsCache, negative_ttl
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ip_investigator.time, "time", clock)
+    return clock
+
+
+class FakeAnswer:
+    def __init__(self, rrset, ttl, response=None):
+        self.rrset = rrset
+        self.expiration = time.time() + ttl
+        self.response = response
+
+
+class FakeNXDOMAIN:
+    def __init__(self, response):
+        self.response = response
+
+    def responses(self):
+        return {"example.": self.response}
+
+
+def soa_response(ttl, minimum):
+    response = dns.message.make_response(dns.message.make_query("example.com", "A"))
+    response.authority.append(
+        dns.rrset.from_text(
+            "example.com.", ttl, "IN", "SOA", f"ns. admin. 1 3600 600 86400 {minimum}"
+        )
+    )
+    return response
+
+
+def test_answer_expires_with_its_ttl(clock):
+    cache = DnsCache()
+    rrset = dns.rrset.from_text("example.com.", 30, "IN", "A", "192.0.2.1")
+    assert cache.store_answer("example.com", "A", FakeAnswer(rrset, 30), "Primary") == (
+        "NOERROR",
+        ["192.0.2.1"],
+    )
+    clock.now += 29
+    assert cache.get("Example.COM.", "a") == ("NOERROR", ["192.0.2.1"], "Primary")
+    clock.now += 1
+    assert cache.get("example.com", "A") is None
+
+
+def test_ttl_is_capped(clock):
+    cache = DnsCache()
+    cache.put("example.com", "A", "NOERROR", ["192.0.2.1"], ip_investigator.DNS_MAX_TTL * 10)
+    clock.now += ip_investigator.DNS_MAX_TTL
+    assert cache.get("example.com", "A") is None
+
+
+def test_negative_ttl_is_soa_ttl_or_minimum():
+    assert negative_ttl(soa_response(ttl=600, minimum=60)) == 60
+    assert negative_ttl(soa_response(ttl=30, minimum=60)) == 30
+    assert negative_ttl(None) == ip_investigator.DNS_NEGATIVE_TTL
+
+
+def test_nodata_expires_with_negative_ttl(clock):
+    cache = DnsCache()
+    answer = FakeAnswer(None, 0, response=soa_response(ttl=600, minimum=60))
+    assert cache.store_answer("example.com", "AAAA", answer) == ("NODATA", [])
+    clock.now += 59
+    assert cache.get("example.com", "AAAA")[:2] == ("NODATA", [])
+    assert cache.get("example.com", "A") is None  # NODATA is per record type
+    clock.now += 1
+    assert cache.get("example.com", "AAAA") is None
+
+
+def test_nxdomain_answers_every_type_until_it_expires(clock):
+    cache = DnsCache()
+    error = FakeNXDOMAIN(soa_response(ttl=120, minimum=900))
+    assert cache.store_nxdomain("gone.example.com", error) == ("NXDOMAIN", [])
+    clock.now += 119
+    assert cache.get("gone.example.com", "MX")[:2] == ("NXDOMAIN", [])
+    assert cache.get("gone.example.com", "A", nxdomain=False) is None
+    clock.now += 1
+    assert cache.get("gone.example.com", "MX") is None
+
+
+def test_oldest_entries_are_dropped_beyond_max_entries(clock):
+    cache = DnsCache(max_entries=2)
+    for name in ("a.example", "b.example"):
+        cache.put(name, "A", "NOERROR", ["192.0.2.1"], 60)
+    cache.get("a.example", "A")  # a is now the most recently used
+    cache.put("c.example", "A", "NOERROR", ["192.0.2.3"], 60)
+    assert cache.get("b.example", "A") is None
+    assert cache.get("a.example", "A") is not None
+
+
+def test_snapshot_keeps_only_unexpired_entries(clock, tmp_path):
+    path = tmp_path / "dns_cache.json"
+    cache = DnsCache(path)
+    cache.put("short.example", "A", "NOERROR", ["192.0.2.1"], 10)
+    cache.put("long.example", "A", "NOERROR", ["192.0.2.2"], 100)
+    cache.save()
+    clock.now += 50
+    restored = DnsCache(path)
+    assert restored.get("short.example", "A") is None
+    assert restored.get("long.example", "A")[:2] == ("NOERROR", ["192.0.2.2"])
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = DnsCache(tmp_path / "dns_cache.json", enabled=False)
+    cache.put("example.com", "A", "NOERROR", ["192.0.2.1"], 60)
+    assert cache.get("example.com", "A") is None
+    cache.save()
+    assert not (tmp_path / "dns_cache.json").exists()
+
+
+def test_no_cache_cli_disables_dns_cache(cli):
+    assert not cli.dns_cache.enabled
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from ip_investigator import EventLog, LogWriter
+
+
+@pytest.fixture
+def events(tmp_path):
+    writer = LogWriter(flush_interval=60)
+    log = EventLog(tmp_path / "session.jsonl", writer)
+    yield log
+    log.close()
+    writer.close()
+
+
+def test_read_seeks_to_the_indexed_events(events):
+    events.emit("target", {"target": "example.com"}, target="example.com")
+    events.emit("node", {"node": "192.0.2.1", "attrs": {}}, module="dns", target="example.com")
+    events.emit("output", {"text": "ünïcode"}, module="whois", target="example.com")
+    events.emit(
+        "edge",
+        {"src": "example.org", "dst": "192.0.2.1", "attrs": {}},
+        module="dns",
+        target="example.org",
+    )
+
+    assert [e["kind"] for e in events.read(target="example.com")] == ["target", "node", "output"]
+    assert [e["payload"]["text"] for e in events.read(module="whois")] == ["ünïcode"]
+    assert [e["target"] for e in events.read(indicator="192.0.2.1")] == [
+        "example.com",
+        "example.org",
+    ]
+    assert [e["kind"] for e in events.read(target="example.org", module="dns")] == ["edge"]
+    assert list(events.read(target="example.net")) == []
+    assert list(events.read()) == []
+
+
+def test_index_file_matches_the_event_offsets(events):
+    for i in range(3):
+        events.emit("output", {"text": f"run {i}"}, module="ping", target="example.com")
+    events.save_index()
+    index = json.loads(events.index_path.read_text())
+    data = events.path.read_bytes()
+    assert index["version"] == EventLog.INDEX_VERSION
+    assert index["events"] == "session.jsonl"
+    assert index["size"] == len(data)
+    for offset in index["modules"]["ping"]:
+        assert json.loads(data[offset:].split(b"\n", 1)[0])["module"] == "ping"
+
+
+def test_appending_to_an_existing_log_keeps_offsets_right(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_text('{"earlier": "session"}\n')
+    writer = LogWriter(sync=True)
+    log = EventLog(path, writer)
+    log.emit("output", {"text": "now"}, target="example.com")
+    assert [e["payload"] for e in log.read(target="example.com")] == [{"text": "now"}]
+    log.close()
+
+
+def test_cli_records_graph_changes_and_output_per_target(cli, capsys):
+    cli.do_target("example.com")
+    cli.context.module = "dns"
+    cli.graph.add_edge("example.com", "192.0.2.1", label="A")
+    cli.context.module = None
+    cli.record_output("whois", "Registrar: Example")
+    kinds = [(e["kind"], e["module"]) for e in cli.events.read(target="example.com")]
+    assert kinds == [
+        ("target", None),
+        ("node", "dns"),
+        ("node", "dns"),
+        ("edge", "dns"),
+        ("output", "whois"),
+    ]
+    capsys.readouterr()
+    cli.do_events("whois")
+    assert "[output] Registrar: Example" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+import threading
+
+
+class FakeDomain:
+    """Resolves a domain to three IPs, spending one API request per run."""
+
+    help = "test module"
+    targets = ["domain"]
+
+    def __init__(self):
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def run(self, target, args):
+        with self.lock:
+            self.seen.append(target)
+        self.cli.metrics.inc("http_responses_total", provider="fake", status=200)
+        for i in range(1, 4):
+            self.graph.add_node(f"192.0.2.{i}", type="ip")
+            self.graph.add_edge(target, f"192.0.2.{i}", label="A")
+
+
+class FakeIp:
+    """Finds one hostname per IP, spending one API request per run."""
+
+    help = "test module"
+    targets = ["ip"]
+
+    def __init__(self):
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def run(self, target, args):
+        with self.lock:
+            self.seen.append(target)
+        self.cli.metrics.inc("http_responses_total", provider="fake", status=200)
+        host = f"host{target.rsplit('.', 1)[1]}.example"
+        self.graph.add_node(host, type="domain")
+        self.graph.add_edge(target, host, label="reverse_dns")
+
+
+def setup(cli, conf_dir):
+    (conf_dir / "expand.conf").write_text("[DEFAULT]\nip = fakeip\ndomain = fakedomain\n")
+    modules = {"fakedomain": FakeDomain(), "fakeip": FakeIp()}
+    for name, module in modules.items():
+        module.cli = cli
+        module.graph = cli.graph
+        cli.modules[name] = module
+    return modules["fakedomain"], modules["fakeip"]
+
+
+def test_depth_zero_runs_the_start_node_only(cli, conf_dir, capture_stdout):
+    capture_stdout()
+    domain, ip = setup(cli, conf_dir)
+    cli.do_expand("example.com --depth 0")
+    assert domain.seen == ["example.com"]
+    assert ip.seen == []
+
+
+def test_each_level_runs_on_the_previous_levels_finds(cli, conf_dir, capture_stdout):
+    capture_stdout()
+    domain, ip = setup(cli, conf_dir)
+    cli.do_expand("example.com --depth 2")
+    assert sorted(ip.seen) == ["192.0.2.1", "192.0.2.2", "192.0.2.3"]
+    assert sorted(domain.seen) == ["example.com", "host1.example", "host2.example", "host3.example"]
+
+
+def test_node_limit_caps_the_next_level(cli, conf_dir, capture_stdout, capsys):
+    capture_stdout()
+    domain, ip = setup(cli, conf_dir)
+    cli.do_expand("example.com --depth 3 --max-nodes 3")
+    assert len(ip.seen) == 2  # the start node plus two of its three IPs
+    assert domain.seen == ["example.com"]
+    assert "node limit of 3 reached" in capsys.readouterr().out
+
+
+def test_api_budget_stops_new_runs(cli, conf_dir, capture_stdout, capsys):
+    capture_stdout()
+    domain, ip = setup(cli, conf_dir)
+    cli.do_expand("example.com --depth 2 --budget 2 --workers 1")
+    assert len(domain.seen) + len(ip.seen) == 2
+    assert "API budget of 2 requests reached" in capsys.readouterr().out
+
+
+def test_invalid_range_prints_usage(cli, conf_dir, capture_stdout, capsys):
+    capture_stdout()
+    domain, ip = setup(cli, conf_dir)
+    cli.do_expand("10.0.0.9-10.0.0.1")
+    out = capsys.readouterr().out
+    assert "ends before it starts" in out
+    assert "Usage: expand" in out
+    assert domain.seen == ip.seen == []
+
+
+def test_unsupported_start_types_are_refused(cli, conf_dir, capture_stdout, capsys):
+    capture_stdout()
+    setup(cli, conf_dir)
+    cli.do_expand("https://example.com/")
+    cli.do_expand("10.0.0.0/24")
+    out = capsys.readouterr().out
+    assert "not a url" in out
+    assert "not a network" in out
@@ -0,0 +1,93 @@
+import json
+
+import networkx as nx
+import pydot
+import pytest
+
+from ip_investigator import GRAPH_WRITERS, InvestigationGraph, export_graph
+
+NAMES = ["example.com", "192.0.2.1", 'odd "quoted" <name> & more']
+
+
+def sample_graph():
+    graph = InvestigationGraph()
+    graph.add_node(NAMES[0], type="domain")
+    graph.add_node(NAMES[1], type="ip")
+    graph.add_node(NAMES[2], type="domain")
+    graph.add_edge(NAMES[0], NAMES[1], label="A", timestamp="2026-01-01T00:00:00")
+    graph.add_edge(NAMES[1], NAMES[2], label="reverse_dns")
+    return graph
+
+
+def export(tmp_path, fmt, graph=None, checkpoint=None):
+    graph = graph or sample_graph()
+    path = tmp_path / f"graph.{fmt}"
+    export_graph(path, fmt, graph.nodes(data=True), graph.edges(data=True), checkpoint)
+    return path
+
+
+def test_every_format_has_a_test():
+    assert set(GRAPH_WRITERS) == {"dot", "graphml", "gexf", "jsonl"}
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")  # pydot on newer pyparsing
+def test_dot_parses_with_graphviz_syntax(tmp_path):
+    (dot,) = pydot.graph_from_dot_file(str(export(tmp_path, "dot")))
+    nodes = {json.loads(node.get_name()) for node in dot.get_nodes() if node.get_name() != "node"}
+    assert nodes == set(NAMES)
+    edges = {
+        (json.loads(edge.get_source()), json.loads(edge.get_destination())): edge.get_label()
+        for edge in dot.get_edges()
+    }
+    assert edges == {
+        (NAMES[0], NAMES[1]): '"A (2026-01-01T00:00:00)"',
+        (NAMES[1], NAMES[2]): '"reverse_dns"',
+    }
+
+
+@pytest.mark.parametrize("fmt, read", [("graphml", nx.read_graphml), ("gexf", nx.read_gexf)])
+def test_xml_formats_round_trip_through_networkx(tmp_path, fmt, read):
+    graph = read(export(tmp_path, fmt))
+    assert graph.is_directed()
+    assert set(graph.nodes) == set(NAMES)
+    assert {node: attrs["type"] for node, attrs in graph.nodes(data=True)} == {
+        NAMES[0]: "domain",
+        NAMES[1]: "ip",
+        NAMES[2]: "domain",
+    }
+    assert set(graph.edges) == {(NAMES[0], NAMES[1]), (NAMES[1], NAMES[2])}
+    assert graph.edges[NAMES[0], NAMES[1]]["label"] == "A"
+    assert graph.edges[NAMES[0], NAMES[1]]["timestamp"] == "2026-01-01T00:00:00"
+
+
+def test_jsonl_round_trips_nodes_edges_and_checkpoint(tmp_path):
+    graph = sample_graph()
+    lines = export(tmp_path, "jsonl", graph, checkpoint=graph.seq).read_text().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r["id"] for r in records if r["kind"] == "node"] == NAMES
+    assert [(r["src"], r["dst"], r["attrs"]) for r in records if r["kind"] == "edge"] == [
+        (u, v, attrs) for u, v, attrs in graph.edges(data=True)
+    ]
+    assert records[-1] == {"kind": "checkpoint", "checkpoint": graph.seq}
+
+
+def test_exportgraph_picks_the_format_from_the_extension(cli, tmp_path):
+    cli.graph.add_edge("example.com", "192.0.2.1", label="A")
+    path = tmp_path / "out.graphml"
+    cli.do_exportgraph(str(path))
+    assert set(nx.read_graphml(path).nodes) == {"example.com", "192.0.2.1"}
+
+
+def test_split_writes_one_file_per_component(cli, tmp_path):
+    cli.graph.add_edge("example.com", "192.0.2.1", label="A")
+    cli.graph.add_edge("192.0.2.1", "host1.example", label="reverse_dns")
+    cli.graph.add_edge("example.org", "192.0.2.9", label="A")
+    cli.do_exportgraph(f"{tmp_path / 'out.jsonl'} --split")
+    components = sorted(
+        {json.loads(line)["id"] for line in path.read_text().splitlines() if '"node"' in line}
+        for path in sorted(tmp_path.glob("out.*.jsonl"))
+    )
+    assert components == [
+        {"192.0.2.1", "example.com", "host1.example"},
+        {"192.0.2.9", "example.org"},
+    ]
@@ -0,0 +1,87 @@
+import pytest
+
+from ip_investigator import InvestigationGraph
+
+
+@pytest.fixture
+def graph():
+    """Two domains sharing a name server, one of them resolving to an IP."""
+    graph = InvestigationGraph()
+    for domain in ("example.com", "example.org"):
+        graph.add_node(domain, type="domain")
+        graph.add_edge(domain, "ns1.example.net", label="NS")
+    graph.add_node("ns1.example.net", type="domain")
+    graph.add_node("192.0.2.1", type="ip")
+    graph.add_edge("example.com", "192.0.2.1", label="A")
+    graph.add_node("AS64500", type="asn")
+    graph.add_edge("192.0.2.1", "AS64500", label="asn")
+    return graph
+
+
+def test_indexes_follow_type_and_label_changes(graph):
+    assert graph.nodes_by_type["ip"] == {"192.0.2.1"}
+    graph.add_node("192.0.2.1", type="host")
+    assert graph.nodes_by_type["ip"] == set()
+    assert graph.nodes_by_type["host"] == {"192.0.2.1"}
+    graph.add_node("192.0.2.1", note="keeps its type")
+    assert graph.nodes_by_type["host"] == {"192.0.2.1"}
+
+    graph.add_edge("example.com", "192.0.2.1", label="AAAA")
+    assert ("example.com", "192.0.2.1") not in graph.edges_by_label["A"]
+    assert ("example.com", "192.0.2.1") in graph.edges_by_label["AAAA"]
+
+
+def test_neighborhood_ignores_edge_direction(graph):
+    assert graph.neighborhood("ns1.example.net", 1) == {
+        "ns1.example.net": 0,
+        "example.com": 1,
+        "example.org": 1,
+    }
+    nearby = graph.neighborhood("example.org", 3)
+    assert nearby["192.0.2.1"] == 3
+    assert "AS64500" not in nearby
+
+
+def test_path_ignores_edge_direction(graph):
+    assert graph.path("example.org", "AS64500") == [
+        "example.org",
+        "ns1.example.net",
+        "example.com",
+        "192.0.2.1",
+        "AS64500",
+    ]
+    graph.add_node("orphan.example", type="domain")
+    assert graph.path("example.org", "orphan.example") is None
+
+
+def test_pivot_filters_by_type_and_distance(graph):
+    assert graph.pivot("domain") == dict.fromkeys(
+        ["example.com", "example.org", "ns1.example.net"]
+    )
+    assert graph.pivot("domain", "192.0.2.1", depth=2) == {
+        "example.com": 1,
+        "ns1.example.net": 2,
+    }
+    assert graph.pivot("domain", "example.com", depth=1) == {"ns1.example.net": 1}
+    assert graph.pivot("mx") == {}
+
+
+def test_shared_finds_targets_with_several_sources(graph):
+    assert graph.shared("NS") == {"ns1.example.net": ["example.com", "example.org"]}
+    assert graph.shared("A") == {}
+    assert graph.shared("A", min_sources=1) == {"192.0.2.1": ["example.com"]}
+
+
+def test_path_command_prints_edge_directions(cli, capsys):
+    cli.graph.add_edge("example.com", "ns1.example.net", label="NS")
+    cli.graph.add_edge("example.org", "ns1.example.net", label="NS")
+    cli.do_path("example.com example.org")
+    assert capsys.readouterr().out.strip() == (
+        "example.com -[NS]-> ns1.example.net <-[NS]- example.org"
+    )
+
+
+def test_query_commands_reject_unknown_nodes(cli, capsys):
+    cli.graph.add_node("example.com", type="domain")
+    cli.do_neighbors("missing.example")
+    assert "'missing.example' is not in the graph" in capsys.readouterr().out
@@ -0,0 +1,86 @@
+import asyncio
+
+import dns.exception
+import dns.resolver
+import pytest
+
+
+class FakeResolver:
+    """Answers (or raises) after delay seconds and records what it was asked."""
+
+    def __init__(self, answer=None, delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.asked = []
+        self.cancelled = False
+
+    async def resolve(self, domain, rtype, raise_on_no_answer=True):
+        self.asked.append((domain, rtype))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+@pytest.fixture
+def lookup(cli):
+    instance = cli.import_module("dnslookup")
+    instance.hedge_delay = 0.05
+    return instance
+
+
+def hedged(lookup, primary, fallback, hedge=True):
+    lookup.primary_resolver = primary
+    lookup.fallback_resolver = fallback
+    return asyncio.run(lookup.hedged_query("example.com", "A", hedge))
+
+
+def test_fast_primary_answers_alone(lookup):
+    primary, fallback = FakeResolver("primary"), FakeResolver("fallback")
+    assert hedged(lookup, primary, fallback) == ("Primary", "primary")
+    assert fallback.asked == []
+
+
+def test_slow_primary_is_hedged_and_cancelled(lookup):
+    primary, fallback = FakeResolver("primary", delay=5), FakeResolver("fallback")
+    assert hedged(lookup, primary, fallback) == ("Fallback", "fallback")
+    assert primary.cancelled
+
+
+def test_failed_primary_asks_fallback_without_waiting(lookup):
+    lookup.hedge_delay = 5
+    primary = FakeResolver(error=dns.resolver.NoNameservers())
+    fallback = FakeResolver("fallback")
+    assert hedged(lookup, primary, fallback) == ("Fallback", "fallback")
+
+
+def test_nxdomain_is_an_answer(lookup):
+    primary = FakeResolver(error=dns.resolver.NXDOMAIN())
+    fallback = FakeResolver("fallback")
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        hedged(lookup, primary, fallback)
+    assert fallback.asked == []
+
+
+def test_without_hedging_slow_primary_is_awaited(lookup):
+    primary, fallback = FakeResolver("primary", delay=0.2), FakeResolver("fallback")
+    assert hedged(lookup, primary, fallback, hedge=False) == ("Primary", "primary")
+    assert fallback.asked == []
+
+
+def test_without_hedging_failed_primary_falls_back(lookup):
+    primary = FakeResolver(error=dns.resolver.NoNameservers())
+    fallback = FakeResolver("fallback")
+    assert hedged(lookup, primary, fallback, hedge=False) == ("Fallback", "fallback")
+
+
+def test_error_raised_when_both_fail(lookup):
+    primary = FakeResolver(error=dns.resolver.NoNameservers())
+    fallback = FakeResolver(error=dns.exception.Timeout())
+    with pytest.raises(dns.exception.Timeout):
+        hedged(lookup, primary, fallback)
@@ -0,0 +1,100 @@
+import http.server
+import threading
+
+import pytest
+
+from ip_investigator import HttpSessions, Metrics, RateLimiter, Tracer
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.reply()
+
+    def reply(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.client_address[1]))
+            status = server.statuses.pop(0) if server.statuses else 200
+        body = f"{self.command} {self.path}".encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.statuses = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sessions(conf_dir, tmp_path):
+    sessions = HttpSessions(RateLimiter(tmp_path / "quota.json"), Metrics(), Tracer())
+    yield sessions
+    sessions.close()
+
+
+def test_one_session_per_provider(sessions):
+    assert sessions.session("shodan") is sessions.session("shodan")
+    assert sessions.session("shodan") is not sessions.session("vt")
+    assert set(sessions.breakers()) == {"shodan", "vt"}
+
+
+def test_requests_reuse_the_pooled_connection(sessions, server):
+    provider = sessions.session("test")
+    for path in ("/a", "/b", "/c"):
+        assert provider.get(server.url + path).text == f"GET {path}"
+    ports = {port for _, _, port in server.requests}
+    assert len(ports) == 1
+
+
+def test_settings_come_from_the_provider_conf(conf_dir, sessions):
+    (conf_dir / "test.conf").write_text(
+        "[DEFAULT]\nbase_url = https://api.example/v1/\ntimeout = 7\nretries = 0\n"
+    )
+    provider = sessions.session("test")
+    assert provider.base_url == "https://api.example/v1"
+    assert provider.timeout[1] == 7
+    assert provider.retries == 0
+
+
+def test_server_errors_are_retried_for_gets_only(sessions, server, monkeypatch):
+    provider = sessions.session("test")
+    monkeypatch.setattr(provider, "backoff", lambda attempt: 0)
+    server.statuses = [503, 502]
+    assert provider.get(server.url + "/flaky").status_code == 200
+    assert [command for command, _, _ in server.requests] == ["GET"] * 3
+    assert sessions.metrics.counter_totals("http_retries_total", "provider") == {"test": 2}
+
+    server.requests.clear()
+    server.statuses = [503]
+    assert provider.post(server.url + "/submit", data=b"x").status_code == 503
+    assert [command for command, _, _ in server.requests] == ["POST"]
+
+
+def test_responses_are_counted_per_status(sessions, server):
+    provider = sessions.session("test")
+    server.statuses = [404]
+    provider.get(server.url + "/missing")
+    provider.get(server.url + "/found")
+    assert sessions.metrics.counter_totals("http_responses_total", "status", provider="test") == {
+        404: 1,
+        200: 1,
+    }
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from ip_investigator import LogWriter
+
+
+class RecordingFile:
+    """Collects write() calls so tests can see how lines were batched."""
+
+    def __init__(self):
+        self.writes = []
+        self.closed = False
+        self.written = threading.Event()
+
+    def write(self, text):
+        self.writes.append(text)
+        self.written.set()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def writer():
+    writers = []
+
+    def make(**kwargs):
+        writers.append(LogWriter(**kwargs))
+        return writers[-1]
+
+    yield make
+    for log_writer in writers:
+        log_writer.close()
+
+
+def test_sync_writes_before_returning(writer):
+    f = RecordingFile()
+    log = writer(sync=True)
+    log.write(f, "one\n")
+    assert f.writes == ["one\n"]
+    log.close_file(f)
+    assert f.closed
+
+
+def test_lines_are_batched_until_flushed(writer):
+    f = RecordingFile()
+    log = writer(flush_interval=60)
+    for i in range(100):
+        log.write(f, f"line {i}\n")
+    time.sleep(0.05)
+    assert f.writes == []
+    log.flush()
+    assert f.writes == ["".join(f"line {i}\n" for i in range(100))]
+
+
+def test_size_threshold_writes_without_a_flush(writer):
+    f = RecordingFile()
+    log = writer(flush_interval=60, flush_bytes=10)
+    log.write(f, "12345\n")
+    log.write(f, "67890\n")
+    assert f.written.wait(2)
+    assert f.writes == ["12345\n67890\n"]
+
+
+def test_time_threshold_writes_without_a_flush(writer):
+    f = RecordingFile()
+    log = writer(flush_interval=0.05)
+    log.write(f, "one\n")
+    assert f.written.wait(2)
+    assert f.writes == ["one\n"]
+
+
+def test_each_file_gets_its_own_batch(writer):
+    first, second = RecordingFile(), RecordingFile()
+    log = writer(flush_interval=60)
+    log.write(first, "a\n")
+    log.write(second, "b\n")
+    log.write(first, "c\n")
+    log.flush()
+    assert first.writes == ["a\nc\n"]
+    assert second.writes == ["b\n"]
+
+
+def test_close_file_waits_for_queued_lines(writer):
+    f = RecordingFile()
+    log = writer(flush_interval=60)
+    log.write(f, "last\n")
+    log.close_file(f)
+    log.flush()
+    assert f.writes == ["last\n"]
+    assert f.closed
+
+
+def test_close_drains_the_queue(writer, tmp_path):
+    path = tmp_path / "session.log"
+    log = writer(flush_interval=60)
+    with open(path, "a") as f:
+        for i in range(1000):
+            log.write(f, f"{i}\n")
+        log.close()
+    assert path.read_text().splitlines() == [str(i) for i in range(1000)]
+
+
+def test_write_errors_do_not_stop_the_writer(writer, tmp_path):
+    closed = open(tmp_path / "closed.log", "a")
+    closed.close()
+    f = RecordingFile()
+    log = writer(flush_interval=60)
+    log.write(closed, "lost\n")
+    log.write(f, "kept\n")
+    log.flush()
+    assert f.writes == ["kept\n"]
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+
+import pytest
+
+import ip_investigator
+from ip_investigator import LazyModule, load_manifest, scan_module_source
+
+PLUGIN = '''
+import not_installed_anywhere
+
+HELP = "computed"
+
+
+class Sample:
+    help = "sample: test module"
+    targets = ["ip", "domain"]
+    interactive = True
+    sweep_exempt_args = ["--all"]
+    unrelated = ["not", "in", "the", "manifest"]
+    targetless_args = HELP.split()
+
+    def run(self, target, args):
+        pass
+'''
+
+
+@pytest.fixture
+def modules_dir(tmp_path, monkeypatch):
+    path = tmp_path / "modules"
+    path.mkdir()
+    monkeypatch.setattr(ip_investigator, "MODULES_DIR", path)
+    monkeypatch.setattr(ip_investigator, "MANIFEST_FILE", path / ".manifest.json")
+    return path
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    scanned = []
+
+    def scan(file_path, class_name):
+        scanned.append(file_path.name)
+        return scan_module_source(file_path, class_name)
+
+    monkeypatch.setattr(ip_investigator, "scan_module_source", scan)
+    return scanned
+
+
+def test_scan_reads_literal_attributes_without_importing(modules_dir):
+    (modules_dir / "sample.py").write_text(PLUGIN)
+    assert scan_module_source(modules_dir / "sample.py", "Sample") == {
+        "help": "sample: test module",
+        "targets": ["ip", "domain"],
+        "interactive": True,
+        "sweep_exempt_args": ["--all"],
+    }
+    assert scan_module_source(modules_dir / "sample.py", "Other") is None
+
+
+def test_manifest_rescans_only_changed_files(modules_dir, scans):
+    (modules_dir / "sample.py").write_text(PLUGIN)
+    (modules_dir / "other.py").write_text("class Other:\n    targets = ['ip']\n")
+    (modules_dir / "helper.py").write_text("def helper():\n    pass\n")
+    (modules_dir / "__init__.py").write_text("")
+
+    manifest = load_manifest()
+    assert sorted(manifest) == ["other", "sample"]  # helper has no Helper class
+    assert sorted(scans) == ["helper.py", "other.py", "sample.py"]
+
+    scans.clear()
+    assert load_manifest() == manifest
+    assert scans == []
+
+    other = modules_dir / "other.py"
+    other.write_text("class Other:\n    targets = ['domain']\n")
+    os.utime(other, ns=(other.stat().st_atime_ns, other.stat().st_mtime_ns + 10**9))
+    assert load_manifest()["other"] == {"targets": ["domain"]}
+    assert scans == ["other.py"]
+
+
+def test_manifest_from_another_version_is_rebuilt(modules_dir, scans):
+    (modules_dir / "other.py").write_text("class Other:\n    targets = ['ip']\n")
+    load_manifest()
+    manifest = json.loads(ip_investigator.MANIFEST_FILE.read_text())
+    manifest["version"] = ip_investigator.MANIFEST_VERSION - 1
+    ip_investigator.MANIFEST_FILE.write_text(json.dumps(manifest))
+    scans.clear()
+    load_manifest()
+    assert scans == ["other.py"]
+
+
+def test_broken_module_is_skipped(modules_dir, capsys):
+    (modules_dir / "broken.py").write_text("class Broken(:\n")
+    (modules_dir / "other.py").write_text("class Other:\n    targets = ['ip']\n")
+    assert list(load_manifest()) == ["other"]
+    assert "Failed to load module 'broken'" in capsys.readouterr().out
+
+
+def test_lazy_module_loads_once_on_first_use():
+    loads = []
+
+    class Plugin:
+        def run(self, target, args):
+            return target
+
+    def loader():
+        loads.append(1)
+        return Plugin()
+
+    module = LazyModule(loader, {"help": "from the manifest", "targets": ["ip"]})
+    assert module.help == "from the manifest"
+    assert module.interactive is False
+    assert loads == []
+
+    threads = [threading.Thread(target=lambda: module.run("192.0.2.1", [])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [1]
+    assert module.run("192.0.2.1", []) == "192.0.2.1"
+
+
+def test_help_does_not_import_modules(cli, capsys):
+    cli.do_help("")
+    cli.do_help("whois")
+    assert "whois" in capsys.readouterr().out
+    assert all(module._instance is None for module in cli.modules.values())
+
+
+def test_manifest_matches_the_module_classes(cli):
+    for name, module in cli.modules.items():
+        instance = module.load()
+        for attr in ip_investigator.MANIFEST_ATTRS:
+            expected = getattr(instance, attr, getattr(LazyModule, attr, None))
+            assert getattr(module, attr) == expected, f"{name}.{attr}"
@@ -0,0 +1,97 @@
+import pytest
+
+from ip_investigator import Metrics
+
+
+class Broken:
+    def run(self, target, args):
+        raise RuntimeError("boom")
+
+
+class Reporting:
+    def run(self, target, args):
+        self.cli.module_error("no API key")
+
+
+def test_histogram_buckets_and_quantile():
+    metrics = Metrics(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.5, 0.5, 5, 50):
+        metrics.observe("dns_duration_seconds", value, rtype="A")
+    ((counts, total, count),) = metrics.histogram_totals("dns_duration_seconds", "rtype").values()
+    assert counts == [1, 2, 1]  # 50 only shows up in +Inf
+    assert count == 5
+    assert total == pytest.approx(56.05)
+    assert metrics.quantile(counts, count, 0.5) == 1
+    assert metrics.quantile(counts, count, 0.95) == float("inf")
+
+
+def test_counter_totals_group_and_filter_by_label():
+    metrics = Metrics()
+    metrics.inc("cache_requests_total", provider="shodan", result="hit")
+    metrics.inc("cache_requests_total", 2, provider="shodan", result="miss")
+    metrics.inc("cache_requests_total", provider="vt", result="hit")
+    assert metrics.counter_totals("cache_requests_total", "provider") == {"shodan": 3, "vt": 1}
+    assert metrics.counter_totals("cache_requests_total", "provider", result="hit") == {
+        "shodan": 1,
+        "vt": 1,
+    }
+
+
+def test_timer_counts_errors_and_still_observes_the_duration():
+    metrics = Metrics()
+    with pytest.raises(OSError):
+        with metrics.timer("subprocess", command="nmap"):
+            raise OSError
+    assert metrics.counter_totals("subprocess_errors_total", "error") == {"OSError": 1}
+    assert metrics.histogram_totals("subprocess_duration_seconds", "command")["nmap"][2] == 1
+
+
+def test_prometheus_text_format(tmp_path):
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.inc("http_responses_total", provider='say "hi"', status=200)
+    metrics.observe("module_duration_seconds", 0.5, module="whois")
+    text = metrics.prometheus()
+    assert text.splitlines() == [
+        "# TYPE ipinv_http_responses_total counter",
+        'ipinv_http_responses_total{provider="say \\"hi\\"",status="200"} 1',
+        "# TYPE ipinv_module_duration_seconds histogram",
+        'ipinv_module_duration_seconds_bucket{module="whois",le="0.1"} 0',
+        'ipinv_module_duration_seconds_bucket{module="whois",le="1"} 1',
+        'ipinv_module_duration_seconds_bucket{module="whois",le="+Inf"} 1',
+        'ipinv_module_duration_seconds_sum{module="whois"} 0.500000',
+        'ipinv_module_duration_seconds_count{module="whois"} 1',
+    ]
+    path = tmp_path / "ipinv.prom"
+    metrics.write_prometheus(path)
+    assert path.read_text() == text
+
+
+def test_module_runs_are_timed_and_failures_counted(cli, capture_stdout):
+    capture_stdout()
+    reporting = Reporting()
+    reporting.cli = cli
+    cli.run_module("broken", Broken(), "example.com", [])
+    cli.run_module("reporting", reporting, "example.com", [])
+    durations = cli.metrics.histogram_totals("module_duration_seconds", "module")
+    assert {module: count for module, (_, _, count) in durations.items()} == {
+        "broken": 1,
+        "reporting": 1,
+    }
+    assert cli.metrics.counter_totals("module_errors_total", "error") == {
+        "RuntimeError": 1,
+        "reported": 1,
+    }
+
+
+def test_stats_prints_tables_and_resets(cli, capsys):
+    cli.do_stats("")
+    assert "No metrics recorded yet." in capsys.readouterr().out
+    cli.metrics.observe("module_duration_seconds", 0.2, module="whois")
+    cli.metrics.inc("cache_requests_total", provider="shodan", result="hit")
+    cli.metrics.inc("cache_requests_total", provider="shodan", result="miss")
+    cli.do_stats("")
+    out = capsys.readouterr().out
+    assert "whois" in out
+    assert "50%" in out
+    cli.do_stats("reset")
+    assert not cli.metrics.counters and not cli.metrics.histograms
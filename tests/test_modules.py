@@ -0,0 +1,27 @@
+import pytest
+
+API_MODULES = ["ipinfo", "shodan", "stinfo", "vt"]
+
+
+@pytest.mark.parametrize("name", API_MODULES)
+def test_api_key_comes_from_the_conf_dir(cli, conf_dir, name):
+    (conf_dir / f"{name}.conf").write_text("[DEFAULT]\napi_key = from-conf-dir\n")
+    assert cli.import_module(name).api_key == "from-conf-dir"
+
+
+@pytest.mark.parametrize("name", ["shodan", "stinfo", "vt"])
+def test_missing_api_key_is_a_failure(cli, capture_stdout, name):
+    capture_stdout()
+    output, error = cli.run_module(name, cli.import_module(name), "192.0.2.1", [])
+    assert error
+    assert "API key" in output
+
+
+INJECTED = ["cli", "config", "graph", "cache", "http", "metrics", "tracer", "inflight", "dns_cache"]
+
+
+def test_every_module_gets_the_shared_services(cli):
+    for name in cli.modules:
+        instance = cli.import_module(name)
+        missing = [attr for attr in INJECTED if attr not in vars(instance)]
+        assert not missing, f"{name} is missing {missing}"
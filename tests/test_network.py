@@ -0,0 +1,127 @@
+import subprocess
+
+import pytest
+
+import ip_investigator
+from ip_investigator import network_size, parse_network
+
+
+class PerHostModule:
+    help = "test module"
+    targets = ["ip"]
+
+    def __init__(self):
+        self.seen = []
+
+    def run(self, target, args):
+        self.seen.append(target)
+        print(f"{target} up")
+
+
+class TargetlessModule:
+    help = "test module"
+    targets = []
+
+    def __init__(self):
+        self.seen = []
+
+    def run(self, target, args):
+        self.seen.append(target)
+
+
+class WholeTargetModule(PerHostModule):
+    sweep_exempt_args = ["--all"]
+
+
+def add_module(cli, name, module, monkeypatch):
+    module.cli = cli
+    cli.modules[name] = module
+    monkeypatch.setattr(
+        cli, "network_modules", lambda: [n for n in ("perhost", "whole") if n in cli.modules]
+    )
+
+
+def test_parse_network_range_and_cidr():
+    assert network_size("10.0.0.1-50") == 50
+    assert network_size("10.0.0.0/30") == 4
+    assert parse_network("example.com") is None
+
+
+def test_parse_network_rejects_inverted_range():
+    with pytest.raises(ValueError, match="ends before it starts"):
+        parse_network("1.2.3.4-1.2.3.2")
+
+
+def test_target_rejects_inverted_range(cli, capture_stdout, capsys):
+    cli.do_target("1.2.3.4-1.2.3.2")
+    assert cli.target is None
+    assert "ends before it starts" in capsys.readouterr().out
+
+
+def test_per_host_module_is_swept(cli, capture_stdout, monkeypatch):
+    capture_stdout()
+    module = PerHostModule()
+    add_module(cli, "perhost", module, monkeypatch)
+    cli.do_target("192.0.2.1-3")
+    cli.default("perhost")
+    assert sorted(module.seen) == ["192.0.2.1", "192.0.2.2", "192.0.2.3"]
+
+
+def test_targetless_module_runs_once_on_network(cli, capture_stdout, monkeypatch):
+    capture_stdout()
+    module = TargetlessModule()
+    add_module(cli, "targetless", module, monkeypatch)
+    cli.do_target("192.0.2.1-3")
+    cli.default("targetless")
+    assert module.seen == ["192.0.2.1-3"]
+
+
+def test_sweep_exempt_mode_is_not_swept(cli, capture_stdout, monkeypatch):
+    capture_stdout()
+    module = WholeTargetModule()
+    add_module(cli, "whole", module, monkeypatch)
+    cli.do_target("192.0.2.1-3")
+    cli.default("whole --all")
+    assert module.seen == []  # run once, and a network is not a target it accepts
+    cli.default("whole")
+    assert len(module.seen) == 3
+
+
+def test_batch_refuses_networks_over_max_hosts(cli, capture_stdout, conf_dir, monkeypatch, capsys):
+    capture_stdout()
+    (conf_dir / "network.conf").write_text("[DEFAULT]\nmax_hosts = 4\n")
+    investigated = []
+    monkeypatch.setattr(
+        cli, "investigate", lambda target, commands: investigated.append(target) or ("ip", [])
+    )
+    cli.run_batch(["192.0.2.0/24", "192.0.2.0/30"], [])
+    assert sorted(investigated) == ["192.0.2.1", "192.0.2.2"]
+    assert "more than max_hosts (4)" in capsys.readouterr().out
+
+
+def test_save_sanitizes_network_target(cli, capture_stdout):
+    capture_stdout()
+    cli.do_target("192.0.2.0/24")
+    cli.do_save(None)
+    assert (ip_investigator.SAVE_DIR / "192.0.2.0_24.save").exists()
+
+
+@pytest.mark.parametrize(
+    "target, command",
+    [
+        ("192.0.2.1", ["nmap", "-Pn", "-p"]),
+        ("2001:db8::1", ["nmap", "-6", "-Pn", "-p"]),
+    ],
+)
+def test_nmap_scans_ipv6_hosts_over_ipv6(cli, capture_stdout, monkeypatch, target, command):
+    capture_stdout()
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    cli.import_module("nmap").run(target, [])
+    assert calls[0][: len(command)] == command
+    assert calls[0][-1] == target
@@ -0,0 +1,51 @@
+import time
+
+import dns.rrset
+
+
+class PtrResolver:
+    """Answers PTR queries for 192.0.2.1 only."""
+
+    nameservers = ["192.0.2.53"]
+    port = 53
+
+    def __init__(self):
+        self.asked = []
+
+    async def resolve(self, name, rtype, raise_on_no_answer=True):
+        self.asked.append(name)
+        return PtrAnswer(name, "host1.example." if name.startswith("1.2.0.192") else None)
+
+
+class PtrAnswer:
+    def __init__(self, name, hostname):
+        self.rrset = dns.rrset.from_text(name, 60, "IN", "PTR", hostname) if hostname else None
+        self.expiration = time.time() + 60
+        self.response = None
+
+
+def test_ptr_all_runs_without_a_target(cli, capture_stdout, capsys):
+    capture_stdout()
+    lookup = cli.modules["dnslookup"].load()
+    lookup.primary_resolver = lookup.fallback_resolver = PtrResolver()
+    cli.graph.add_node("192.0.2.1", type="ip")
+    cli.graph.add_node("192.0.2.2", type="ip")
+
+    cli.default("dnslookup --ptr-all")
+
+    assert "Please set a target" not in capsys.readouterr().out
+    assert len(lookup.primary_resolver.asked) == 2
+    assert cli.graph.has_edge("192.0.2.1", "host1.example")
+
+
+def test_ptr_all_is_not_swept_on_a_network(cli, capture_stdout):
+    capture_stdout()
+    lookup = cli.modules["dnslookup"].load()
+    lookup.primary_resolver = lookup.fallback_resolver = PtrResolver()
+    cli.graph.add_node("192.0.2.1", type="ip")
+    cli.do_target("192.0.2.0/24")
+
+    cli.default("dnslookup --ptr-all")
+
+    assert lookup.primary_resolver.asked == ["1.2.0.192.in-addr.arpa."]
+    assert cli.graph.has_edge("192.0.2.1", "host1.example")
@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+import ip_investigator
+from ip_investigator import QuotaExceeded, RateLimiter, TokenBucket
+
+
+class Response:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def limiter(conf_dir, tmp_path):
+    (conf_dir / "test.conf").write_text(
+        "[DEFAULT]\nrate_per_minute = 60\nrate_per_day = 1000\nmax_queue_wait = 5\n"
+    )
+    return RateLimiter(tmp_path / "quota.json")
+
+
+def test_bucket_refills_continuously():
+    now = time.time()
+    bucket = TokenBucket(60, 60, tokens=0, updated=now - 30)
+    assert bucket.delay(now) == 0.0
+    assert bucket.tokens == pytest.approx(30)
+
+
+def test_bucket_never_exceeds_capacity():
+    now = time.time()
+    bucket = TokenBucket(10, 60, tokens=5, updated=now - 3600)
+    bucket.delay(now)
+    assert bucket.tokens == 10
+
+
+def test_bucket_delay_until_next_token():
+    now = time.time()
+    bucket = TokenBucket(60, 60, tokens=-1, updated=now)
+    assert bucket.delay(now) == pytest.approx(2.0)
+
+
+def test_acquire_takes_a_token_from_every_bucket(limiter):
+    limiter.acquire("test")
+    buckets = limiter.buckets("test")
+    assert buckets["rate_per_minute"].tokens == pytest.approx(59, abs=0.1)
+    assert buckets["rate_per_day"].tokens == pytest.approx(999, abs=0.1)
+
+
+def test_acquire_fails_past_max_queue_wait(limiter):
+    limiter.buckets("test")["rate_per_minute"].tokens = -10
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire("test")
+
+
+def test_unconfigured_provider_is_not_limited(limiter):
+    assert limiter.buckets("unlimited") == {}
+    limiter.acquire("unlimited")
+
+
+def test_429_pauses_the_provider_for_retry_after(limiter):
+    assert limiter.observe("test", Response(429, {"Retry-After": "30"}))
+    assert limiter.paused_until["test"] - time.time() == pytest.approx(30, abs=1)
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire("test")
+
+
+def test_exhausted_reported_quota_pauses_until_reset(limiter):
+    reset = time.time() + 3600
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}
+    assert not limiter.observe("test", Response(200, headers))
+    assert limiter.reported["test"]["remaining"] == 0
+    assert limiter.paused_until["test"] == pytest.approx(reset)
+
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert RateLimiter.retry_after("12") == 12.0
+    assert RateLimiter.retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert RateLimiter.retry_after("soon", default=7.0) == 7.0
+    assert RateLimiter.retry_after(None, default=3.0) == 3.0
+
+
+def test_bucket_levels_survive_a_restart(limiter, tmp_path):
+    for _ in range(3):
+        limiter.acquire("test")
+    limiter.save()
+    saved = json.loads((tmp_path / "quota.json").read_text())
+    assert saved["test"]["rate_per_day"][0] == 1000
+
+    restored = RateLimiter(tmp_path / "quota.json")
+    assert restored.buckets("test")["rate_per_day"].tokens == pytest.approx(997, abs=0.1)
+
+
+def test_default_state_path_follows_quota_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(ip_investigator, "QUOTA_FILE", tmp_path / "quota.json")
+    assert RateLimiter().state_path == tmp_path / "quota.json"
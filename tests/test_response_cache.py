@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+import ip_investigator
+from ip_investigator import Metrics, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ip_investigator.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(conf_dir, tmp_path):
+    (conf_dir / "test.conf").write_text("[DEFAULT]\ncache_ttl = 60\nnegative_ttl = 10\n")
+    cache = ResponseCache(tmp_path / "responses.sqlite", metrics=Metrics())
+    yield cache
+    cache.close()
+
+
+def test_default_path_follows_cache_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(ip_investigator, "CACHE_FILE", tmp_path / "responses.sqlite")
+    assert ResponseCache().path == tmp_path / "responses.sqlite"
+
+
+def test_value_expires_after_cache_ttl(cache, clock):
+    cache.set("test", "host", "192.0.2.1", {"ports": [80]})
+    clock.now += 59
+    assert cache.get("test", "host", "192.0.2.1") == (True, {"ports": [80]})
+    clock.now += 1
+    assert cache.get("test", "host", "192.0.2.1") == (False, None)
+
+
+def test_no_data_is_cached_for_negative_ttl(cache, clock):
+    cache.set("test", "host", "192.0.2.1", None)
+    clock.now += 9
+    assert cache.get("test", "host", "192.0.2.1") == (True, None)
+    clock.now += 1
+    assert cache.get("test", "host", "192.0.2.1") == (False, None)
+
+
+def test_entries_survive_a_new_session(cache, tmp_path):
+    cache.set("test", "host", "192.0.2.1", {"org": "Example"})
+    cache.close()
+    reopened = ResponseCache(tmp_path / "responses.sqlite")
+    assert reopened.get("test", "host", "192.0.2.1") == (True, {"org": "Example"})
+    reopened.close()
+
+
+def test_fetch_calls_the_loader_once(cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"org": "Example"}
+
+    assert cache.fetch("test", "host", "192.0.2.1", loader) == {"org": "Example"}
+    assert cache.fetch("test", "host", "192.0.2.1", loader) == {"org": "Example"}
+    assert len(calls) == 1
+    assert cache.metrics.counter_totals("cache_requests_total", "result") == {"miss": 1, "hit": 1}
+
+
+def test_concurrent_misses_share_one_load(cache):
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"org": "Example"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.fetch("test", "host", "x", loader)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    # Release the load once the other two callers wait on it
+    for _ in range(500):
+        if cache.metrics.counter_totals("inflight_shared_total", "kind").get("api") == 2:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == [{"org": "Example"}] * 3
+    assert len(calls) == 1
+
+
+def test_memory_layer_answers_without_sqlite(cache, clock):
+    cache.memory_entries = 10
+    cache.set("test", "host", "192.0.2.1", {"org": "Example"})
+    cache._db.execute("DELETE FROM responses")
+    assert cache.get("test", "host", "192.0.2.1") == (True, {"org": "Example"})
+    clock.now += ip_investigator.MEMORY_CACHE_TTL
+    assert cache.get("test", "host", "192.0.2.1") == (False, None)
+
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    cache.max_entries = 10
+    for i in range(10):
+        cache.set("test", "host", f"192.0.2.{i}", {"i": i})
+        clock.now += 1
+    cache.get("test", "host", "192.0.2.0")  # now the most recently used
+    cache.set("test", "host", "192.0.2.10", {"i": 10})
+    assert cache.get("test", "host", "192.0.2.0")[0]
+    assert not cache.get("test", "host", "192.0.2.1")[0]
+
+
+def test_clear_by_provider(cache):
+    cache.set("test", "host", "a", {"v": 1})
+    cache.set("other", "host", "a", {"v": 2})
+    cache.clear("test")
+    assert cache.stats().keys() == {"other"}
+
+
+def test_disabled_cache_never_touches_sqlite(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", enabled=False)
+    cache.set("test", "host", "a", {"v": 1})
+    assert cache.get("test", "host", "a") == (False, None)
+    assert not (tmp_path / "responses.sqlite").exists()
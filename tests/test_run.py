@@ -0,0 +1,96 @@
+import threading
+
+from ip_investigator import strip_ansi
+
+
+class Waiting:
+    """Finishes only after every Waiting module has started, so runs must overlap."""
+
+    help = "test module"
+    targets = ["domain"]
+
+    def __init__(self, barrier, text):
+        self.barrier = barrier
+        self.text = text
+
+    def run(self, target, args):
+        self.barrier.wait(5)
+        print(f"{self.text} {target}")
+
+
+class Reporting:
+    help = "test module"
+    targets = ["domain"]
+
+    def run(self, target, args):
+        self.cli.module_error("quota exhausted")
+
+
+class IpOnly:
+    help = "test module"
+    targets = ["ip"]
+
+    def run(self, target, args):
+        print("never runs")
+
+
+class Interactive(IpOnly):
+    targets = ["domain"]
+    interactive = True
+
+
+def setup(cli, monkeypatch, **modules):
+    monkeypatch.setattr(cli, "modules", {})
+    for name, module in modules.items():
+        module.cli = cli
+        cli.modules[name] = module
+    cli.do_target("https://example.com/login")
+
+
+def test_modules_run_concurrently_and_print_in_order(cli, monkeypatch, capture_stdout, capsys):
+    capture_stdout()
+    barrier = threading.Barrier(2)
+    setup(cli, monkeypatch, slow=Waiting(barrier, "first"), fast=Waiting(barrier, "second"))
+    cli.do_run("slow fast")
+    out = strip_ansi(capsys.readouterr().out)
+    assert "Running 2 module(s): slow fast" in out
+    assert out.index("── slow") < out.index("first example.com") < out.index("── fast")
+    assert out.index("second example.com") > out.index("── fast")
+    assert "Extracted domain 'example.com'" in out
+    assert cli.results[("https://example.com/login", "slow")].endswith("first example.com")
+
+
+def test_all_runs_every_applicable_module(cli, monkeypatch, capture_stdout, capsys):
+    capture_stdout()
+    barrier = threading.Barrier(1)
+    setup(
+        cli,
+        monkeypatch,
+        waiting=Waiting(barrier, "ran"),
+        reporting=Reporting(),
+        iponly=IpOnly(),
+        interactive=Interactive(),
+    )
+    cli.do_all("")
+    out = strip_ansi(capsys.readouterr().out)
+    assert "Running 2 module(s): waiting reporting" in out
+    assert "── reporting (failed) ──" in out
+    assert "never runs" not in out
+
+
+def test_run_skips_unknown_unsupported_and_interactive_modules(
+    cli, monkeypatch, capture_stdout, capsys
+):
+    capture_stdout()
+    setup(cli, monkeypatch, iponly=IpOnly(), interactive=Interactive())
+    cli.do_run("nosuch iponly interactive")
+    out = strip_ansi(capsys.readouterr().out)
+    assert "Unknown command: nosuch" in out
+    assert "Skipping iponly: This module does not support targets of type 'url'." in out
+    assert "Skipping interactive module 'interactive'." in out
+    assert "Running" not in out
+
+
+def test_run_needs_a_target(cli, capsys):
+    cli.do_run("")
+    assert "Please set a target first" in capsys.readouterr().out
@@ -0,0 +1,192 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ip_investigator import (
+    ApiHandler,
+    GraphRecorder,
+    InvestigationGraph,
+    InvestigationJob,
+    collect_job_events,
+    lazy_subclass,
+)
+
+
+class GraphModule:
+    """Adds target -> <target>.example (label=test) to the graph."""
+
+    help = "test module"
+    targets = ["ip", "domain"]
+
+    def run(self, target, args):
+        self.graph.add_node(target, type="domain")
+        self.graph.add_node(f"{target}.example", type="domain")
+        self.graph.add_edge(target, f"{target}.example", label="test")
+
+
+class SharedCallModule:
+    """Adds its edge inside a SingleFlight call that all concurrent runs share."""
+
+    help = "test module"
+    targets = ["domain"]
+
+    def __init__(self, release):
+        self.release = release
+
+    def run(self, target, args):
+        def lookup():
+            # Hold the call open until the other job waits on it
+            self.release.wait(timeout=5)
+            self.graph.add_node("shared.example", type="domain")
+            self.graph.add_edge(target, "shared.example", label="shared")
+
+        self.cli.inflight.do("test", target, lookup)
+
+
+@pytest.fixture
+def serving(cli):
+    """cli set up for serve_job() the way serve() does it."""
+    cli.job_pool = ThreadPoolExecutor(max_workers=4)
+    cli.inflight.recorder = GraphRecorder(cli.job_change)
+    yield cli
+    cli.job_pool.shutdown()
+
+
+def add_module(cli, name, module):
+    module.cli = cli
+    module.graph = cli.graph
+    cli.modules[name] = module
+
+
+def investigate(cli, target, names):
+    events = []
+    cli.serve_job(target, names, events.append)
+    return collect_job_events(events)
+
+
+def node_ids(result):
+    return {node["id"] for node in result["graph"]["nodes"]}
+
+
+def test_fragment_includes_existing_edge_endpoints():
+    graph = InvestigationGraph()
+    graph.add_node("a", type="ip")
+    graph.add_node("b", type="domain")
+    job = InvestigationJob("a", "ip", graph)
+    graph.listeners.append(job.add)
+    graph.add_node("a", type="ip")  # unchanged: no notification
+    graph.add_edge("a", "b", label="PTR")
+
+    fragment = job.take()
+    assert {(n["id"], n["type"]) for n in fragment["nodes"]} == {("a", "ip"), ("b", "domain")}
+    assert [(e["src"], e["dst"], e["label"]) for e in fragment["edges"]] == [("a", "b", "PTR")]
+    assert job.take() is None
+
+
+def test_fragment_does_not_resend_nodes():
+    graph = InvestigationGraph()
+    job = InvestigationJob("a", "ip", graph)
+    graph.listeners.append(job.add)
+    graph.add_edge("a", "b", label="x")
+    assert node_ids({"graph": job.take()}) == {"a", "b"}
+    graph.add_edge("a", "c", label="x")
+    assert node_ids({"graph": job.take()}) == {"c"}
+
+
+def test_repeat_job_reports_known_nodes(serving, capture_stdout):
+    capture_stdout()
+    add_module(serving, "graphtest", GraphModule())
+    first = investigate(serving, "example.com", ["graphtest"])
+    second = investigate(serving, "example.com", ["graphtest"])
+    for result in (first, second):
+        assert node_ids(result) == {"example.com", "example.com.example"}
+        assert len(result["graph"]["edges"]) == 1
+        assert result["failures"] == 0
+
+
+def test_coalesced_jobs_each_get_the_shared_changes(serving, capture_stdout):
+    capture_stdout()
+    release = threading.Event()
+    add_module(serving, "sharedtest", SharedCallModule(release))
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(investigate(serving, "example.com", ["sharedtest"]))
+        )
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    # Let the leader finish once the other job is waiting on its call
+    for _ in range(500):
+        if serving.metrics.counter_totals("inflight_shared_total", "kind")["test"]:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(results) == 2
+    for result in results:
+        assert node_ids(result) == {"example.com", "shared.example"}
+        assert [(e["src"], e["dst"]) for e in result["graph"]["edges"]] == [
+            ("example.com", "shared.example")
+        ]
+
+
+def test_nested_shared_calls_record_into_every_open_recording():
+    recorder = GraphRecorder(lambda *change: None)
+    outer = recorder.start()
+    inner = recorder.start()
+    recorder.add("node", "a", {})
+    recorder.stop(inner)
+    recorder.add("node", "b", {})
+    recorder.stop(outer)
+    recorder.add("node", "c", {})
+    assert [key for _, key, _ in inner] == ["a"]
+    assert [key for _, key, _ in outer] == ["a", "b"]
+
+
+@pytest.fixture
+def api(serving):
+    """Base URL of an API server for serving, set up as serve() does."""
+    import http.server
+
+    handler = lazy_subclass(ApiHandler, http.server.BaseHTTPRequestHandler)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.cli = serving
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode())
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("target", ["192.0.2.0/24", "192.0.2.1-10", "192.0.2.9-192.0.2.1"])
+def test_network_targets_are_refused(api, target):
+    status, body = post(f"{api}/investigate", {"target": target, "stream": False})
+    assert status == 400
+    assert "invalid request" in body["error"]
+
+
+def test_single_target_is_served(serving, api, capture_stdout):
+    capture_stdout()
+    add_module(serving, "graphtest", GraphModule())
+    status, body = post(
+        f"{api}/investigate", {"target": "example.com", "modules": ["graphtest"], "stream": False}
+    )
+    assert status == 200
+    assert node_ids(body) == {"example.com", "example.com.example"}
@@ -0,0 +1,77 @@
+import json
+
+from ip_investigator import InvestigationGraph
+
+
+def exported(path):
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    nodes = {r["id"] for r in records if r["kind"] == "node"}
+    edges = {(r["src"], r["dst"]) for r in records if r["kind"] == "edge"}
+    return nodes, edges, records[-1]["checkpoint"]
+
+
+def test_changes_since_returns_only_later_changes():
+    graph = InvestigationGraph()
+    graph.add_edge("example.com", "192.0.2.1", label="A")
+    checkpoint = graph.seq
+    graph.add_edge("192.0.2.1", "host1.example", label="reverse_dns")
+    nodes, edges, new_checkpoint = graph.changes_since(checkpoint)
+    assert [node for node, _ in nodes] == ["host1.example"]
+    assert [(u, v) for u, v, _ in edges] == [("192.0.2.1", "host1.example")]
+    assert new_checkpoint == graph.seq
+    assert graph.changes_since(new_checkpoint) == ([], [], graph.seq)
+
+
+def test_changed_attributes_are_reported_once_with_their_latest_values():
+    graph = InvestigationGraph()
+    graph.add_node("example.com", type="domain")
+    checkpoint = graph.seq
+    graph.add_node("example.com", asn="64500")
+    graph.add_node("example.com", asn="64501")
+    graph.add_node("example.com", asn="64501")  # unchanged, not a new change
+    nodes, edges, _ = graph.changes_since(checkpoint)
+    assert nodes == [("example.com", {"type": "domain", "asn": "64501"})]
+    assert edges == []
+
+
+def test_compacting_the_change_list_keeps_every_live_entry():
+    graph = InvestigationGraph()
+    for i in range(3000):
+        graph.add_node("example.com", hits=i)
+    graph.add_node("192.0.2.1", type="ip")
+    assert len(graph.changes) < 3000
+    nodes, _, _ = graph.changes_since(0)
+    assert [node for node, _ in nodes] == ["example.com", "192.0.2.1"]
+    assert dict(nodes)["example.com"]["hits"] == 2999
+
+
+def test_since_last_continues_from_the_previous_export(cli, tmp_path):
+    cli.graph.add_edge("example.com", "192.0.2.1", label="A")
+    cli.do_exportgraph(f"{tmp_path / 'full.jsonl'}")
+    full_nodes, _, checkpoint = exported(tmp_path / "full.jsonl")
+    assert full_nodes == {"example.com", "192.0.2.1"}
+
+    cli.graph.add_edge("192.0.2.1", "host1.example", label="reverse_dns")
+    cli.do_exportgraph(f"{tmp_path / 'delta.jsonl'} --since last")
+    nodes, edges, delta_checkpoint = exported(tmp_path / "delta.jsonl")
+    assert nodes == {"host1.example"}
+    assert edges == {("192.0.2.1", "host1.example")}
+    assert delta_checkpoint > checkpoint
+
+    cli.do_exportgraph(f"{tmp_path / 'empty.jsonl'} --since last")
+    assert exported(tmp_path / "empty.jsonl") == (set(), set(), delta_checkpoint)
+
+
+def test_since_takes_an_explicit_checkpoint(cli, tmp_path):
+    cli.graph.add_node("example.com", type="domain")
+    checkpoint = cli.graph.seq
+    cli.graph.add_node("example.org", type="domain")
+    cli.do_exportgraph(f"{tmp_path / 'delta.jsonl'} --since {checkpoint}")
+    assert exported(tmp_path / "delta.jsonl")[0] == {"example.org"}
+
+
+def test_since_cannot_be_combined_with_split(cli, tmp_path, capsys):
+    cli.graph.add_node("example.com", type="domain")
+    cli.do_exportgraph(f"{tmp_path / 'delta.jsonl'} --since 0 --split")
+    assert "cannot be combined" in capsys.readouterr().out
+    assert not list(tmp_path.glob("delta*"))
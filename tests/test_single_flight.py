@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ip_investigator import GraphRecorder, Metrics, SingleFlight
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def shared(flight):
+    return flight.metrics.counter_totals("inflight_shared_total", "kind")
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(Metrics())
+    release = threading.Event()
+    calls = []
+
+    def lookup():
+        calls.append(1)
+        release.wait(2)
+        return ["192.0.2.1"]
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, "dns", ("example.com", "A"), lookup) for _ in range(4)]
+        wait_for(lambda: shared(flight).get("dns") == 3)
+        release.set()
+        results = [future.result() for future in futures]
+    assert calls == [1]
+    assert results == [["192.0.2.1"]] * 4
+    assert flight.pending() == 0
+
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight(Metrics())
+    release = threading.Event()
+
+    def lookup():
+        release.wait(2)
+        raise TimeoutError("provider timed out")
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flight.do, "api", "key", lookup) for _ in range(2)]
+        wait_for(lambda: shared(flight).get("api") == 1)
+        release.set()
+        for future in futures:
+            with pytest.raises(TimeoutError, match="provider timed out"):
+                future.result()
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    def lookup(name):
+        calls.append(name)
+        return name
+
+    assert flight.do("dns", "a", lambda: lookup("a")) == "a"
+    assert flight.do("dns", "a", lambda: lookup("a")) == "a"
+    assert flight.do("api", "a", lambda: lookup("a")) == "a"
+    assert flight.do("dns", "b", lambda: lookup("b")) == "b"
+    assert calls == ["a", "a", "a", "b"]
+
+
+def test_waiters_replay_the_graph_changes_of_the_shared_call():
+    received = []
+    recorder = GraphRecorder(lambda kind, key, attrs: received.append((threading.get_ident(), key)))
+    flight = SingleFlight(Metrics(), recorder)
+    release = threading.Event()
+
+    def lookup():
+        release.wait(2)
+        recorder.add("node", "192.0.2.1", {"type": "ip"})
+        recorder.add("edge", ("example.com", "192.0.2.1"), {"label": "A"})
+        return "done"
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "api", "key", lookup)
+        wait_for(lambda: flight.pending() == 1)
+        waiter = pool.submit(
+            lambda: (threading.get_ident(), flight.do("api", "key", lookup))
+        )
+        wait_for(lambda: shared(flight).get("api") == 1)
+        release.set()
+        assert leader.result() == "done"
+        waiter_thread, _ = waiter.result()
+    assert received == [
+        (waiter_thread, "192.0.2.1"),
+        (waiter_thread, ("example.com", "192.0.2.1")),
+    ]
+
@@ -0,0 +1,101 @@
+import struct
+
+import pytest
+
+import ip_investigator
+from ip_investigator import (
+    GRAPH_FORMAT_VERSION,
+    GRAPH_MAGIC,
+    InvestigationGraph,
+    read_graph_snapshot,
+    restore_graph_snapshot,
+    write_graph_snapshot,
+)
+
+
+def sample_graph():
+    graph = InvestigationGraph()
+    graph.add_node("example.com", type="domain")
+    for i in range(1, 6):
+        ip = f"192.0.2.{i}"
+        graph.add_node(ip, type="ip")
+        graph.add_edge("example.com", ip, label="A", timestamp=f"2026-01-0{i}")
+    graph.add_node('odd "name"\n', type="domain", note={"nested": [1, 2]})
+    graph.add_edge("192.0.2.1", 'odd "name"\n', label="reverse_dns")
+    return graph
+
+
+def test_round_trip_keeps_nodes_edges_and_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(ip_investigator, "GRAPH_CHUNK_SIZE", 2)  # several frames per kind
+    graph = sample_graph()
+    results = {("example.com", "whois"): "Registrar: Example", ("192.0.2.1", "ping"): "ok"}
+    path = tmp_path / "session.graph"
+
+    assert write_graph_snapshot(path, graph, results) == (7, 6)
+
+    restored, restored_results = InvestigationGraph(), {}
+    assert restore_graph_snapshot(path, restored, restored_results) == 7
+    assert dict(restored.nodes(data=True)) == dict(graph.nodes(data=True))
+    assert list(restored.edges(data=True)) == list(graph.edges(data=True))
+    assert restored_results == results
+    assert restored.nodes_by_type == graph.nodes_by_type
+    assert restored.edges_by_label == graph.edges_by_label
+
+
+def test_frames_hold_at_most_one_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(ip_investigator, "GRAPH_CHUNK_SIZE", 4)
+    path = tmp_path / "session.graph"
+    write_graph_snapshot(path, sample_graph(), {})
+    frames = [(kind, len(records)) for kind, records in read_graph_snapshot(path)]
+    assert frames == [(b"N", 4), (b"N", 3), (b"E", 4), (b"E", 2)]
+
+
+def test_restore_merges_into_an_existing_graph(tmp_path):
+    path = tmp_path / "session.graph"
+    write_graph_snapshot(path, sample_graph(), {})
+    graph = InvestigationGraph()
+    graph.add_node("example.com", type="url")
+    graph.add_edge("example.com", "203.0.113.9", label="A")
+
+    restore_graph_snapshot(path, graph, {})
+
+    assert graph.nodes["example.com"]["type"] == "domain"
+    assert "example.com" not in graph.nodes_by_type["url"]
+    assert graph.has_edge("example.com", "203.0.113.9")
+    assert len(graph.edges_by_label["A"]) == 6
+    nodes, _, _ = graph.changes_since(0)
+    assert {node for node, _ in nodes} == set(graph.nodes)
+
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+    path = tmp_path / "session.graph"
+    path.write_bytes(b"digraph G {}\n")
+    with pytest.raises(ValueError, match="not a graph snapshot"):
+        list(read_graph_snapshot(path))
+
+
+def test_rejects_newer_format_versions(tmp_path):
+    path = tmp_path / "session.graph"
+    path.write_bytes(GRAPH_MAGIC + struct.pack("<H", GRAPH_FORMAT_VERSION + 1))
+    with pytest.raises(ValueError, match="Unsupported graph snapshot version"):
+        list(read_graph_snapshot(path))
+
+
+def test_save_and_load_restore_the_session(cli, capsys):
+    cli.do_target("example.com")
+    cli.graph.add_node("example.com", type="domain")
+    cli.graph.add_edge("example.com", "192.0.2.1", label="A")
+    cli.results[("example.com", "whois")] = "Registrar: Example"
+    cli.do_save(None)
+
+    loaded = ip_investigator.IPInvestigatorCLI(use_cache=False, sync_log=True)
+    try:
+        loaded.do_load("example.com.save")
+        assert loaded.target == "example.com"
+        assert loaded.target_type == "domain"
+        assert loaded.graph.has_edge("example.com", "192.0.2.1")
+        assert loaded.results == {("example.com", "whois"): "Registrar: Example"}
+        loaded.do_results("whois")
+        assert "Registrar: Example" in capsys.readouterr().out
+    finally:
+        loaded.do_exit(None)
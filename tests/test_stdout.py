@@ -0,0 +1,39 @@
+import threading
+from io import StringIO
+
+from ip_investigator import ThreadLocalStdout
+
+
+def test_capture_keeps_output_from_the_stream():
+    stream = StringIO()
+    stdout = ThreadLocalStdout(stream)
+    with stdout.capture() as buffer:
+        stdout.write("captured\n")
+    stdout.write("direct\n")
+    assert buffer.getvalue() == "captured\n"
+    assert stream.getvalue() == "direct\n"
+
+
+def test_tee_writes_through_as_output_is_written():
+    stream = StringIO()
+    stdout = ThreadLocalStdout(stream)
+    with stdout.capture(tee=True) as buffer:
+        stdout.write("hit 1\n")
+        assert stream.getvalue() == "hit 1\n"
+        with stdout.capture() as inner:
+            stdout.write("quiet\n")
+        stdout.write("hit 2\n")
+    assert buffer.getvalue() == "hit 1\nhit 2\n"
+    assert inner.getvalue() == "quiet\n"
+    assert stream.getvalue() == "hit 1\nhit 2\n"
+
+
+def test_captures_are_per_thread():
+    stream = StringIO()
+    stdout = ThreadLocalStdout(stream)
+    with stdout.capture() as buffer:
+        thread = threading.Thread(target=stdout.write, args=("other thread\n",))
+        thread.start()
+        thread.join()
+    assert buffer.getvalue() == ""
+    assert stream.getvalue() == "other thread\n"
@@ -0,0 +1,90 @@
+import json
+import threading
+
+import pytest
+
+from ip_investigator import Metrics, Tracer
+
+
+def spans(tracer):
+    return [event for event in tracer.events if event["ph"] == "X"]
+
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    tracer = Tracer()
+    with tracer.span("lookup"):
+        pass
+    assert tracer.events == []
+    tracer.write()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_nested_spans_are_complete_events_inside_their_parent(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json")
+    with tracer.span("outer", "command"):
+        with tracer.span("inner", "dns", rtype="A"):
+            pass
+    inner, outer = spans(tracer)
+    assert (inner["name"], inner["cat"], inner["args"]) == ("inner", "dns", {"rtype": "A"})
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_failed_spans_record_the_error(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json")
+    with pytest.raises(TimeoutError):
+        with tracer.span("lookup"):
+            raise TimeoutError
+    assert spans(tracer)[0]["args"] == {"error": "TimeoutError"}
+
+
+def test_each_thread_is_named_once(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json")
+
+    def work():
+        for _ in range(3):
+            with tracer.span("work"):
+                pass
+
+    threads = [threading.Thread(target=work, name=f"worker-{i}") for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    names = [event["args"]["name"] for event in tracer.events if event["ph"] == "M"]
+    assert sorted(names) == ["worker-0", "worker-1"]
+    assert len(spans(tracer)) == 6
+
+
+def test_write_produces_chrome_trace_json(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer(path)
+    with Metrics(tracer=tracer).timer("subprocess", command="ping"):
+        pass
+    tracer.write()
+    trace = json.loads(path.read_text())
+    assert trace["displayTimeUnit"] == "ms"
+    (span,) = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert span["name"] == "subprocess ping"
+    assert span["cat"] == "subprocess"
+    assert {"ts", "dur", "pid", "tid"} <= span.keys()
+
+
+def test_cli_traces_commands_and_graph_changes(cli, tmp_path, monkeypatch):
+    path = tmp_path / "trace.json"
+    monkeypatch.setattr(cli, "tracer", Tracer(path))
+    cli.onecmd("target example.com")
+    cli.graph.add_node("example.com", type="domain")
+    assert [span["name"] for span in spans(cli.tracer)] == [
+        "target example.com",
+        "graph add_node",
+    ]
+
+
+def test_cli_writes_the_trace_on_exit(cli, tmp_path, monkeypatch):
+    path = tmp_path / "trace.json"
+    monkeypatch.setattr(cli, "tracer", Tracer(path))
+    cli.onecmd("target example.com")
+    cli.do_exit(None)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert "target example.com" in [event["name"] for event in events]
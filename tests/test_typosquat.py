@@ -0,0 +1,76 @@
+import threading
+import time
+
+import dns.name
+import dns.resolver
+import dns.rrset
+
+
+class LookalikeResolver:
+    """Resolves the names in registered to 192.0.2.1; everything else is NXDOMAIN."""
+
+    nameservers = ["192.0.2.53"]
+    port = 53
+
+    def __init__(self, registered, delay=0.0):
+        self.registered = registered
+        self.delay = delay
+        self.asked = []
+
+    async def resolve(self, name, rtype, raise_on_no_answer=True):
+        self.asked.append(name)
+        if self.delay:
+            time.sleep(self.delay)  # hold the run open for concurrent callers
+        if name not in self.registered:
+            raise dns.resolver.NXDOMAIN(qnames=[dns.name.from_text(name)], responses={})
+        return Answer(name)
+
+
+class Answer:
+    def __init__(self, name):
+        self.rrset = dns.rrset.from_text(name, 60, "IN", "A", "192.0.2.1")
+        self.expiration = time.time() + 60
+        self.response = None
+
+
+def setup(cli, conf_dir, resolver):
+    (conf_dir / "typosquat.conf").write_text("[DEFAULT]\ntlds = com,net,org\n")
+    lookup = cli.modules["dnslookup"].load()
+    lookup.primary_resolver = lookup.fallback_resolver = resolver
+    cli.do_target("example.com")
+
+
+def test_registered_lookalikes_are_reported(cli, conf_dir, capture_stdout, capsys):
+    capture_stdout()
+    resolver = LookalikeResolver({"example.net"})
+    setup(cli, conf_dir, resolver)
+
+    cli.default("typosquat --only tld")
+
+    assert sorted(resolver.asked) == ["example.net", "example.org"]
+    assert cli.graph.has_edge("example.com", "example.net")
+    assert cli.graph.has_edge("example.net", "192.0.2.1")
+    out = capsys.readouterr().out
+    assert "example.net 192.0.2.1" in out
+    assert "2 candidate(s)" in out and "1 registered" in out
+
+
+def test_concurrent_runs_share_one_lookup(cli, conf_dir, capture_stdout):
+    capture_stdout()
+    resolver = LookalikeResolver({"example.net"}, delay=0.2)
+    setup(cli, conf_dir, resolver)
+    module = cli.modules["typosquat"]
+    outputs = []
+
+    def run():
+        outputs.append(cli.run_module("typosquat", module, "example.com", ["--only", "tld"])[0])
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert sorted(resolver.asked) == ["example.net", "example.org"]
+    assert len(outputs) == 2
+    assert all("example.net 192.0.2.1" in output for output in outputs)